@@ -1,19 +1,26 @@
 'use client';
 
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { Card, CardContent } from '@/components/ui/card';
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from '@/components/ui/dialog';
-import { Calculator } from 'lucide-react';
+import { Input } from '@/components/ui/input';
+import { Button } from '@/components/ui/button';
+import { Search } from 'lucide-react';
+import { CatalogVideo, fetchCatalog } from '@/lib/api';
 
 interface Video {
   id: string;
   title: string;
   videoUrl: string;
+  posterUrl?: string | null;
   description: string;
   duration: string;
 }
 
-const videoGallery: Video[] = [
+const SEARCH_DEBOUNCE_MS = 300;
+
+// Shown when the backend catalog cannot be reached
+const bundledVideos: Video[] = [
   {
     id: 'vid1',
     title: 'Area Model Expanding Binomials',
@@ -115,8 +122,66 @@ const videoGallery: Video[] = [
 ];
 
 
+const formatDuration = (seconds: number | null) => {
+  if (seconds == null) return '';
+  const total = Math.round(seconds);
+  return `${Math.floor(total / 60)}:${String(total % 60).padStart(2, '0')}`;
+};
+
+const fromCatalog = (video: CatalogVideo): Video => ({
+  id: String(video.id),
+  title: video.title,
+  videoUrl: video.videoUrl,
+  posterUrl: video.thumbnailUrl,
+  description: video.snippet || video.transcript || video.prompt,
+  duration: formatDuration(video.durationSeconds),
+});
+
 export default function GalleryPage() {
   const [selectedVideo, setSelectedVideo] = useState<Video | null>(null);
+  const [videos, setVideos] = useState<Video[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [query, setQuery] = useState('');
+  const [loading, setLoading] = useState(true);
+  const [offline, setOffline] = useState(false);
+
+  // First page on load and whenever the search changes; one page is fetched at a time
+  useEffect(() => {
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      setLoading(true);
+      try {
+        const page = await fetchCatalog({ query, signal: controller.signal });
+        setVideos(page.items.map(fromCatalog));
+        setNextCursor(page.nextCursor);
+        setOffline(false);
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        console.error('Error loading the video catalog:', error);
+        setVideos(bundledVideos);
+        setNextCursor(null);
+        setOffline(true);
+      }
+      setLoading(false);
+    }, query ? SEARCH_DEBOUNCE_MS : 0);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [query]);
+
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoading(true);
+    try {
+      const page = await fetchCatalog({ query, cursor: nextCursor });
+      setVideos((current) => [...current, ...page.items.map(fromCatalog)]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading more videos:', error);
+    }
+    setLoading(false);
+  };
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-slate-50 to-blue-50 pt-20 pb-16">
@@ -132,13 +197,29 @@ export default function GalleryPage() {
           </p>
         </div>
 
-        {/* Single Topic (Algebra) */}
+        {/* Search over titles, prompts and transcripts */}
+        {!offline && (
+          <div className="relative max-w-xl mx-auto mb-10">
+            <Search className="absolute left-3 top-1/2 -translate-y-1/2 h-4 w-4 text-gray-400" />
+            <Input
+              value={query}
+              onChange={(e) => setQuery(e.target.value)}
+              placeholder="Search videos and transcripts..."
+              className="pl-9 bg-white"
+            />
+          </div>
+        )}
+
         <section className="animate-fade-in">
-         
+          {!loading && videos.length === 0 && (
+            <p className="text-center text-gray-500">
+              {query ? 'No videos match your search.' : 'No videos have been generated yet.'}
+            </p>
+          )}
 
           {/* Videos Grid */}
           <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6">
-            {videoGallery.map((video) => (
+            {videos.map((video) => (
               <Card
                 key={video.id}
                 className="w-full cursor-pointer hover:shadow-xl transition-all duration-300 transform hover:scale-[1.02] border-0 bg-white"
@@ -147,6 +228,8 @@ export default function GalleryPage() {
                 <div className="relative">
                   <video
                     src={video.videoUrl}
+                    poster={video.posterUrl ?? undefined}
+                    preload={video.posterUrl ? 'none' : 'metadata'}
                     controls
                     className="w-full h-48 object-cover rounded-t-lg"
                   />
@@ -163,6 +246,14 @@ export default function GalleryPage() {
               </Card>
             ))}
           </div>
+
+          {nextCursor && (
+            <div className="text-center mt-10">
+              <Button variant="outline" onClick={loadMore} disabled={loading}>
+                {loading ? 'Loading...' : 'Load more'}
+              </Button>
+            </div>
+          )}
         </section>
       </div>
 
@@ -180,13 +271,14 @@ export default function GalleryPage() {
                     controls
                     className="w-full h-full"
                     src={selectedVideo.videoUrl}
+                    poster={selectedVideo.posterUrl ?? undefined}
                   >
                     Your browser does not support the video tag.
                   </video>
                 </div>
                 <div className="space-y-2">
                   <div className="flex items-center justify-between text-sm text-gray-500">
-                    <span>Duration: {selectedVideo.duration}</span>
+                    {selectedVideo.duration && <span>Duration: {selectedVideo.duration}</span>}
                   </div>
                   <p className="text-gray-700">{selectedVideo.description}</p>
                 </div>
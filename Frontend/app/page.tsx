@@ -3,14 +3,38 @@
 import { useState } from 'react';
 import { VideoPlayer } from '@/components/VideoPlayer';
 import { PopularConcepts } from '@/components/PopularConcepts';
-import { generateVideoExplanation } from '@/lib/api';
+import { generateVideoExplanation, JobProgressEvent } from '@/lib/api';
 import { Button } from '@/components/ui/button';
 import { Textarea } from '@/components/ui/textarea';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { AlertCircle } from 'lucide-react';
 
+const STAGE_LABELS: Record<string, string> = {
+  generate: 'Writing the animation',
+  alignment: 'Checking the layout',
+  validate: 'Checking the scene',
+  render_attempt: 'Rendering',
+  fix: 'Fixing a render error',
+  tts: 'Recording narration',
+  tts_wait: 'Finishing narration',
+};
+
+/** Short label for the latest backend progress event */
+function describeProgress(event: JobProgressEvent): string | null {
+  if (event.event === 'status') return event.status === 'queued' ? 'Waiting in queue...' : null;
+  if (event.event === 'render_progress') {
+    return `Rendering (attempt ${event.attempt}) - animation ${event.animation} ${event.percent}%`;
+  }
+  if (event.event === 'stage' && event.state === 'started' && event.stage && STAGE_LABELS[event.stage]) {
+    const attempt = event.attempt && event.attempt > 1 ? ` (attempt ${event.attempt})` : '';
+    return `${STAGE_LABELS[event.stage]}${attempt}...`;
+  }
+  return null;
+}
+
 interface VideoResult {
   videoUrl: string;
+  hlsUrl?: string | null;
   transcript: string;
   title: string;
 }
@@ -20,6 +44,7 @@ export default function Home() {
   const [isLoading, setIsLoading] = useState(false);
   const [videoResult, setVideoResult] = useState<VideoResult | null>(null);
   const [error, setError] = useState('');
+  const [progress, setProgress] = useState('');
 
   /** Generate video explanation (called for both initial & regenerate) */
   const fetchVideo = async (customQuery?: string) => {
@@ -32,9 +57,15 @@ export default function Home() {
 
     setError('');
     setIsLoading(true);
+    setProgress('');
 
     try {
-      const result = await generateVideoExplanation(finalQuery);
+      const result = await generateVideoExplanation(finalQuery, {
+        onProgress: (event) => {
+          const label = describeProgress(event);
+          if (label) setProgress(label);
+        },
+      });
       setVideoResult(result);
     } catch {
       setError('Failed to generate video explanation. Please try again.');
@@ -98,7 +129,7 @@ export default function Home() {
                   disabled={isLoading || !query.trim()}
                   className="w-full h-12 text-lg font-semibold bg-blue-600 hover:bg-blue-700"
                 >
-                  {isLoading ? 'Generating Video...' : 'Generate Video Explanation'}
+                  {isLoading ? progress || 'Generating Video...' : 'Generate Video Explanation'}
                 </Button>
               </form>
             </CardContent>
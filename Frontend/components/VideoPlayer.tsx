@@ -1,6 +1,6 @@
 'use client';
 
-import { useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
@@ -9,6 +9,8 @@ import { RotateCcw, Plus, Volume2, VolumeX } from 'lucide-react';
 
 interface VideoResult {
   videoUrl: string;
+  /** HLS playlist, when the backend segmented the video */
+  hlsUrl?: string | null;
   transcript: string;
   title: string;
 }
@@ -27,6 +29,16 @@ export function VideoPlayer({
   isRegenerating,
 }: VideoPlayerProps) {
   const [isMuted, setIsMuted] = useState(false);
+  const videoRef = useRef<HTMLVideoElement>(null);
+
+  // Prefer HLS where the browser plays it natively (Safari, iOS, Android); everywhere else the
+  // faststart MP4 still starts playing early through byte-range requests.
+  useEffect(() => {
+    const video = videoRef.current;
+    if (!video) return;
+    const useHls = !!videoResult.hlsUrl && video.canPlayType('application/vnd.apple.mpegurl') !== '';
+    video.src = useHls ? videoResult.hlsUrl! : videoResult.videoUrl;
+  }, [videoResult.hlsUrl, videoResult.videoUrl]);
 
   return (
     <div className="animate-fade-in">
@@ -71,12 +83,12 @@ export function VideoPlayer({
             <div className="lg:col-span-2">
               <div className="video-container bg-black rounded-xl overflow-hidden shadow-lg">
                 <video
+                  ref={videoRef}
                   controls
                   muted={isMuted}
+                  preload="metadata"
                   className="w-full h-full object-cover"
-                  
                 >
-                  <source src={videoResult.videoUrl} type="video/mp4" />
                   Your browser does not support the video tag.
                 </video>
               </div>
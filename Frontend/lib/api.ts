@@ -6,17 +6,179 @@ const api = axios.create({
 
 export default api;
 
-export async function generateVideoExplanation(prompt: string) {
+const POLL_INTERVAL_MS = 2000;
+
+export type VideoJobStatus = 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled';
+
+export interface VideoJob {
+  jobId: string;
+  status: VideoJobStatus;
+  error?: string | null;
+  queuePosition?: number;
+}
+
+// One entry of the backend's GET /jobs/{id}/events stream
+export interface JobProgressEvent {
+  id: number;
+  event: 'status' | 'stage' | 'render_progress' | 'render_failed' | 'log';
+  ts: number;
+  elapsed: number;
+  status?: VideoJobStatus;
+  stage?: string;
+  state?: 'started' | 'finished' | 'aborted';
+  attempt?: number;
+  animation?: number;
+  name?: string;
+  percent?: number;
+  message?: string;
+  error?: string | null;
+}
+
+interface GenerateVideoOptions {
+  onStatus?: (job: VideoJob) => void;
+  onProgress?: (event: JobProgressEvent) => void;
+  signal?: AbortSignal;
+}
+
+const isFinished = (status: VideoJobStatus) => status !== 'queued' && status !== 'running';
+
+const sleep = (ms: number, signal?: AbortSignal) =>
+  new Promise<void>((resolve, reject) => {
+    const timer = setTimeout(resolve, ms);
+    signal?.addEventListener('abort', () => {
+      clearTimeout(timer);
+      reject(new DOMException('Aborted', 'AbortError'));
+    });
+  });
+
+// token is the subscriberToken from submitting: a job shared with identical requests from other
+// clients keeps running until all of them have cancelled
+export async function cancelVideoJob(jobId: string, token?: string | null) {
+  await api.delete(`/jobs/${jobId}`, { params: token ? { token } : undefined });
+}
+
+// Follows the job over Server-Sent Events; resolves with null if the stream is unavailable
+function watchJobEvents(jobId: string, options: GenerateVideoOptions): Promise<VideoJob | null> {
+  const { onStatus, onProgress, signal } = options;
+  if (typeof EventSource === 'undefined') return Promise.resolve(null);
+
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`${api.defaults.baseURL}/jobs/${jobId}/events`);
+    const close = () => {
+      source.close();
+      signal?.removeEventListener('abort', onAbort);
+    };
+    const onAbort = () => {
+      close();
+      reject(new DOMException('Aborted', 'AbortError'));
+    };
+    signal?.addEventListener('abort', onAbort);
+
+    const handle = (message: MessageEvent) => {
+      const event: JobProgressEvent = JSON.parse(message.data);
+      onProgress?.(event);
+      if (event.event === 'status' && event.status) {
+        const job: VideoJob = { jobId, status: event.status, error: event.error };
+        onStatus?.(job);
+        if (isFinished(event.status)) {
+          close();
+          resolve(job);
+        }
+      }
+    };
+    for (const type of ['status', 'stage', 'render_progress', 'render_failed', 'log']) {
+      source.addEventListener(type, handle as EventListener);
+    }
+    // The browser reconnects on its own; only give up once it has closed the stream
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        close();
+        resolve(null);
+      }
+    };
+  });
+}
+
+export async function generateVideoExplanation(prompt: string, options: GenerateVideoOptions = {}) {
+  const { onStatus, signal } = options;
+  let jobId: string | null = null;
+  let subscriberToken: string | null = null;
+
   try {
-    const response = await api.post('/generate-video', { prompt });
+    // Submit returns immediately with a job id; the render runs in a backend worker
+    const submitted = await api.post('/generate-video', { prompt }, { signal });
+    jobId = submitted.data.jobId as string;
+    subscriberToken = submitted.data.subscriberToken ?? null;
+
+    let job: VideoJob = submitted.data;
+    onStatus?.(job);
+
+    if (!isFinished(job.status)) {
+      job = (await watchJobEvents(jobId, options)) ?? job;
+    }
+
+    // Polling fallback when the event stream cannot be opened
+    while (!isFinished(job.status)) {
+      await sleep(POLL_INTERVAL_MS, signal);
+      const status = await api.get(`/jobs/${jobId}`, { signal });
+      job = status.data;
+      onStatus?.(job);
+    }
+
+    if (job.status !== 'succeeded') {
+      throw new Error(job.error || `Video generation ${job.status}`);
+    }
+
+    const response = await api.get(`/jobs/${jobId}/result`, { signal });
 
     return {
       videoUrl: response.data.videoUrl,
+      hlsUrl: response.data.hlsUrl || null,
       transcript: response.data.transcript || '',
       title: response.data.title || 'Generated Video',
     };
   } catch (error) {
+    if (signal?.aborted && jobId) {
+      await cancelVideoJob(jobId, subscriberToken).catch(() => undefined);
+    }
     console.error('Error generating video explanation:', error);
     throw error;
   }
 }
+
+// One entry of the backend's GET /catalog listing
+export interface CatalogVideo {
+  id: number;
+  jobId: string;
+  title: string;
+  prompt: string;
+  transcript: string | null;
+  snippet: string | null;
+  videoUrl: string;
+  hlsUrl: string | null;
+  audioUrl: string | null;
+  thumbnailUrl: string | null;
+  durationSeconds: number | null;
+  createdAt: number;
+}
+
+export interface CatalogPage {
+  items: CatalogVideo[];
+  nextCursor: string | null;
+}
+
+interface CatalogOptions {
+  cursor?: string | null;
+  query?: string;
+  limit?: number;
+  signal?: AbortSignal;
+}
+
+// Newest first; pass the returned nextCursor back to load the following page
+export async function fetchCatalog({ cursor, query, limit = 24, signal }: CatalogOptions = {}): Promise<CatalogPage> {
+  const params: Record<string, string | number> = { limit };
+  if (cursor) params.cursor = cursor;
+  if (query?.trim()) params.q = query.trim();
+  const response = await api.get('/catalog', { params, signal });
+  return response.data;
+}
@@ -0,0 +1,101 @@
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+# ====== BATCH PRE-GENERATION CLIENT ======
+# Submits topics to a running backend (POST /batches) and follows the batch until every topic has
+# finished. The batch itself runs server-side: interrupting this script does not stop it, and
+# --resume follows it again.
+def request(api: str, method: str, path: str, body: dict = None) -> dict:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(f"{api}{path}", data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        raise SystemExit(f"{method} {path} failed with {e.code}: {e.read().decode('utf-8', 'replace')}")
+    except urllib.error.URLError as e:
+        raise SystemExit(f"Could not reach the backend at {api}: {e.reason}")
+
+
+def read_topics(paths: list) -> list:
+    topics = []
+    for path in paths:
+        with open(path) as f:
+            topics += [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    return topics
+
+
+def print_report(report: dict):
+    print(f"\n{'status':<10} {'attempts':>8} {'compute s':>10} {'wall s':>8}  topic")
+    for item in report["items"]:
+        print(f"{item['status']:<10} {item['attempts']:>8} {item['computeSeconds']:>10.1f} "
+              f"{item['wallSeconds']:>8.1f}  {item['topic']}")
+        if item["error"]:
+            print(f"{'':<40}{item['error'][:200]}")
+    counts = ", ".join(f"{status} {count}" for status, count in sorted(report["counts"].items()))
+    print(f"\n{len(report['items'])} topics ({counts}); {report['attempts']} render attempts, "
+          f"{report['computeSeconds']:.1f}s render CPU")
+
+
+def follow(api: str, batch_id: str, poll_seconds: float) -> dict:
+    seen = {}
+    while True:
+        report = request(api, "GET", f"/batches/{batch_id}")
+        for item in report["items"]:
+            if seen.get(item["position"]) != item["status"]:
+                seen[item["position"]] = item["status"]
+                print(f"[{time.strftime('%H:%M:%S')}] {item['status']:<10} {item['topic']}")
+        if report["done"]:
+            return report
+        time.sleep(poll_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate videos for a list of topics to warm the result cache")
+    parser.add_argument("files", nargs="*", help="Topic files, one topic per line (# starts a comment)")
+    parser.add_argument("--topic", action="append", default=[], help="A topic to add (repeatable)")
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--resume", metavar="BATCH_ID", help="Follow an existing batch instead of creating one")
+    parser.add_argument("--cancel", metavar="BATCH_ID", help="Cancel the batch's remaining topics")
+    parser.add_argument("--no-wait", action="store_true", help="Submit and exit without following the batch")
+    parser.add_argument("--poll", type=float, default=5.0, help="Seconds between status checks")
+    parser.add_argument("--json", help="Write the final batch report to this path")
+    args = parser.parse_args()
+    api = args.api.rstrip("/")
+
+    if args.cancel:
+        print_report(request(api, "DELETE", f"/batches/{args.cancel}"))
+        return
+    if args.resume:
+        batch_id = args.resume
+    else:
+        topics = read_topics(args.files) + args.topic
+        if not topics:
+            parser.error("no topics given")
+        created = request(api, "POST", "/batches", {"topics": topics})
+        batch_id = created["batchId"]
+        print(f"Batch {batch_id}: {len(created['items'])} topics ({created['duplicatesDropped']} duplicates dropped)")
+        if args.no_wait:
+            return
+
+    try:
+        report = follow(api, batch_id, args.poll)
+    except KeyboardInterrupt:
+        print(f"\nStopped following; the batch keeps running. Resume with: --resume {batch_id}")
+        sys.exit(130)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if report["counts"].get("failed"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from cache import normalize_prompt
+from jobs import QueueFull, log
+from workspace import pid_alive
+
+
+# Item states: pending -> queued -> succeeded | failed | cancelled, or cached when a result already existed
+FINISHED_STATES = ("succeeded", "failed", "cancelled", "cached")
+
+
+def dedupe_topics(topics: list) -> list:
+    # Same normalization as the result cache, first spelling wins
+    seen, unique = set(), []
+    for topic in topics:
+        normalized = normalize_prompt(topic or "")
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            unique.append(topic.strip())
+    return unique
+
+
+# ====== RESUMABLE BATCH STATE ======
+# Batches and their items live in SQLite, so an interrupted batch (restart, crash, deploy) picks up
+# where it stopped: items claimed by a process that stopped heartbeating go back to pending.
+class BatchStore:
+    def __init__(self, db_path: str, stale_seconds: float = 120):
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS batches (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS batch_items (
+                batch_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                status TEXT NOT NULL,
+                job_id TEXT,
+                owner TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                compute_seconds REAL NOT NULL DEFAULT 0,
+                wall_seconds REAL NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (batch_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS batch_items_status ON batch_items(status, updated_at);
+            """
+        )
+        self._db.commit()
+
+    def create(self, topics: list) -> str:
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT INTO batches VALUES (?, ?)", (batch_id, now))
+            self._db.executemany(
+                "INSERT INTO batch_items (batch_id, position, topic, status, updated_at) VALUES (?, ?, ?, 'pending', ?)",
+                [(batch_id, position, topic, now) for position, topic in enumerate(topics)],
+            )
+            self._db.commit()
+        return batch_id
+
+    def claim(self, owner: str, limit: int) -> list:
+        # Oldest batch first, in list order; also takes back items whose owner stopped heartbeating
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self._lock:
+            # Immediate transaction: two processes never claim the same item
+            self._db.execute("BEGIN IMMEDIATE")
+            rows = self._db.execute(
+                "SELECT i.batch_id, i.position, i.topic FROM batch_items i JOIN batches b ON b.id = i.batch_id "
+                "WHERE i.status = 'pending' OR (i.status = 'queued' AND i.updated_at < ?) "
+                "ORDER BY b.created_at, i.position LIMIT ?",
+                (now - self.stale_seconds, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE batch_items SET status = 'queued', owner = ?, job_id = NULL, updated_at = ? "
+                "WHERE batch_id = ? AND position = ?",
+                [(owner, now, batch_id, position) for batch_id, position, _ in rows],
+            )
+            self._db.commit()
+        return rows
+
+    def assign(self, batch_id: str, position: int, job_id: str):
+        with self._lock:
+            self._db.execute(
+                "UPDATE batch_items SET job_id = ?, updated_at = ? WHERE batch_id = ? AND position = ?",
+                (job_id, time.time(), batch_id, position),
+            )
+            self._db.commit()
+
+    def release(self, batch_id: str, position: int):
+        # Back to pending, e.g. when the render queue was full
+        with self._lock:
+            self._db.execute(
+                "UPDATE batch_items SET status = 'pending', owner = NULL, job_id = NULL, updated_at = ? "
+                "WHERE batch_id = ? AND position = ? AND status = 'queued'",
+                (time.time(), batch_id, position),
+            )
+            self._db.commit()
+
+    def finish(self, batch_id: str, position: int, status: str, attempts: int = 0, compute_seconds: float = 0.0,
+               wall_seconds: float = 0.0, error: str = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE batch_items SET status = ?, owner = NULL, attempts = ?, compute_seconds = ?, wall_seconds = ?, "
+                "error = ?, updated_at = ? WHERE batch_id = ? AND position = ? AND status = 'queued'",
+                (status, attempts, compute_seconds, wall_seconds, error, time.time(), batch_id, position),
+            )
+            self._db.commit()
+
+    def recover(self, host: str) -> int:
+        # Items held by processes on this host that no longer exist go straight back to pending
+        # instead of waiting out stale_seconds
+        with self._lock:
+            owners = [row[0] for row in self._db.execute(
+                "SELECT DISTINCT owner FROM batch_items WHERE status = 'queued' AND owner LIKE ?", (f"{host}:%",)
+            )]
+            dead = [owner for owner in owners if not pid_alive(int(owner.rsplit(":", 1)[1]))]
+            for owner in dead:
+                self._db.execute(
+                    "UPDATE batch_items SET status = 'pending', owner = NULL, job_id = NULL, updated_at = ? "
+                    "WHERE owner = ? AND status = 'queued'",
+                    (time.time(), owner),
+                )
+            self._db.commit()
+        return len(dead)
+
+    def heartbeat(self, owner: str):
+        with self._lock:
+            self._db.execute(
+                "UPDATE batch_items SET updated_at = ? WHERE owner = ? AND status = 'queued'", (time.time(), owner)
+            )
+            self._db.commit()
+
+    def cancel(self, batch_id: str) -> list:
+        # Pending items are cancelled here; returns the job ids of queued items for the caller to cancel
+        with self._lock:
+            job_ids = [row[0] for row in self._db.execute(
+                "SELECT job_id FROM batch_items WHERE batch_id = ? AND status = 'queued' AND job_id IS NOT NULL",
+                (batch_id,),
+            )]
+            self._db.execute(
+                "UPDATE batch_items SET status = 'cancelled', updated_at = ? WHERE batch_id = ? AND status = 'pending'",
+                (time.time(), batch_id),
+            )
+            self._db.commit()
+        return job_ids
+
+    def report(self, batch_id: str):
+        with self._lock:
+            batch = self._db.execute("SELECT created_at FROM batches WHERE id = ?", (batch_id,)).fetchone()
+            if batch is None:
+                return None
+            rows = self._db.execute(
+                "SELECT position, topic, status, job_id, attempts, compute_seconds, wall_seconds, error, updated_at "
+                "FROM batch_items WHERE batch_id = ? ORDER BY position",
+                (batch_id,),
+            ).fetchall()
+        items = [
+            {"position": position, "topic": topic, "status": status, "jobId": job_id, "attempts": attempts,
+             "computeSeconds": round(compute, 3), "wallSeconds": round(wall, 3), "error": error}
+            for position, topic, status, job_id, attempts, compute, wall, error, _ in rows
+        ]
+        counts = {}
+        for item in items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        done = all(item["status"] in FINISHED_STATES for item in items)
+        return {
+            "batchId": batch_id,
+            "createdAt": batch[0],
+            "finishedAt": max(row[8] for row in rows) if done and rows else None,
+            "done": done,
+            "counts": counts,
+            "attempts": sum(item["attempts"] for item in items),
+            "computeSeconds": round(sum(item["computeSeconds"] for item in items), 3),
+            "items": items,
+        }
+
+    def recent(self, limit: int = 20) -> list:
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT id FROM batches ORDER BY created_at DESC LIMIT ?", (limit,)
+            )]
+
+
+# ====== BATCH SCHEDULER ======
+class BatchRunner:
+    # Feeds claimed items into the job queue at low priority, at most max_in_flight at a time, so a
+    # batch never fills the queue or takes more than that many workers from interactive requests
+    def __init__(self, store: BatchStore, job_queue, lookup, key_for, priority: int = 10, max_in_flight: int = 1,
+                 poll_seconds: float = 2.0):
+        self.store = store
+        self.job_queue = job_queue
+        self.lookup = lookup  # lookup(topic) -> existing result or None
+        self.key_for = key_for  # key_for(topic) -> coalescing key shared with interactive requests
+        self.priority = priority
+        self.max_in_flight = max_in_flight
+        self.poll_seconds = poll_seconds
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}"
+        self.in_flight = {}  # (batch_id, position) -> Job
+        self.tokens = {}  # (batch_id, position) -> subscriber token, so a batch only withdraws its own interest
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        recovered = self.store.recover(self.host)
+        if recovered:
+            log(f"[Batch] Resuming items left by {recovered} stopped process(es)")
+        self._thread = threading.Thread(target=self._loop, name="batch-runner", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            try:
+                self._collect()
+                self._fill()
+                self.store.heartbeat(self.owner)
+            except Exception as e:
+                log(f"[Batch] Scheduling pass failed: {e}")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _fill(self):
+        for batch_id, position, topic in self.store.claim(self.owner, self.max_in_flight - len(self.in_flight)):
+            prompt = topic.strip().lower()
+            if self.lookup(prompt):
+                self.store.finish(batch_id, position, "cached")
+                continue
+            try:
+                job, attached, token = self.job_queue.submit_coalesced(
+                    topic, self.key_for(prompt), priority=self.priority,
+                    correlation_id=f"batch-{batch_id[:8]}-{position}",
+                )
+            except QueueFull:
+                self.store.release(batch_id, position)
+                return
+            if attached:
+                log(f"[Batch] '{topic}' is already being rendered by job {job.id}; following it")
+            self.store.assign(batch_id, position, job.id)
+            self.in_flight[(batch_id, position)] = job
+            self.tokens[(batch_id, position)] = token
+
+    def _collect(self):
+        for (batch_id, position), job in list(self.in_flight.items()):
+            if not job.done:
+                continue
+            del self.in_flight[(batch_id, position)]
+            self.tokens.pop((batch_id, position), None)
+            self.store.finish(
+                batch_id, position, job.status,
+                attempts=len(job.timings.get("validate", [])),
+                compute_seconds=sum(u["cpuSeconds"] for u in job.render_usage),
+                wall_seconds=(job.finished_at - job.started_at) if job.started_at else 0.0,
+                error=job.error,
+            )
+
+    def cancel(self, batch_id: str) -> int:
+        job_ids = self.store.cancel(batch_id)
+        # Withdraw each of this batch's subscriptions; a job a user also asked for keeps running
+        local = set()
+        for slot, job in list(self.in_flight.items()):
+            if slot[0] == batch_id and job.id in job_ids:
+                self.job_queue.cancel(job.id, self.tokens.get(slot))
+                local.add(job.id)
+        for job_id in set(job_ids) - local:
+            self.job_queue.cancel(job_id)
+        self.wake()
+        return len(job_ids)
+
+    def stats(self) -> dict:
+        return {"inFlight": len(self.in_flight), "maxInFlight": self.max_in_flight, "priority": self.priority}
@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from metrics import percentile
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_TOPICS = [
+    "pythagorean theorem",
+    "area of a circle",
+    "derivative of x squared",
+    "sum of angles in a triangle",
+    "slope of a line",
+    "quadratic formula",
+    "sine and cosine on the unit circle",
+    "area under a curve",
+    "prime factorization",
+    "fractions on a number line",
+    "mean median and mode",
+    "volume of a cylinder",
+]
+
+# Stand-in for the manim CLI: sleeps like a render, prints the progress/cache lines the pipeline
+# parses and fails a deterministic share of attempts so the fix loop gets exercised.
+STUB_MANIM = '''#!{python}
+import hashlib, os, sys, time
+args = sys.argv[1:]
+script = next(a for a in args if a.endswith(".py"))
+counter = ".stub_attempts"
+attempt = int(open(counter).read()) if os.path.exists(counter) else 0
+open(counter, "w").write(str(attempt + 1))
+with open(script) as f:
+    material = f.read() + str(attempt) + os.environ.get("BENCH_STUB_SEED", "0")
+roll = int(hashlib.sha256(material.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+time.sleep(float(os.environ.get("BENCH_STUB_SECONDS", "1.0")))
+for animation in range(3):
+    for percent in (0, 50, 100):
+        sys.stderr.write("\\rAnimation %d: Write(Text('stub')):  %d%%|#####| %d/2" % (animation, percent, percent // 50))
+    sys.stderr.write("\\n")
+    print("Animation %d : Partial movie file written in stub" % animation)
+if roll < float(os.environ.get("BENCH_STUB_FAIL_RATE", "0.3")):
+    sys.stderr.write('Traceback (most recent call last):\\n  File "%s", line 8, in construct\\n'
+                     "ValueError: stub render failure %d\\n" % (script, attempt))
+    sys.exit(1)
+stem = os.path.splitext(os.path.basename(script))[0]
+out = os.path.join("media", "videos", stem, "480p15")
+os.makedirs(out, exist_ok=True)
+with open(os.path.join(out, "GeneratedScene.mp4"), "wb") as f:
+    f.write(b"\\x00" * 4096)
+'''
+
+
+# ====== STATISTICS ======
+def summarize(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean": round(sum(samples) / len(samples), 4),
+        "p50": round(percentile(ordered, 50), 4),
+        "p95": round(percentile(ordered, 95), 4),
+        "p99": round(percentile(ordered, 99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def stage_samples(jobs: list) -> dict:
+    # Every occurrence of a stage, plus render attempts split out by attempt number
+    samples = {}
+    for job in jobs:
+        for stage, durations in job.timings.items():
+            samples.setdefault(stage, []).extend(durations)
+        for index, seconds in enumerate(job.timings.get("render_attempt", []), start=1):
+            samples.setdefault(f"render_attempt_{index}", []).append(seconds)
+    return samples
+
+
+def render_attempts(job) -> int:
+    # Distinct (candidate, attempt) pairs: a sectioned attempt that falls back to one process
+    # records two render_attempt stages for the same attempt
+    return len({(span.get("candidate"), span.get("attempt")) for span in job.spans
+                if span["name"] == "render_attempt"})
+
+
+# ====== RUN ======
+def prepare_environment(workdir: str, args):
+    # main.py reads its configuration at import time, so everything is set before importing it
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "TTS_BACKEND": "fake",
+        "RENDER_BACKEND": "cli",
+        "JOB_WORKERS": str(args.concurrency),
+        "JOB_QUEUE_DEPTH": str(max(args.jobs, 1)),
+        "RENDER_CONCURRENCY": str(args.render_concurrency),
+        "SPECULATIVE_CANDIDATES": str(args.candidates),
+        "SPECULATIVE_MAX_PARALLEL_RENDERS": str(args.candidate_renders),
+        "CACHE_DB": os.path.join(workdir, "cache", "results.sqlite3"),
+        "REWRITE_DB": os.path.join(workdir, "cache", "rewrites.sqlite3"),
+        "SCRATCH_ROOT": os.path.join(workdir, "scratch"),
+        "SIMILARITY_THRESHOLD": "2",  # every job runs the full pipeline
+        "USE_TEMPLATES": "0",  # several default topics match a scene template, which skips the LLM and fix loop
+    })
+    if args.manim == "stub":
+        bin_dir = os.path.join(workdir, "bin")
+        os.makedirs(bin_dir)
+        stub = os.path.join(bin_dir, "manim")
+        with open(stub, "w") as f:
+            f.write(STUB_MANIM.format(python=sys.executable))
+        os.chmod(stub, 0o755)
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+        os.environ["TEX_CACHE_DIR"] = ""  # the texcache wrapper would import the real manim
+        os.environ.update({
+            "BENCH_STUB_SECONDS": str(args.render_seconds),
+            "BENCH_STUB_FAIL_RATE": str(args.fail_rate),
+            "BENCH_STUB_SEED": str(args.seed),
+        })
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def run_benchmark(args, topics: list) -> dict:
+    import main
+
+    main.llm.backend.latency = args.llm_latency
+    main.tts_client.latency = args.tts_latency
+    prompts = [topics[i % len(topics)] + (f" (run {i // len(topics) + 1})" if i >= len(topics) else "")
+               for i in range(args.jobs)]
+
+    start = time.perf_counter()
+    jobs = [main.job_queue.submit(prompt) for prompt in prompts]
+    while not all(job.done for job in jobs):
+        time.sleep(0.05)
+    wall = time.perf_counter() - start
+
+    succeeded = [job for job in jobs if job.status == "succeeded"]
+    attempts = Counter(render_attempts(job) for job in succeeded)
+    end_to_end = [job.finished_at - job.created_at for job in jobs]
+    queue_wait = [job.started_at - job.created_at for job in jobs if job.started_at]
+    stages = {name: summarize(values) for name, values in sorted(stage_samples(jobs).items()) if values}
+    return {
+        "jobs": len(jobs),
+        "succeeded": len(succeeded),
+        "failed": len(jobs) - len(succeeded),
+        "wallSeconds": round(wall, 3),
+        "throughputJobsPerMinute": round(len(succeeded) / wall * 60, 2),
+        "endToEnd": summarize(end_to_end),
+        "queueWait": summarize(queue_wait) if queue_wait else None,
+        "stages": stages,
+        "attemptsPerSuccess": {str(k): attempts[k] for k in sorted(attempts)},
+        "llm": main.llm.stats(),
+        "speculation": main.speculation_stats.stats(),
+        "errors": Counter((job.error or "")[:120] for job in jobs if job.status != "succeeded"),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results: dict, baseline: dict):
+    print(f"\nvs baseline {baseline.get('commit') or '?'}:")
+    for name, stats in results["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if old:
+            delta = (stats["p95"] - old["p95"]) / old["p95"] * 100 if old["p95"] else 0.0
+            print(f"  {name:<20} p95 {old['p95']:.3f}s -> {stats['p95']:.3f}s ({delta:+.1f}%)")
+    old = baseline.get("throughputJobsPerMinute")
+    if old:
+        print(f"  throughput {old} -> {results['throughputJobsPerMinute']} jobs/min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the video pipeline with fake LLM and TTS")
+    parser.add_argument("--topics", help="File with one topic per line (defaults to a built-in corpus)")
+    parser.add_argument("--jobs", type=int, default=12, help="Total jobs; topics are reused with a suffix")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pipeline workers (JOB_WORKERS)")
+    parser.add_argument("--render-concurrency", type=int, default=2)
+    parser.add_argument("--candidates", type=int, default=1,
+                        help="Speculative candidates per job (1 = sequential fix loop)")
+    parser.add_argument("--candidate-renders", type=int, default=2, help="Parallel candidate renders per job")
+    parser.add_argument("--manim", choices=("stub", "real"), default="stub")
+    parser.add_argument("--render-seconds", type=float, default=1.0, help="Stub render duration")
+    parser.add_argument("--fail-rate", type=float, default=0.3, help="Share of stub render attempts that fail")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--tts-latency", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write machine-readable results to this path")
+    parser.add_argument("--baseline", help="Earlier --json output to compare p95s and throughput against")
+    args = parser.parse_args()
+
+    topics = DEFAULT_TOPICS
+    if args.topics:
+        with open(args.topics) as f:
+            topics = [line.strip() for line in f if line.strip()]
+    json_path = os.path.abspath(args.json) if args.json else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+        prepare_environment(workdir, args)
+        results = run_benchmark(args, topics)
+    results = {"commit": git_commit(), "settings": vars(args), **results}
+
+    print(f"{results['succeeded']}/{results['jobs']} succeeded in {results['wallSeconds']}s "
+          f"({results['throughputJobsPerMinute']} jobs/min)")
+    print(f"attempts per success: {results['attemptsPerSuccess']}")
+    for mode, stats in results["speculation"].items():
+        print(f"{mode}: p95 {stats['p95Seconds']}s, {stats['meanRenders']} renders and "
+              f"{stats['meanRenderCpuSeconds']} render CPU-s and {stats['meanLlmCalls']} LLM calls per job")
+    print(f"{'stage':<20} {'count':>5} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, stats in [("end_to_end", results["endToEnd"])] + list(results["stages"].items()):
+        print(f"{name:<20} {stats['count']:>5} {stats['p50']:>8.3f} {stats['p95']:>8.3f} {stats['p99']:>8.3f}")
+    if baseline:
+        compare(results, baseline)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
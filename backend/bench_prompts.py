@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+from distill import distill_error
+from llm import estimate_tokens
+from rewrites import error_signature, failing_line
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_SCENE = '''from manim import *
+
+class GeneratedScene(Scene):
+    def construct(self):
+        self.create_title()
+        self.show_main_content()
+        self.wait(1)
+
+    def create_title(self):
+        title = Text("Area of a Circle", font_size=48, color=BLUE)
+        title.to_edge(UP, buff=0.8)
+        self.play(Write(title), run_time=1)
+
+    def show_main_content(self):
+        circle = Circle(radius=1.5, color=GREEN)
+        radius = Line(circle.get_center(), circle.get_right(), color=YELLOW)
+        label = MathTex("r").next_to(radius, UP)
+        self.play(Create(circle), Create(radius), Write(label), run_time=2)
+        formula = MathTex("A = \\\\pi r^2", font_size=44).to_edge(DOWN, buff=0.8)
+        self.play(ShowCreation(formula), run_time=1)
+'''
+
+
+def manim_log(animations: int) -> str:
+    # What a render prints before it fails: an INFO line per animation and a redrawn progress bar
+    stdout, stderr = [], []
+    for i in range(animations):
+        stdout.append(f"[10/18/26 09:30:{i:02d}] INFO     Animation {i} : Partial movie file written in "
+                      f"'/tmp/scratch/media/videos/scene/480p15/partial_movie_files/GeneratedScene/"
+                      f"{i:08d}_1234567890.mp4'                                   scene_file_writer.py:527")
+        stderr.append("".join(f"\rAnimation {i}: Write(Text('Area of a Circle')):  {p}%|{'#' * (p // 10):<10}| "
+                              f"{p // 5}/20 [00:0{p // 50}<00:00, 31.2it/s]" for p in range(0, 101, 5)))
+    return "\n".join(stdout), "\n".join(stderr)
+
+
+def sample_failures() -> list:
+    # Stand-ins shaped like real manim failures, used when no recorded corpus is given
+    stdout, stderr = manim_log(4)
+    site = "/usr/local/lib/python3.11/site-packages/manim"
+    plain = (f"Return code: 1\nSTDOUT:\n{stdout}\nSTDERR:\n{stderr}\nTraceback (most recent call last):\n"
+             f'  File "{site}/cli/render/commands.py", line 120, in render\n    scene.render()\n'
+             f'  File "{site}/scene/scene.py", line 229, in render\n    self.construct()\n'
+             '  File "/tmp/scratch/job/scene.py", line 6, in construct\n    self.show_main_content()\n'
+             '  File "/tmp/scratch/job/scene.py", line 20, in show_main_content\n'
+             "    self.play(ShowCreation(formula), run_time=1)\n"
+             "NameError: name 'ShowCreation' is not defined\n")
+    box = "─" * 78
+    rich_frames = [
+        (f"{site}/cli/render/commands.py", 120, "render", "scene.render()"),
+        (f"{site}/scene/scene.py", 229, "render", "self.construct()"),
+        ("/tmp/scratch/job/scene.py", 6, "construct", "self.show_main_content()"),
+        ("/tmp/scratch/job/scene.py", 16, "show_main_content", "radius = Line(circle.get_center(), ...)"),
+        (f"{site}/mobject/geometry/line.py", 45, "__init__", "super().__init__(**kwargs)"),
+        (f"{site}/mobject/types/vectorized_mobject.py", 121, "__init__", "self.set_color(color)"),
+    ]
+    rich = [f"╭{'─' * 30} Traceback (most recent call last) {'─' * 13}╮"]
+    for path, line, function, source in rich_frames:
+        rich += [f"│ {path}:{line} in {function:<20}│", "│" + " " * 78 + "│"]
+        for offset in range(-3, 2):
+            marker = "❱" if offset == 0 else " "
+            text = source if offset == 0 else "context_line = something(arguments)"
+            rich.append(f"│ {marker} {line + offset:>4} │   {text:<66}│")
+        rich.append("│" + " " * 78 + "│")
+    rich.append(f"╰{box}╯")
+    rich_output = (f"Return code: 1\nSTDOUT:\n{stdout}\nSTDERR:\n{stderr}\n" + "\n".join(rich) +
+                   "\nTypeError: unsupported operand type(s) for -: 'NoneType' and 'float'\n")
+    killed = (f"Render killed: exceeded the 120s wall-clock limit\nReturn code: -9\nSTDOUT:\n{stdout}\n"
+              f"STDERR:\n{stderr}\n")
+    return [
+        {"topic": "area of a circle", "code": SAMPLE_SCENE, "error": plain},
+        {"topic": "area of a circle", "code": SAMPLE_SCENE, "error": rich_output},
+        {"topic": "area of a circle", "code": SAMPLE_SCENE, "error": killed},
+    ]
+
+
+def read_corpus(paths: list) -> list:
+    records = []
+    for path in paths:
+        with open(path) as f:
+            records += [json.loads(line) for line in f if line.strip()]
+    return records
+
+
+def load_prompt_builders():
+    # The prompt builders live in main, which needs a scratch directory and offline backends to import
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ.setdefault("TTS_BACKEND", "fake")
+    os.chdir(tempfile.mkdtemp(prefix="bench_prompts_"))
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    return main
+
+
+def sizes(values: list) -> dict:
+    return {"mean": round(statistics.mean(values)), "p50": round(statistics.median(values)), "max": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure fix prompt size with raw and distilled error output")
+    parser.add_argument("corpus", nargs="*",
+                        help="JSONL failures recorded with FAILURE_RECORD_PATH (defaults to built-in samples)")
+    parser.add_argument("--context", type=int, default=3, help="Scene lines shown around the failing line")
+    parser.add_argument("--json", help="Write machine-readable results to this path")
+    args = parser.parse_args()
+    records = read_corpus(args.corpus) if args.corpus else sample_failures()
+    if not records:
+        parser.error("the corpus is empty")
+    json_path = os.path.abspath(args.json) if args.json else None
+    builders = load_prompt_builders()
+
+    rows = []
+    for record in records:
+        raw = record["error"]
+        distilled = distill_error(raw, record["code"], args.context)
+        rows.append({
+            "rawErrorChars": len(raw),
+            "distilledErrorChars": len(distilled),
+            "rawPromptChars": len(builders.build_fix_prompt(record["code"], raw, record["topic"])),
+            "distilledPromptChars": len(builders.build_fix_prompt(record["code"], distilled, record["topic"])),
+            # What the rewrite engine and the fix loop key on must survive distillation
+            "signatureKept": error_signature(distilled) == error_signature(raw),
+            "failingLineKept": failing_line(distilled) == failing_line(raw),
+        })
+
+    raw_total = sum(r["rawPromptChars"] for r in rows)
+    distilled_total = sum(r["distilledPromptChars"] for r in rows)
+    topic = records[0]["topic"]
+    results = {
+        "failures": len(rows),
+        "errorChars": {"raw": sizes([r["rawErrorChars"] for r in rows]),
+                       "distilled": sizes([r["distilledErrorChars"] for r in rows])},
+        "fixPromptChars": {"raw": sizes([r["rawPromptChars"] for r in rows]),
+                           "distilled": sizes([r["distilledPromptChars"] for r in rows])},
+        "estimatedFixPromptTokens": {"raw": estimate_tokens(raw_total), "distilled": estimate_tokens(distilled_total)},
+        "reduction": round(1 - distilled_total / raw_total, 3),
+        "signatureKept": sum(r["signatureKept"] for r in rows),
+        "failingLineKept": sum(r["failingLineKept"] for r in rows),
+        # Sent unchanged on every generation and alignment call, for comparison
+        "staticPromptChars": {
+            "generate": len(builders.build_gemini_prompt(topic)),
+            "alignment": len(builders.build_alignment_prompt(records[0]["code"])),
+        },
+        "failuresDetail": rows,
+    }
+
+    print(f"{'raw err':>8} {'distilled':>9} {'raw prompt':>10} {'distilled':>9}  signature  failing line")
+    for r in rows:
+        print(f"{r['rawErrorChars']:>8} {r['distilledErrorChars']:>9} {r['rawPromptChars']:>10} "
+              f"{r['distilledPromptChars']:>9}  {'kept' if r['signatureKept'] else 'LOST':<9}  "
+              f"{'kept' if r['failingLineKept'] else 'LOST'}")
+    tokens = results["estimatedFixPromptTokens"]
+    print(f"\n{len(rows)} failures: fix prompts {raw_total} -> {distilled_total} chars "
+          f"(~{tokens['raw']} -> ~{tokens['distilled']} tokens, {results['reduction']:.1%} smaller)")
+    print(f"signature kept {results['signatureKept']}/{len(rows)}, failing line kept "
+          f"{results['failingLineKept']}/{len(rows)}")
+    static = results["staticPromptChars"]
+    print(f"static prompts per call: generate {static['generate']} chars, alignment {static['alignment']} chars")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
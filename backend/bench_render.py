@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from render_pool import WarmRenderPool
+from sections import plan_sections
+from streaming import concat_lossless
+
+
+SAMPLE_SCENE = '''from manim import *
+
+class GeneratedScene(Scene):
+    def construct(self):
+        title = Text("Pythagorean Theorem", font_size=48, color=BLUE)
+        title.to_edge(UP, buff=0.8)
+        self.play(Write(title), run_time=1)
+        square = Square(side_length=2, color=GREEN)
+        self.play(Create(square), run_time=1)
+        self.wait(1)
+'''
+
+# The generation prompt's mandatory structure: two sections split at clear_screen
+SECTIONED_SAMPLE_SCENE = '''from manim import *
+
+class GeneratedScene(Scene):
+    def construct(self):
+        self.create_title()
+        self.show_main_content()
+        self.wait(1)
+        self.clear_screen()
+        self.create_conclusion()
+        self.wait(1)
+
+    def create_title(self):
+        title = Text("Pythagorean Theorem", font_size=48, color=BLUE)
+        title.to_edge(UP, buff=0.8)
+        self.play(Write(title), run_time=1)
+
+    def show_main_content(self):
+        square = Square(side_length=2, color=GREEN)
+        self.play(Create(square), run_time=1)
+        self.play(square.animate.rotate(PI / 4), run_time=1)
+
+    def clear_screen(self):
+        self.play(FadeOut(Group(*self.mobjects)), run_time=1)
+
+    def create_conclusion(self):
+        conclusion = Text("a^2 + b^2 = c^2", font_size=36, color=GREEN)
+        self.play(Write(conclusion), run_time=1)
+'''
+
+
+# ====== COLD CLI vs WARM WORKER RENDER BENCHMARK ======
+def summarize(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "runs": len(samples),
+        "mean": round(statistics.mean(samples), 3),
+        "p50": round(ordered[len(ordered) // 2], 3),
+        "min": round(ordered[0], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def bench_cold(script_path: str, media_dir: str, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            ["manim", "-ql", "--disable_caching", "--media_dir", media_dir, script_path, "GeneratedScene"],
+            capture_output=True, text=True,
+        )
+        samples.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise SystemExit(f"Cold render failed:\n{proc.stderr}")
+    return samples
+
+
+def bench_warm(script_path: str, media_dir: str, runs: int) -> list:
+    pool = WarmRenderPool(size=1)
+    try:
+        no_cache = {"disable_caching": True}
+        pool.render(script_path, media_dir=media_dir, extra_config=no_cache)  # exclude one-time worker startup
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            proc = pool.render(script_path, media_dir=media_dir, extra_config=no_cache)
+            samples.append(time.perf_counter() - start)
+            if proc.returncode != 0:
+                raise SystemExit(f"Warm render failed:\n{proc.stderr}")
+        return samples
+    finally:
+        pool.shutdown()
+
+
+# ====== SINGLE PROCESS vs PARALLEL SECTIONS ======
+def bench_sections(source: str, workdir: str, runs: int) -> list:
+    # Every section as its own manim CLI process at once, then the stream-copy join
+    plan, reason = plan_sections(source, "GeneratedScene")
+    if plan is None:
+        raise SystemExit(f"Scene does not split into independent sections: {reason}")
+    scripts = []
+    for index in range(len(plan)):
+        path = os.path.join(workdir, f"section_{index}.py")
+        with open(path, "w") as f:
+            f.write(plan.script(source, index))
+        scripts.append((path, plan.class_name(index)))
+    media_dir = os.path.join(workdir, "sections")
+    samples = []
+    for run in range(runs):
+        start = time.perf_counter()
+        procs = [
+            subprocess.Popen(
+                ["manim", "-ql", "--disable_caching", "--media_dir", media_dir, path, scene_class],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+            )
+            for path, scene_class in scripts
+        ]
+        for proc in procs:
+            _, stderr = proc.communicate()
+            if proc.returncode != 0:
+                raise SystemExit(f"Section render failed:\n{stderr}")
+        clips = [
+            os.path.join(media_dir, "videos", os.path.splitext(os.path.basename(path))[0], "480p15", f"{scene_class}.mp4")
+            for path, scene_class in scripts
+        ]
+        concat_lossless(clips, os.path.join(workdir, f"joined_{run}.mp4"))
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-attempt latency of the manim CLI and warm render workers")
+    parser.add_argument("--scene", help="Scene file defining GeneratedScene (defaults to a small sample)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sections", action="store_true",
+                        help="Compare a single-process render with parallel section renders instead")
+    parser.add_argument("--json", help="Write machine-readable results to this path")
+    args = parser.parse_args()
+    names = ("single_process", "sections") if args.sections else ("cold_cli", "warm_worker")
+
+    with tempfile.TemporaryDirectory(prefix="bench_render_") as workdir:
+        script_path = os.path.join(workdir, "bench_scene.py")
+        if args.scene:
+            with open(args.scene) as f:
+                source = f.read()
+        else:
+            source = SECTIONED_SAMPLE_SCENE if args.sections else SAMPLE_SCENE
+        with open(script_path, "w") as f:
+            f.write(source)
+
+        if args.sections:
+            # Both sides start cold CLI processes; the difference is one process vs one per section
+            results = {
+                "single_process": summarize(bench_cold(script_path, os.path.join(workdir, "single"), args.runs)),
+                "sections": summarize(bench_sections(source, workdir, args.runs)),
+            }
+        else:
+            # Caching is disabled on both sides so only process startup and import cost differ
+            results = {
+                "cold_cli": summarize(bench_cold(script_path, os.path.join(workdir, "cold"), args.runs)),
+                "warm_worker": summarize(bench_warm(script_path, os.path.join(workdir, "warm"), args.runs)),
+            }
+    results["speedup_p50"] = round(results[names[0]]["p50"] / results[names[1]]["p50"], 2)
+
+    for name in names:
+        r = results[name]
+        print(f"{name:<14} mean {r['mean']:.3f}s  p50 {r['p50']:.3f}s  min {r['min']:.3f}s  max {r['max']:.3f}s")
+    print(f"p50 speedup: {results['speedup_p50']}x")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import json
+import random
+import statistics
+import time
+from similarity import PromptIndex
+
+
+# (cached prompt, new prompt, should the new prompt be served the cached video)
+LABELLED_PAIRS = [
+    # Paraphrases of the same request
+    ("explain the pythagorean theorem", "pythagoras theorem proof", True),
+    ("explain the pythagorean theorem", "what is the pythagorean theorem", True),
+    ("explain the pythagorean theorem", "pythagorean theorem", True),
+    ("area of a circle", "how to find the area of a circle", True),
+    ("area of a circle", "explain area of circles", True),
+    ("derivative of x^2", "show me the derivative of x^2 step by step", True),
+    ("derivative of x^2", "derivative of x squared", False),  # "squared" is not the constraint "2"
+    ("sum of angles in a triangle", "sum of the angles of triangles", True),
+    ("quadratic formula", "explain the quadratic formula", True),
+    ("quadratic formula", "quadratic formula proof", True),
+    ("sine and cosine on the unit circle", "unit circle sine and cosine", True),
+    ("mean median and mode", "explain mean, median and mode", True),
+    ("volume of a cylinder", "how do you calculate the volume of a cylinder", True),
+    ("volume of a cylinder", "volume of cylinders", True),
+    ("prime factorization", "what is prime factorisation", True),
+    ("fractions on a number line", "show fractions on the number line", True),
+    ("law of sines", "the law of sines explained", True),
+    ("integration by parts", "intro to integration by parts", True),
+    ("slope of a line", "slope of lines", True),
+    ("solve 2x + 3 = 7", "solve 2x + 3 = 7 step by step", True),
+    # Near misses: same topic, different problem, or a different topic with similar wording
+    ("derivative of x^2", "derivative of x^3", False),
+    ("derivative of x^2", "integral of x^2", False),
+    ("derivative of sin x", "derivative of cos x", False),
+    ("area of a circle", "area of a triangle", False),
+    ("area of a circle", "circumference of a circle", False),
+    ("volume of a cylinder", "volume of a cone", False),
+    ("volume of a cylinder", "surface area of a cylinder", False),
+    ("mean median and mode", "standard deviation", False),
+    ("solve 2x + 3 = 7", "solve 2x + 5 = 7", False),
+    ("solve 2x + 3 = 7", "solve 3x + 3 = 7", False),
+    ("law of sines", "law of cosines", False),
+    ("pythagorean theorem with sides 3 and 4", "pythagorean theorem with sides 5 and 12", False),
+    ("limit of sin x over x", "limit of 1 over x", False),
+    ("sine and cosine on the unit circle", "tangent on the unit circle", False),
+    ("integration by parts", "integration by substitution", False),
+    ("prime factorization", "prime numbers", False),
+    ("fractions on a number line", "decimals on a number line", False),
+    ("binomial theorem", "binomial distribution", False),
+    ("matrix multiplication", "matrix determinant", False),
+]
+
+TOPIC_WORDS = [
+    "derivative", "integral", "limit", "area", "volume", "perimeter", "circle", "triangle", "square", "polygon",
+    "sine", "cosine", "tangent", "logarithm", "exponent", "matrix", "vector", "probability", "fraction",
+    "equation", "inequality", "function", "graph", "series", "sequence", "prime", "factor", "angle", "slope",
+    "parabola", "ellipse", "hyperbola", "cylinder", "cone", "sphere", "mean", "median", "variance", "proof",
+    "theorem", "binomial", "polynomial", "quadratic", "linear", "rational", "complex", "number", "chain", "rule",
+]
+
+
+def synthetic_corpus(size: int, seed: int) -> list:
+    # Topical prompts with shared vocabulary, like a warm production cache
+    rng = random.Random(seed)
+    prompts = []
+    for i in range(size):
+        words = rng.sample(TOPIC_WORDS, rng.randint(2, 5))
+        if rng.random() < 0.4:
+            words.append(str(rng.randint(1, 20)))
+        prompts.append(" ".join(words) + f" {rng.choice(['example', 'problem', 'case'])}{i % 97}")
+    return prompts
+
+
+def build_index(corpus: list) -> PromptIndex:
+    index = PromptIndex()
+    for i, prompt in enumerate(corpus):
+        index.add(f"corpus-{i}", prompt)
+    for cached, _, _ in LABELLED_PAIRS:
+        index.add(f"pair:{cached}", cached)
+    return index
+
+
+def sweep(index: PromptIndex, thresholds: list) -> tuple:
+    # Each new prompt is scored against the cached prompt it is paired with; the synthetic corpus
+    # only provides realistic n-gram frequencies
+    scores = []
+    for cached, query, expected in LABELLED_PAIRS:
+        matches = index.search(query, limit=index.max_candidates)
+        scores.append((next((m["score"] for m in matches if m["key"] == f"pair:{cached}"), 0.0), expected))
+    positives = sum(1 for _, expected in scores if expected)
+    rows = []
+    for threshold in thresholds:
+        served = [expected for score, expected in scores if score >= threshold]
+        rows.append({"threshold": threshold, "recall": round(sum(served) / positives, 3),
+                     "wrongMatches": served.count(False)})
+    return rows, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune SIMILARITY_THRESHOLD on labelled pairs and time lookups")
+    parser.add_argument("--corpus", type=int, default=30000, help="Synthetic prompts indexed besides the pairs")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Print the score of every labelled pair")
+    parser.add_argument("--json", help="Write machine-readable results to this path")
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.corpus, args.seed)
+    start = time.perf_counter()
+    index = build_index(corpus)
+    build_seconds = time.perf_counter() - start
+
+    rows, scores = sweep(index, [round(0.5 + 0.05 * i, 2) for i in range(10)])
+    if args.verbose:
+        for (cached, query, expected), (score, _) in zip(LABELLED_PAIRS, scores):
+            print(f"{'match' if expected else 'miss ':<5} {score:.3f}  {query!r} -> {cached!r}")
+
+    rng = random.Random(args.seed + 1)
+    queries = [rng.choice(corpus) for _ in range(args.queries)] + [q for _, q, _ in LABELLED_PAIRS]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, limit=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    results = {
+        "indexed": len(index),
+        "buildSeconds": round(build_seconds, 2),
+        "queryMs": {"mean": round(statistics.mean(latencies), 3), "p50": round(latencies[len(latencies) // 2], 3),
+                    "p95": round(latencies[int(len(latencies) * 0.95)], 3)},
+        "thresholds": rows,
+    }
+    print(f"{results['indexed']} prompts indexed in {results['buildSeconds']}s; query mean "
+          f"{results['queryMs']['mean']}ms p50 {results['queryMs']['p50']}ms p95 {results['queryMs']['p95']}ms")
+    print(f"{'threshold':>9} {'recall':>7} {'wrong':>6}")
+    for row in rows:
+        print(f"{row['threshold']:>9} {row['recall']:>7} {row['wrongMatches']:>6}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from jobs import log
+from narration import captions_filename
+from streaming import hls_dirname
+
+
+# ====== CACHE KEYS ======
+def normalize_prompt(prompt: str) -> str:
+    return re.sub(r"\s+", " ", prompt.strip().lower())
+
+
+def cache_key(prompt: str, template_version: str, quality: str, voice: str) -> str:
+    material = "\x1f".join([normalize_prompt(prompt), template_version, quality, voice])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+# ====== PERSISTENT RESULT CACHE ======
+# Index lives in SQLite so it survives restarts; the mp4/mp3 files stay in
+# videos/ and audio/ where StaticFiles already serves them. Files named by pinned()
+# (e.g. catalog entries) outlive their cache entry: eviction only drops the index row.
+class ResultCache:
+    def __init__(self, db_path: str, videos_dir: str = "videos", audio_dir: str = "audio",
+                 max_bytes: int = 2 * 1024 ** 3, max_age: float = 30 * 86400, pinned=None):
+        self.videos_dir = videos_dir
+        self.audio_dir = audio_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.pinned = pinned or (lambda: set())
+        self.hits = 0
+        self.misses = 0
+        self.bytes_evicted = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                prompt TEXT NOT NULL,
+                title TEXT,
+                video_file TEXT NOT NULL,
+                audio_file TEXT,
+                transcript TEXT,
+                scene_source TEXT,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+        self._db.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT key, prompt, title, video_file, audio_file, transcript, scene_source, created_at "
+                "FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            entry = dict(zip(
+                ("key", "prompt", "title", "video_file", "audio_file", "transcript", "scene_source", "created_at"),
+                row,
+            ))
+            # Drop entries whose assets have been removed out from under us or have aged out
+            expired = time.time() - entry["created_at"] > self.max_age
+            if expired or not os.path.exists(os.path.join(self.videos_dir, entry["video_file"])):
+                self._delete(entry, self.pinned())
+                self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, prompt: str, title: str, video_file: str, audio_file, transcript: str, scene_source: str):
+        size = self._file_size(self.videos_dir, video_file) + self._file_size(self.audio_dir, audio_file)
+        size += len(transcript or "") + len(scene_source or "")
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT video_file, audio_file FROM entries WHERE key = ?", (key,)).fetchone()
+            if old and old != (video_file, audio_file):
+                self._delete({"key": key, "video_file": old[0], "audio_file": old[1]}, self.pinned())
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, prompt, title, video_file, audio_file, transcript, scene_source, size, now, now),
+            )
+            self._db.commit()
+        self.evict()
+
+    def evict(self, max_bytes: int = None) -> int:
+        # Age-based expiry first, then least-recently-used until under the size budget
+        # (max_bytes tightens the budget for one pass, e.g. when the disk quota is exceeded)
+        budget = self.max_bytes if max_bytes is None else min(max_bytes, self.max_bytes)
+        removed = 0
+        pinned = self.pinned()
+        with self._lock:
+            cutoff = time.time() - self.max_age
+            rows = self._db.execute(
+                "SELECT key, video_file, audio_file, size_bytes, created_at FROM entries ORDER BY last_used ASC"
+            ).fetchall()
+            total = sum(row[3] for row in rows)
+            for key, video_file, audio_file, size, created_at in rows:
+                if created_at >= cutoff and total <= budget:
+                    continue
+                self._delete({"key": key, "video_file": video_file, "audio_file": audio_file}, pinned)
+                total -= size
+                removed += 1
+                if video_file not in pinned:
+                    self.bytes_evicted += size
+            self._db.commit()
+        if removed:
+            log(f"[ResultCache] Evicted {removed} entries")
+        return removed
+
+    def referenced_files(self) -> set:
+        # Video and audio file names the cache still serves; anything else in videos/ and audio/ is an orphan
+        with self._lock:
+            rows = self._db.execute("SELECT video_file, audio_file FROM entries").fetchall()
+        return {name for row in rows for name in row if name}
+
+    def entries(self):
+        with self._lock:
+            return self._db.execute("SELECT key, prompt FROM entries").fetchall()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def _delete(self, entry: dict, pinned: set = frozenset()):
+        self._db.execute("DELETE FROM entries WHERE key = ?", (entry["key"],))
+        video_file = entry["video_file"]
+        audio_file = entry.get("audio_file")
+        if audio_file not in pinned:
+            for name in (audio_file, audio_file and captions_filename(audio_file)):
+                if not name:
+                    continue
+                try:
+                    os.remove(os.path.join(self.audio_dir, name))
+                except FileNotFoundError:
+                    pass
+        if video_file not in pinned:
+            try:
+                os.remove(os.path.join(self.videos_dir, video_file))
+            except FileNotFoundError:
+                pass
+            shutil.rmtree(os.path.join(self.videos_dir, hls_dirname(video_file)), ignore_errors=True)
+
+    @staticmethod
+    def _file_size(directory: str, name) -> int:
+        if not name:
+            return 0
+        try:
+            return os.path.getsize(os.path.join(directory, name))
+        except OSError:
+            return 0
@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+MAX_PAGE_SIZE = 100
+LISTED_COLUMNS = (
+    "id", "job_id", "prompt", "title", "transcript", "video_file", "audio_file", "thumbnail_file",
+    "duration_seconds", "render_stats", "created_at",
+)
+
+
+def match_expression(query: str) -> str:
+    # User text -> FTS5 query: every word must match, the last one as a prefix (search-as-you-type).
+    # Words are quoted so operators and punctuation in the query are taken literally.
+    words = [w.replace('"', '""') for w in query.split()]
+    if not words:
+        return ""
+    return " ".join(f'"{w}"' for w in words[:-1]) + (" " if len(words) > 1 else "") + f'"{words[-1]}"*'
+
+
+# ====== PERSISTENT VIDEO CATALOG ======
+# Every published video, newest first. Pages are keyed on the rowid (cursor = last id seen), so a
+# page costs the same however deep it is; search goes through an FTS5 index over title, prompt
+# and transcript kept in sync by triggers. An entry pins its video and audio (asset_files): the
+# result cache and the janitor leave them in place, so the catalog does not shrink with the cache.
+class Catalog:
+    def __init__(self, db_path: str, videos_dir: str = "videos", thumbnails_dir: str = "thumbnails"):
+        self.videos_dir = videos_dir
+        self.thumbnails_dir = thumbnails_dir
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        os.makedirs(thumbnails_dir, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS videos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT UNIQUE NOT NULL,
+                prompt TEXT NOT NULL,
+                title TEXT,
+                transcript TEXT,
+                video_file TEXT NOT NULL,
+                audio_file TEXT,
+                thumbnail_file TEXT,
+                duration_seconds REAL,
+                render_stats TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+                title, prompt, transcript, content='videos', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos BEGIN
+                INSERT INTO videos_fts(rowid, title, prompt, transcript)
+                VALUES (new.id, new.title, new.prompt, new.transcript);
+            END;
+            CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos BEGIN
+                INSERT INTO videos_fts(videos_fts, rowid, title, prompt, transcript)
+                VALUES ('delete', old.id, old.title, old.prompt, old.transcript);
+            END;
+            """
+        )
+        self._db.commit()
+
+    def add(self, job_id: str, prompt: str, title: str, transcript: str, video_file: str, audio_file,
+            thumbnail_file, duration_seconds, render_stats: dict) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO videos (job_id, prompt, title, transcript, video_file, audio_file, thumbnail_file, "
+                "duration_seconds, render_stats, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, prompt, title, transcript, video_file, audio_file, thumbnail_file, duration_seconds,
+                 json.dumps(render_stats), time.time()),
+            )
+            self._db.commit()
+            return cursor.lastrowid
+
+    def page(self, limit: int = 24, cursor: int = None, query: str = None) -> tuple:
+        # Returns ([entry, ...], next_cursor); next_cursor is None on the last page
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        columns = ", ".join(f"v.{c}" for c in LISTED_COLUMNS)
+        match = match_expression(query or "")
+        if match:
+            # rowid order and the cursor bound are answered by the FTS index itself
+            sql = (f"SELECT {columns}, snippet(videos_fts, 2, '', '', '…', 16) FROM videos_fts "
+                   "JOIN videos v ON v.id = videos_fts.rowid WHERE videos_fts MATCH ?")
+            params = [match]
+            key = "videos_fts.rowid"
+        else:
+            sql, params, key = f"SELECT {columns}, NULL FROM videos v WHERE 1", [], "v.id"
+        if cursor is not None:
+            sql += f" AND {key} < ?"
+            params.append(cursor)
+        sql += f" ORDER BY {key} DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+            more = len(rows) > limit
+            rows = rows[:limit]
+            entries, missing = [], []
+            for row in rows:
+                entry = dict(zip(LISTED_COLUMNS + ("snippet",), row))
+                # Pinned assets can still be removed by hand
+                if os.path.exists(os.path.join(self.videos_dir, entry["video_file"])):
+                    entry["render_stats"] = json.loads(entry["render_stats"] or "{}")
+                    entries.append(entry)
+                else:
+                    missing.append(entry)
+            if missing:
+                self._delete(missing)
+                self._db.commit()
+        return entries, (rows[-1][0] if more else None)
+
+    def _delete(self, entries: list):
+        for entry in entries:
+            self._db.execute("DELETE FROM videos WHERE id = ?", (entry["id"],))
+            if entry["thumbnail_file"]:
+                try:
+                    os.remove(os.path.join(self.thumbnails_dir, entry["thumbnail_file"]))
+                except FileNotFoundError:
+                    pass
+
+    def prune(self) -> int:
+        # Drops entries (and their thumbnails) whose video was removed by hand; run after each janitor pass
+        with self._lock:
+            rows = self._db.execute("SELECT id, video_file, thumbnail_file FROM videos").fetchall()
+            missing = [
+                {"id": row[0], "thumbnail_file": row[2]}
+                for row in rows if not os.path.exists(os.path.join(self.videos_dir, row[1]))
+            ]
+            self._delete(missing)
+            self._db.commit()
+        return len(missing)
+
+    def asset_files(self) -> set:
+        # Video and audio file names the catalog lists
+        with self._lock:
+            rows = self._db.execute("SELECT video_file, audio_file FROM videos").fetchall()
+        return {name for row in rows for name in row if name}
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        return {"videos": count}
@@ -0,0 +1,102 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+
+# ====== CROSS-PROCESS LEASES ======
+# Jobs live in each uvicorn worker's memory, so identical prompts arriving at different workers
+# are coalesced through a lease row in SQLite: the first worker renders, the others wait on the
+# row and then read the result from the shared result cache (or re-raise the leader's error).
+class LeaseStore:
+    def __init__(self, db_path: str, lease_seconds: float = 60, poll_seconds: float = 1.0,
+                 outcome_ttl: float = 600):
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.outcome_ttl = outcome_ttl  # finished rows stay readable this long for slow followers
+        self.process = f"{socket.gethostname()}:{os.getpid()}"
+        self.held = {}  # key -> owner, renewed in the background while the render runs
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leases (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                state TEXT NOT NULL,
+                error TEXT,
+                error_status INTEGER,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._renewer = threading.Thread(target=self._renew_loop, name="lease-renewer", daemon=True)
+        self._renewer.start()
+
+    def _owner(self, job_id: str) -> str:
+        return f"{self.process}:{job_id}"
+
+    def acquire(self, key: str, job_id: str) -> bool:
+        # True when this job should render; False while another live job holds the lease
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT state, expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+                if row and row[0] == "running" and row[1] > now:
+                    return False
+                self._db.execute(
+                    "INSERT OR REPLACE INTO leases VALUES (?, ?, 'running', NULL, NULL, ?)",
+                    (key, self._owner(job_id), now + self.lease_seconds),
+                )
+                self.held[key] = self._owner(job_id)
+                return True
+            finally:
+                self._db.execute("COMMIT")
+
+    def release(self, key: str, job_id: str, state: str, error: str = None, error_status: int = None):
+        # state: succeeded | failed | cancelled (a cancelled leader hands the prompt to a follower)
+        with self._lock:
+            self.held.pop(key, None)
+            self._db.execute(
+                "UPDATE leases SET state = ?, error = ?, error_status = ?, expires_at = ? WHERE key = ? AND owner = ?",
+                (state, error, error_status, time.time() + self.outcome_ttl, key, self._owner(job_id)),
+            )
+            self._db.execute("DELETE FROM leases WHERE state != 'running' AND expires_at < ?", (time.time(),))
+
+    def wait(self, key: str, cancel_event: threading.Event):
+        # Returns (state, error, error_status) once the leader finishes, or None if its lease lapsed
+        while True:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT state, error, error_status, expires_at FROM leases WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None:
+                return None
+            state, error, error_status, expires_at = row
+            if state != "running":
+                return state, error, error_status
+            if expires_at < time.time():
+                return None  # the leader's process died without releasing
+            if cancel_event.wait(self.poll_seconds):
+                return None
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            with self._lock:
+                for key, owner in list(self.held.items()):
+                    self._db.execute(
+                        "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ? AND state = 'running'",
+                        (time.time() + self.lease_seconds, key, owner),
+                    )
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = self._db.execute(
+                "SELECT COUNT(*) FROM leases WHERE state = 'running' AND expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+            return {"heldByThisProcess": len(self.held), "runningOnHost": running}
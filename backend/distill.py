@@ -0,0 +1,189 @@
+import json
+import os
+import re
+import threading
+from rewrites import EXCEPTION_LINE
+from workspace import SCENE_FILENAME
+
+
+ANSI = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+TRACEBACK_START = "Traceback (most recent call last)"
+# Plain Python frames, and the frame headers inside manim's rich traceback box
+PLAIN_FRAME = re.compile(r'^\s*File "([^"]+)", line (\d+)(?:, in (\S+))?')
+RICH_FRAME = re.compile(r"([^\s│]+\.py):(\d+) in (\S+)")
+RICH_SOURCE = re.compile(r"❱\s*\d+\s*│(.*?)\s*│?$")
+BOX_ONLY = re.compile(r"^[\s│╭╮╰╯─┃━]*$")
+# Progress bars, per-animation progress and manim's routine INFO log lines
+NOISE = (
+    re.compile(r"\d+%\|"),
+    re.compile(r"^\s*Animation \d+\s*:"),
+    re.compile(r"^\[[\d/:\s]+\]\s+INFO\b"),
+    re.compile(r"Partial movie file written|File ready at|Rendered \w+\s*$"),
+    re.compile(r"^(STDOUT|STDERR):$"),
+)
+PROGRESS = re.compile(r"^\s*Animation \d+\s*:.*\d+%\|")
+LIBRARY_DIRS = ("site-packages/", "dist-packages/", "/manim/")
+MAX_LINE_CHARS = 400
+MAX_MESSAGE_LINES = 8
+MAX_FRAMES = 6
+FALLBACK_LINES = 20
+
+
+def clean_lines(text: str, drop_noise: bool = True) -> list:
+    # A progress bar redraws itself with \r: only the last state of each line is kept
+    lines = []
+    for line in ANSI.sub("", text).split("\n"):
+        line = line.rsplit("\r", 1)[-1].rstrip()
+        if line.strip() and not BOX_ONLY.match(line) and not (drop_noise and any(p.search(line) for p in NOISE)):
+            lines.append(line[:MAX_LINE_CHARS])
+    return lines
+
+
+def in_scene(path: str) -> bool:
+    # manim has a scene/scene.py of its own
+    return os.path.basename(path) == SCENE_FILENAME and not any(d in path for d in LIBRARY_DIRS)
+
+
+def short_path(path: str) -> str:
+    if in_scene(path):
+        return SCENE_FILENAME
+    for marker in LIBRARY_DIRS[:2]:
+        if marker in path:
+            return path.split(marker, 1)[1]
+    return path
+
+
+def parse_frames(lines: list) -> list:
+    # [(path, line, function, source line or None), ...], outermost first
+    frames = []
+    for i, line in enumerate(lines):
+        plain = PLAIN_FRAME.match(line)
+        if plain:
+            source = lines[i + 1].strip() if i + 1 < len(lines) and not PLAIN_FRAME.match(lines[i + 1]) else None
+            if source and EXCEPTION_LINE.match(lines[i + 1]):
+                source = None
+            frames.append((plain.group(1), int(plain.group(2)), plain.group(3), source))
+            continue
+        rich = RICH_FRAME.search(line)
+        if rich and "│" in line:
+            # The marked line in the frame's source excerpt, before the next frame starts
+            source = None
+            for following in lines[i + 1:]:
+                if RICH_FRAME.search(following):
+                    break
+                marked = RICH_SOURCE.search(following)
+                if marked:
+                    source = marked.group(1).replace("│", "").strip()
+                    break
+            frames.append((rich.group(1), int(rich.group(2)), rich.group(3), source))
+    return frames
+
+
+def relevant_frames(frames: list) -> list:
+    # Every frame in the scene, the library call the scene made last and the frame that raised
+    scene = [i for i, frame in enumerate(frames) if in_scene(frame[0])]
+    keep = set(scene[-(MAX_FRAMES - 2):])
+    if scene and scene[-1] + 1 < len(frames):
+        keep.add(scene[-1] + 1)
+    if frames:
+        keep.add(len(frames) - 1)
+    return [frames[i] for i in sorted(keep)]
+
+
+def exception_lines(lines: list) -> list:
+    # The final exception and the continuation lines of a multi-line message
+    match = None
+    for i, line in enumerate(lines):
+        if EXCEPTION_LINE.match(line) and not PLAIN_FRAME.match(line):
+            match = i
+    if match is None:
+        return lines[-1:]
+    tail = []
+    for line in lines[match + 1:match + MAX_MESSAGE_LINES]:
+        if PLAIN_FRAME.match(line) or RICH_FRAME.search(line) or TRACEBACK_START in line:
+            break
+        tail.append(line)
+    return [lines[match].strip()] + tail
+
+
+def code_context(code: str, line: int, context: int) -> list:
+    lines = code.splitlines()
+    if not 0 < line <= len(lines):
+        return []
+    out = [f"Failing line {line} of the scene:"]
+    for number in range(max(1, line - context), min(len(lines), line + context) + 1):
+        out.append(f"{'>' if number == line else ' '} {number:4d} | {lines[number - 1]}")
+    return out
+
+
+# ====== ERROR DISTILLER ======
+# Manim's output for a failed render is mostly progress bars, log lines and library frames. The
+# fix prompt only needs the final exception, where the scene was when it happened and the failing
+# line with a little context; the result is still shaped like a traceback, so error_signature and
+# failing_line read it the same way as the raw output.
+def distill_error(error_output: str, code: str = None, context: int = 3) -> str:
+    if not error_output or (TRACEBACK_START not in error_output and "Return code:" not in error_output):
+        # Static validation findings and one-line failures are already compact
+        return error_output
+    header, body = [], error_output
+    if "Return code:" in error_output:
+        # Anything before "Return code:" is the resource limit that killed the render
+        before, after = error_output.split("Return code:", 1)
+        header = clean_lines(before)
+        header.append("Return code: " + after.split("\n", 1)[0].strip())
+        body = after.split("\n", 1)[1] if "\n" in after else ""
+
+    start = body.rfind(TRACEBACK_START)
+    if start < 0:
+        # No traceback (killed, crashed in native code, ...): the last meaningful lines and the
+        # animation that was rendering when it stopped
+        progress = [line.strip() for line in clean_lines(body, drop_noise=False) if PROGRESS.match(line)]
+        out = header + clean_lines(body)[-FALLBACK_LINES:] + [f"Last progress: {line}" for line in progress[-1:]]
+    else:
+        lines = clean_lines(body[start:])
+        frames = relevant_frames(parse_frames(lines[1:]))
+        out = header + ["Traceback (most recent call last, unrelated frames omitted):"]
+        for path, line, function, source in frames:
+            out.append(f'  File "{short_path(path)}", line {line}' + (f", in {function}" if function else ""))
+            if source:
+                out.append(f"    {source}")
+        out += exception_lines(lines[1:])
+        scene_lines = [line for path, line, _, _ in frames if in_scene(path)]
+        if code and scene_lines:
+            out += [""] + code_context(code, scene_lines[-1], context)
+    distilled = "\n".join(out)
+    return distilled if len(distilled) < len(error_output) else error_output
+
+
+# ====== FAILURE CORPUS ======
+_record_lock = threading.Lock()
+
+
+def record_failure(path: str, topic: str, code: str, error_output: str):
+    # Appends the raw failure, for bench_prompts.py and for tuning the distiller
+    with _record_lock, open(path, "a") as f:
+        f.write(json.dumps({"topic": topic, "code": code, "error": error_output}) + "\n")
+
+
+# ====== ACCOUNTING ======
+class DistillStats:
+    def __init__(self):
+        self.distilled = 0
+        self.raw_chars = 0
+        self.distilled_chars = 0
+        self._lock = threading.Lock()
+
+    def record(self, raw_chars: int, distilled_chars: int):
+        with self._lock:
+            self.distilled += 1
+            self.raw_chars += raw_chars
+            self.distilled_chars += distilled_chars
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "distilled": self.distilled,
+                "rawChars": self.raw_chars,
+                "distilledChars": self.distilled_chars,
+                "reduction": round(1 - self.distilled_chars / self.raw_chars, 3) if self.raw_chars else None,
+            }
@@ -0,0 +1,259 @@
+import fcntl
+import glob
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from jobs import log
+from metrics import directory_bytes
+from narration import captions_filename
+from streaming import hls_dirname
+from workspace import owner_alive, workspace_owner
+
+
+# Files this young may still be being written by a job, so orphan and quota sweeps leave them alone
+WRITE_GRACE_SECONDS = 600
+# Scratch directories whose owner cannot be checked (no owner file, or another host on a shared
+# volume) are only treated as abandoned after this long
+STALE_SCRATCH_SECONDS = 6 * 3600
+LOCK_FILENAME = ".janitor.lock"
+# Leftovers of interrupted writes and of the pre-workspace layout (scripts and media/ in the cwd)
+TEMP_PATTERNS = ("*.muxing.mp4", "*.tmp")
+LEGACY_PATTERNS = ("video_*.py",)
+
+
+def path_bytes(path: str) -> int:
+    try:
+        return directory_bytes(path) if os.path.isdir(path) else os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def remove_path(path: str) -> int:
+    # Returns the bytes reclaimed
+    size = path_bytes(path)
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        return 0
+    except OSError as e:
+        log(f"[Janitor] Could not remove {path}: {e}")
+        return 0
+    return size
+
+
+def age(path: str) -> float:
+    try:
+        return time.time() - os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def scratch_abandoned(path: str) -> bool:
+    # Owned by a process on this host that has exited, or unverifiable and stale
+    alive = owner_alive(workspace_owner(path))
+    if alive is None:
+        return age(path) > STALE_SCRATCH_SECONDS
+    return not alive
+
+
+# ====== DISK LIFECYCLE ======
+class Janitor:
+    # Keeps scratch/, media/, videos/ and audio/ bounded. Final assets referenced by the result
+    # cache or by a job result still being served are only removed through the cache's own LRU;
+    # pinned assets (catalog entries) are never removed and do not count against the quota.
+    # Several workers can share the directories: sweeps take a host-wide lock, scratch directories
+    # are only removed once their owning process is gone, and unreferenced assets younger than
+    # live_result_seconds may still be served by another worker's job results.
+    def __init__(self, result_cache, videos_dir: str = "videos", audio_dir: str = "audio", scratch_root: str = "scratch",
+                 legacy_media_dir: str = "media", asset_quota_bytes: int = 5 * 1024 ** 3,
+                 orphan_retention: float = 86400, interval: float = 900, active_jobs=None, referenced=None,
+                 on_reclaim=None, after_pass=None, live_result_seconds: float = 3600, pinned=None):
+        self.result_cache = result_cache
+        self.videos_dir = videos_dir
+        self.audio_dir = audio_dir
+        self.scratch_root = scratch_root
+        self.legacy_media_dir = legacy_media_dir
+        self.asset_quota_bytes = asset_quota_bytes
+        self.orphan_retention = orphan_retention
+        self.live_result_seconds = live_result_seconds
+        self.interval = interval
+        # active_jobs() -> ids of unfinished jobs; referenced() -> asset file names held by live job results
+        self.active_jobs = active_jobs or (lambda: set())
+        self.referenced = referenced or (lambda: set())
+        self.pinned = pinned or (lambda: set())  # pinned() -> asset file names kept regardless of the quota
+        self.on_reclaim = on_reclaim  # on_reclaim(kind, bytes), e.g. for metrics
+        self.after_pass = after_pass  # e.g. dropping catalog entries whose video was just removed
+        self.passes = 0
+        self.reclaimed = {}
+        self.last_pass = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _account(self, report: dict):
+        with self._lock:
+            for kind, amount in report.items():
+                if kind in ("seconds", "totalBytes"):
+                    continue
+                self.reclaimed[kind] = self.reclaimed.get(kind, 0) + amount
+                if amount and self.on_reclaim is not None:
+                    self.on_reclaim(kind, amount)
+
+    @contextmanager
+    def _host_lock(self):
+        # Yields False when another worker is already sweeping; that sweep covers this one too
+        os.makedirs(self.scratch_root, exist_ok=True)
+        with open(os.path.join(self.scratch_root, LOCK_FILENAME), "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _scratch_dirs(self) -> list:
+        if not os.path.isdir(self.scratch_root):
+            return []
+        return [(name, os.path.join(self.scratch_root, name))
+                for name in os.listdir(self.scratch_root) if not name.startswith(".")]
+
+    # ====== SWEEPS ======
+    def sweep_startup(self) -> dict:
+        # Leftovers of crashed processes. Other workers may be running, so only directories of dead
+        # owners go, and temp files only once nobody has written to them for a while.
+        start = time.perf_counter()
+        reclaimed = 0
+        with self._host_lock() as locked:
+            if locked:
+                for _, path in self._scratch_dirs():
+                    if scratch_abandoned(path):
+                        reclaimed += remove_path(path)
+                legacy = [path for pattern in LEGACY_PATTERNS for path in glob.glob(pattern)]
+                if self.legacy_media_dir and os.path.isdir(self.legacy_media_dir):
+                    legacy.append(self.legacy_media_dir)
+                for directory in (self.videos_dir, self.audio_dir):
+                    legacy += [path for pattern in TEMP_PATTERNS for path in glob.glob(os.path.join(directory, pattern))]
+                for path in legacy:
+                    if age(path) > WRITE_GRACE_SECONDS:
+                        reclaimed += remove_path(path)
+        report = {"startupBytes": reclaimed, "totalBytes": reclaimed,
+                  "seconds": round(time.perf_counter() - start, 3)}
+        self._account(report)
+        log(f"[Janitor] Startup sweep reclaimed {reclaimed / 1024 ** 2:.1f} MB")
+        return report
+
+    def job_finished(self, job):
+        # job_workspace removes its directory on the normal path; this catches anything left behind
+        path = os.path.join(self.scratch_root, job.id)
+        if os.path.exists(path):
+            self._account({"scratchBytes": remove_path(path)})
+
+    def _sweep_scratch(self) -> int:
+        active = self.active_jobs()
+        reclaimed = 0
+        for name, path in self._scratch_dirs():
+            if name not in active and age(path) > WRITE_GRACE_SECONDS and scratch_abandoned(path):
+                reclaimed += remove_path(path)
+        return reclaimed
+
+    def _assets(self) -> list:
+        # [(name, [paths], bytes, mtime)] with each mp4/mp3 grouped with its HLS dir or captions sidecar
+        assets = []
+        for directory, suffix, related in ((self.videos_dir, ".mp4", hls_dirname),
+                                           (self.audio_dir, ".mp3", captions_filename)):
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith(suffix) or name.endswith(".muxing.mp4"):
+                    continue
+                paths = [os.path.join(directory, name), os.path.join(directory, related(name))]
+                paths = [p for p in paths if os.path.exists(p)]
+                assets.append((name, paths, sum(path_bytes(p) for p in paths), os.path.getmtime(paths[0])))
+        return assets
+
+    def _sweep_assets(self) -> tuple:
+        # Returns (orphan bytes, cache bytes) reclaimed
+        pinned = self.pinned()
+        referenced = self.result_cache.referenced_files() | self.referenced()
+        assets = [a for a in self._assets() if a[0] not in pinned]
+        now = time.time()
+        # referenced() only knows this process's jobs; another worker's results live at most
+        # live_result_seconds, so younger unreferenced assets may still be in use there
+        min_age = WRITE_GRACE_SECONDS + self.live_result_seconds
+        orphans = sorted((a for a in assets if a[0] not in referenced and now - a[3] > min_age), key=lambda a: a[3])
+        total = sum(a[2] for a in assets)
+        orphan_bytes = 0
+        for name, paths, size, mtime in orphans:
+            # Past retention always goes; younger orphans only while over quota, oldest first
+            if now - mtime <= self.orphan_retention and total <= self.asset_quota_bytes:
+                continue
+            freed = sum(remove_path(p) for p in paths)
+            orphan_bytes += freed
+            total -= freed
+        cache_bytes = 0
+        if total > self.asset_quota_bytes:
+            # Still over: least-recently-used cached results go, through the cache so its index stays right
+            before = self.result_cache.bytes_evicted
+            self.result_cache.evict(max_bytes=max(self.result_cache.stats()["bytes"] - (total - self.asset_quota_bytes), 0))
+            cache_bytes = self.result_cache.bytes_evicted - before
+        return orphan_bytes, cache_bytes
+
+    def run_pass(self) -> dict:
+        start = time.perf_counter()
+        scratch = orphans = cached = 0
+        with self._host_lock() as locked:
+            if locked:
+                scratch = self._sweep_scratch()
+                orphans, cached = self._sweep_assets()
+                # Expired cache entries are dropped even when nothing new is being stored
+                before = self.result_cache.bytes_evicted
+                self.result_cache.evict()
+                cached += self.result_cache.bytes_evicted - before
+        report = {
+            "scratchBytes": scratch,
+            "orphanBytes": orphans,
+            "cacheBytes": cached,
+            "totalBytes": scratch + orphans + cached,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        self._account(report)
+        if self.after_pass is not None:
+            self.after_pass()
+        with self._lock:
+            self.passes += 1
+            self.last_pass = {"at": time.time(), **report}
+        log(f"[Janitor] Pass reclaimed {report['totalBytes'] / 1024 ** 2:.1f} MB "
+            f"(scratch {scratch}, orphans {orphans}, cache {cached} bytes)")
+        return report
+
+    # ====== BACKGROUND THREAD ======
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_pass()
+            except Exception as e:
+                log(f"[Janitor] Pass failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "passes": self.passes,
+                "reclaimedBytes": dict(self.reclaimed),
+                "lastPass": self.last_pass,
+                "assetQuotaBytes": self.asset_quota_bytes,
+            }
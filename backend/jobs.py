@@ -0,0 +1,332 @@
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from fastapi import HTTPException
+
+
+# ====== JOB ERRORS ======
+class QueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# ====== CORRELATED LOGGING ======
+# Set by the worker running a job, so log lines from helpers without a Job handle still carry its id
+current_correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+
+def log(message: str, correlation_id: str = None):
+    correlation_id = correlation_id or current_correlation_id.get()
+    print(f"[{correlation_id}] {message}" if correlation_id else message)
+
+
+# ====== JOB ======
+class Job:
+    def __init__(self, prompt: str, priority: int = 0, correlation_id: str = None):
+        self.id = uuid.uuid4().hex
+        # Client-supplied X-Request-ID when present, otherwise the job id
+        self.correlation_id = correlation_id or self.id
+        self.prompt = prompt
+        self.priority = priority
+        self.status = "queued"  # queued -> running -> succeeded | failed | cancelled
+        self.result = None
+        self.error = None
+        self.error_status = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.coalesce_key = None
+        # One token per request waiting on this job (identical requests attach while it is in flight);
+        # DELETE withdraws one token and only the last withdrawal cancels the job
+        self.owner_token = uuid.uuid4().hex
+        self.subscriber_tokens = {self.owner_token}
+        self.timings = {}
+        # Stages of speculative candidates that lost while running: not part of the trace, but still compute spent
+        self.discarded_timings = {}
+        # Cleared while work started for the job may outlive it (losing candidates still stopping)
+        self.settled = threading.Event()
+        self.settled.set()
+        self.render_usage = []
+        self.partial_cache = []
+        self.events = []  # progress stream served by GET /jobs/{id}/events
+        self.spans = []  # trace served by GET /jobs/{id}/trace
+        self._events_lock = threading.Lock()
+        self.emit("status", status="queued")
+
+    @property
+    def subscribers(self) -> int:
+        return len(self.subscriber_tokens)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def check_cancelled(self):
+        # Called by the pipeline between stages so a cancel takes effect at the next safe point
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def emit(self, event: str, **data) -> dict:
+        # Events are append-only; ids are list indexes so SSE clients can resume with Last-Event-ID
+        now = time.time()
+        with self._events_lock:
+            record = {"id": len(self.events), "event": event, "ts": round(now, 3),
+                      "elapsed": round(now - self.created_at, 3), **data}
+            self.events.append(record)
+        return record
+
+    def log(self, message: str, **data):
+        # Replaces bare print() log points: still printed, but also streamed to the client
+        log(message, self.correlation_id)
+        self.emit("log", message=message, **data)
+
+    def set_status(self, status: str, **data):
+        # Event first: once `done` is true the terminal event is already in the stream
+        self.emit("status", status=status, **data)
+        self.status = status
+
+    def events_since(self, last_id: int) -> list:
+        with self._events_lock:
+            return self.events[last_id + 1:]
+
+    @contextmanager
+    def stage(self, name: str, keep=None, **data):
+        # Wall-clock seconds per pipeline stage; repeated stages (render attempts, fixes) accumulate.
+        # keep() returning False files the timing under discarded_timings, e.g. for a candidate that
+        # lost while it ran, so it stays out of the trace and the published job's events.
+        self.emit("stage", stage=name, state="started", **data)
+        started_at = time.time()
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            seconds = round(time.perf_counter() - start, 4)
+            state = "finished" if ok else "aborted"
+            if keep is None or keep():
+                self.timings.setdefault(name, []).append(seconds)
+                with self._events_lock:
+                    self.spans.append({"name": name, "start": round(started_at - self.created_at, 4),
+                                       "seconds": seconds, "state": state, **data})
+                self.emit("stage", stage=name, state=state, seconds=seconds, **data)
+            else:
+                self.discarded_timings.setdefault(name, []).append(seconds)
+
+    def trace(self) -> dict:
+        # Spans are offsets from submission; queue time is derived rather than recorded
+        spans = list(self.spans)
+        if self.started_at:
+            spans.append({"name": "queued", "start": 0.0,
+                          "seconds": round(self.started_at - self.created_at, 4), "state": "finished"})
+        return {
+            "jobId": self.id,
+            "correlationId": self.correlation_id,
+            "status": self.status,
+            "totalSeconds": round((self.finished_at or time.time()) - self.created_at, 4),
+            "spans": sorted(spans, key=lambda span: span["start"]),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "jobId": self.id,
+            "correlationId": self.correlation_id,
+            "status": self.status,
+            "prompt": self.prompt,
+            "error": self.error,
+            "subscribers": self.subscribers,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "timings": self.timings,
+            "renderUsage": self.render_usage,
+            "partialMovieCache": self.partial_cache,
+        }
+
+
+# ====== BOUNDED WORKER POOL ======
+class JobQueue:
+    def __init__(self, handler, workers: int = 4, max_queue: int = 20, render_concurrency: int = 2, job_ttl: float = 3600,
+                 on_finish=None):
+        self.handler = handler
+        self.on_finish = on_finish  # called with each job once it reaches a terminal status
+        self.in_flight_renders = 0
+        self.max_queue = max_queue
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.coalesced = 0
+        self._in_flight = {}  # coalesce key -> unfinished job
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._render_slots = threading.BoundedSemaphore(render_concurrency)
+        self._threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, name=f"render-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    @property
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def submit(self, prompt: str, priority: int = 0, correlation_id: str = None) -> Job:
+        job = Job(prompt, priority, correlation_id)
+        with self._cond:
+            self._enqueue(job)
+        return job
+
+    def submit_coalesced(self, prompt: str, key: str, priority: int = 0, correlation_id: str = None) -> tuple:
+        # Returns (job, attached, token): an identical request already queued or running is shared, not
+        # repeated; token identifies this request when it cancels
+        with self._cond:
+            job = self._in_flight.get(key)
+            if job is not None and not job.done:
+                if priority < job.priority:
+                    self._promote(job, priority)
+                token = uuid.uuid4().hex
+                job.subscriber_tokens.add(token)
+                self.coalesced += 1
+                job.emit("coalesced", subscribers=job.subscribers)
+                return job, True, token
+            job = Job(prompt, priority, correlation_id)
+            job.coalesce_key = key
+            self._enqueue(job)
+            self._in_flight[key] = job
+        return job, False, job.owner_token
+
+    def _enqueue(self, job: Job):
+        self._prune()
+        if len(self._heap) >= self.max_queue:
+            raise QueueFull(f"Render queue is full ({self.max_queue} jobs waiting)")
+        self.jobs[job.id] = job
+        # Lower priority value runs first; seq keeps FIFO order within a priority
+        heapq.heappush(self._heap, (job.priority, next(self._seq), job))
+        self._cond.notify()
+
+    def _promote(self, job: Job, priority: int):
+        # A more urgent request attached to a queued job (e.g. a user asking for a topic a batch
+        # queued at low priority): the job moves up instead of making the user wait behind the batch
+        job.priority = priority
+        for index, entry in enumerate(self._heap):
+            if entry[2] is job:
+                self._heap[index] = (priority, entry[1], job)
+                heapq.heapify(self._heap)
+                break
+
+    def _release(self, job: Job):
+        with self._cond:
+            if job.coalesce_key and self._in_flight.get(job.coalesce_key) is job:
+                del self._in_flight[job.coalesce_key]
+
+    def add_completed(self, prompt: str, result: dict, correlation_id: str = None) -> Job:
+        # Registers an already-finished job, e.g. a result cache hit, so clients can poll it uniformly
+        job = Job(prompt, correlation_id=correlation_id)
+        job.result = result
+        job.started_at = job.finished_at = time.time()
+        job.set_status("succeeded", cached=True)
+        with self._cond:
+            self._prune()
+            self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Job:
+        return self.jobs.get(job_id)
+
+    def position(self, job: Job) -> int:
+        with self._cond:
+            ordered = sorted(self._heap)
+            for index, entry in enumerate(ordered):
+                if entry[2] is job:
+                    return index
+        return -1
+
+    def cancel(self, job_id: str, token: str = None) -> Job:
+        # token: the subscriber withdrawing; without one, only a job nobody else shares is cancelled
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if job is None or job.done:
+                return job
+            if token is not None:
+                if token not in job.subscriber_tokens:
+                    return job  # already withdrawn, or never attached: repeated DELETEs count once
+                if job.subscribers > 1:
+                    # Other clients still wait on this job; only the last one to cancel stops it
+                    job.subscriber_tokens.discard(token)
+                    return job
+            elif job.subscribers > 1:
+                return job
+            job.subscriber_tokens.clear()
+            job.cancel_event.set()
+            queued = [entry for entry in self._heap if entry[2] is job]
+            if queued:
+                self._heap.remove(queued[0])
+                heapq.heapify(self._heap)
+                job.finished_at = time.time()
+                job.set_status("cancelled")
+        if queued:
+            self._release(job)
+            if self.on_finish is not None:
+                self.on_finish(job)
+        return job
+
+    @contextmanager
+    def render_slot(self):
+        # Caps the number of concurrent manim renders independently of the worker count
+        self._render_slots.acquire()
+        with self._cond:
+            self.in_flight_renders += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight_renders -= 1
+            self._render_slots.release()
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id, job in list(self.jobs.items()):
+            if job.done and job.finished_at and job.finished_at < cutoff:
+                del self.jobs[job_id]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job = heapq.heappop(self._heap)
+            if job.cancel_event.is_set():
+                continue
+            job.started_at = time.time()
+            job.set_status("running")
+            status = "failed"
+            token = current_correlation_id.set(job.correlation_id)
+            try:
+                job.result = self.handler(job)
+                status = "succeeded"
+            except JobCancelled:
+                status = "cancelled"
+            except HTTPException as e:
+                job.error = e.detail
+                job.error_status = e.status_code
+            except Exception as e:
+                log(f"[JobQueue] Job {job.id} crashed: {e}")
+                job.error = f"Unexpected error: {e}"
+                job.error_status = 500
+            finally:
+                # finished_at first so a client that sees the terminal event also sees the timestamp
+                job.finished_at = time.time()
+                job.set_status(status, error=job.error)
+                current_correlation_id.reset(token)
+            self._release(job)
+            if self.on_finish is not None:
+                self.on_finish(job)
@@ -0,0 +1,230 @@
+import argparse
+import inspect
+import json
+import os
+import sys
+import tempfile
+import threading
+import traceback
+
+
+# Safe zone from build_gemini_prompt; anything past it plus the tolerance is reported
+MAX_X = 5.5
+MAX_Y = 2.8
+# Minimum share of the smaller box two mobjects must cover before it counts as an overlap
+OVERLAP_RATIO = 0.1
+REPORT_MARKER = "LAYOUT_REPORT "
+TEXT_CLASSES = ("Text", "MarkupText", "Paragraph", "SingleStringMathTex", "DecimalNumber", "Integer")
+
+
+# ====== GEOMETRY ======
+def intersection_area(a: dict, b: dict) -> float:
+    width = min(a["right"], b["right"]) - max(a["left"], b["left"])
+    height = min(a["top"], b["top"]) - max(a["bottom"], b["bottom"])
+    return width * height if width > 0 and height > 0 else 0.0
+
+
+def area(box: dict) -> float:
+    # Lines and dots still occupy some room
+    return max(box["right"] - box["left"], 0.05) * max(box["top"] - box["bottom"], 0.05)
+
+
+def overflow(box: dict, tolerance: float) -> dict:
+    limit_x, limit_y = MAX_X + tolerance, MAX_Y + tolerance
+    sides = {
+        "left": -limit_x - box["left"],
+        "right": box["right"] - limit_x,
+        "bottom": -limit_y - box["bottom"],
+        "top": box["top"] - limit_y,
+    }
+    return {side: round(amount, 2) for side, amount in sides.items() if amount > 0}
+
+
+def find_violations(snapshot: list, tolerance: float) -> list:
+    # snapshot: [{"id", "name", "text", "box"}] for the visible top-level mobjects after one step
+    found = []
+    for item in snapshot:
+        out = overflow(item["box"], tolerance)
+        if out:
+            found.append({"kind": "out_of_bounds", "mobjects": [item["name"]], "ids": [item["id"]],
+                          "box": item["box"], "overflow": out})
+    for i, a in enumerate(snapshot):
+        for b in snapshot[i + 1:]:
+            if not (a["text"] or b["text"]):
+                continue  # shapes drawn on top of each other are usually intended (axes, plots)
+            ratio = intersection_area(a["box"], b["box"]) / min(area(a["box"]), area(b["box"]))
+            # Text on text is always wrong; text over a shape only when it straddles the shape's edge
+            if ratio > OVERLAP_RATIO and (a["text"] and b["text"] or ratio < 1 - OVERLAP_RATIO):
+                found.append({"kind": "overlap", "mobjects": [a["name"], b["name"]], "ids": [a["id"], b["id"]],
+                              "boxes": [a["box"], b["box"]], "ratio": round(ratio, 2)})
+    return found
+
+
+# ====== SCENE INSTRUMENTATION (runs in the analyzer subprocess) ======
+def describe(mob) -> str:
+    label = getattr(mob, "text", None) or getattr(mob, "tex_string", None)
+    name = type(mob).__name__
+    return f"{name}({label[:40]!r})" if isinstance(label, str) and label else name
+
+
+def box_of(mob) -> dict:
+    from manim import DL, UR
+
+    (left, bottom, _), (right, top, _) = mob.get_critical_point(DL), mob.get_critical_point(UR)
+    return {"left": round(float(left), 2), "right": round(float(right), 2),
+            "bottom": round(float(bottom), 2), "top": round(float(top), 2)}
+
+
+def is_visible(mob) -> bool:
+    from manim import VMobject
+
+    members = mob.family_members_with_points()
+    for member in members:
+        if not isinstance(member, VMobject):
+            return True
+        if member.get_fill_opacity() > 0 or (member.get_stroke_opacity() > 0 and member.get_stroke_width() > 0):
+            return True
+    return False
+
+
+def is_text(mob) -> bool:
+    return any(cls.__name__ in TEXT_CLASSES for m in mob.get_family() for cls in type(m).__mro__)
+
+
+def snapshot(scene) -> list:
+    items = []
+    for mob in scene.mobjects:
+        if not mob.family_members_with_points() or not is_visible(mob):
+            continue
+        items.append({"id": id(mob), "name": describe(mob), "text": is_text(mob), "box": box_of(mob)})
+    return items
+
+
+def analyze(scene_file: str, scene_class: str, tolerance: float) -> dict:
+    # Builds every mobject and runs each play() with animations skipped, so no frames are rendered
+    from manim import Scene, tempconfig
+    from manim.renderer.cairo_renderer import CairoRenderer
+
+    scene_file = os.path.abspath(scene_file)
+    steps = []
+    findings = []
+    seen = set()
+    original_play, original_add = Scene.play, Scene.add
+
+    def caller_line():
+        frame = inspect.currentframe().f_back.f_back
+        while frame is not None:
+            if os.path.abspath(frame.f_code.co_filename) == scene_file:
+                return frame.f_lineno
+            frame = frame.f_back
+        return None
+
+    def record(scene, call: str, line):
+        if line is None:
+            return  # add() called by manim internals, not by the scene
+        state = snapshot(scene)
+        step = len(steps)
+        steps.append({"step": step, "call": call, "line": line, "mobjects": len(state)})
+        for violation in find_violations(state, tolerance):
+            key = (violation["kind"], tuple(sorted(violation.pop("ids"))))
+            if key not in seen:
+                seen.add(key)
+                findings.append({"step": step, "call": call, "line": line, **violation})
+
+    def play(self, *args, **kwargs):
+        line = caller_line()
+        self._layout_in_play = True  # animations add() their mobjects; only the finished step counts
+        try:
+            result = original_play(self, *args, **kwargs)
+        finally:
+            self._layout_in_play = False
+        record(self, "play", line)
+        return result
+
+    def add(self, *mobjects):
+        line = caller_line()
+        result = original_add(self, *mobjects)
+        if not getattr(self, "_layout_in_play", False):
+            record(self, "add", line)
+        return result
+
+    Scene.play, Scene.add = play, add
+    with open(scene_file) as f:
+        source = f.read()
+    with tempfile.TemporaryDirectory(prefix="layout_") as media, tempconfig({
+        "input_file": scene_file, "media_dir": media, "dry_run": True, "progress_bar": "none",
+        "verbosity": "ERROR", "preview": False,
+    }):
+        namespace = {"__name__": os.path.splitext(os.path.basename(scene_file))[0]}
+        exec(compile(source, scene_file, "exec"), namespace)
+        scene = namespace[scene_class](renderer=CairoRenderer(skip_animations=True))
+        scene.render()
+    return {"ok": True, "steps": len(steps), "findings": findings}
+
+
+# ====== REPORT HANDLING (API process) ======
+def parse_report(output: str):
+    for line in reversed(output.splitlines()):
+        if line.startswith(REPORT_MARKER):
+            return json.loads(line[len(REPORT_MARKER):])
+    return None
+
+
+def format_findings(findings: list, code: str, tolerance: float) -> str:
+    lines = code.splitlines()
+    out = [f"Layout check (safe zone |x| <= {MAX_X}, |y| <= {MAX_Y}, tolerance {tolerance}) found:"]
+    for f in findings:
+        where = f"line {f['line']} ({f['call']} #{f['step']})"
+        if f["kind"] == "out_of_bounds":
+            sides = ", ".join(f"{side} by {amount}" for side, amount in f["overflow"].items())
+            out.append(f"  {where}: {f['mobjects'][0]} leaves the safe zone ({sides}); box {f['box']}")
+        else:
+            out.append(f"  {where}: {f['mobjects'][0]} overlaps {f['mobjects'][1]} "
+                       f"({int(f['ratio'] * 100)}% of the smaller one); boxes {f['boxes']}")
+        if f["line"] and 0 < f["line"] <= len(lines):
+            out.append(f"    {lines[f['line'] - 1].strip()}")
+    return "\n".join(out)
+
+
+class LayoutStats:
+    def __init__(self):
+        self.outcomes = {}
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str):
+        # clean | findings | scene_error | unavailable
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            outcomes = dict(self.outcomes)
+        # Clean and crashing scenes skip the alignment LLM call entirely
+        skipped = outcomes.get("clean", 0) + outcomes.get("scene_error", 0)
+        return {"checked": sum(outcomes.values()), "outcomes": outcomes, "alignmentCallsSkipped": skipped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report overlaps and safe-zone violations in a manim scene")
+    parser.add_argument("scene_file")
+    parser.add_argument("scene_class", nargs="?", default="GeneratedScene")
+    parser.add_argument("--tolerance", type=float, default=0.7)
+    parser.add_argument("--tex-dir", help="Shared MathTex/Tex cache directory")
+    parser.add_argument("--tex-max-bytes", type=int, default=512 * 1024 ** 2)
+    args = parser.parse_args()
+
+    import manim  # noqa: F401  (without manim there is no report and the caller falls back)
+    if args.tex_dir:
+        import texcache
+        texcache.install(args.tex_dir, args.tex_max_bytes)
+    try:
+        report = analyze(args.scene_file, args.scene_class, args.tolerance)
+    except Exception:
+        # The scene itself is broken; the render/fix loop will report it properly
+        report = {"ok": False, "error": traceback.format_exc(limit=-3)}
+    print(REPORT_MARKER + json.dumps(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+
+# Run as `python limits.py CPU_SECONDS MEMORY_MB MAX_FILE_MB COMMAND...` to apply the limits and exec
+LIMITS_SCRIPT = os.path.abspath(__file__)
+
+
+# ====== RENDER LIMITS ======
+class RenderLimits:
+    def __init__(self, wall_seconds: float = 180, cpu_seconds: float = 300, memory_mb: int = 4096,
+                 max_file_mb: int = 512, max_log_bytes: int = 1024 * 1024):
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb  # address-space cap; 0 disables
+        self.max_file_mb = max_file_mb  # largest file a render may write
+        self.max_log_bytes = max_log_bytes  # captured stdout + stderr
+
+    def apply(self):
+        # Runs in the limits shim right before it execs the render, or at warm-worker startup
+        if self.cpu_seconds:
+            cpu = int(self.cpu_seconds)
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 5))
+        if self.memory_mb:
+            limit = self.memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if self.max_file_mb:
+            limit = self.max_file_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_FSIZE, (limit, limit))
+
+    def exec_shim(self, cmd: list) -> list:
+        # preexec_fn is not safe in a threaded server (the forked child can deadlock on a lock another
+        # thread held), so the limits are set by a small interpreter that then execs the command
+        return [sys.executable, LIMITS_SCRIPT, str(self.cpu_seconds), str(self.memory_mb),
+                str(self.max_file_mb), "--", *cmd]
+
+
+class RenderResult(subprocess.CompletedProcess):
+    # CompletedProcess plus why the render ended and what it cost
+    def __init__(self, args, returncode, stdout, stderr, kind="ok", wall_seconds=0.0,
+                 cpu_seconds=0.0, peak_rss_mb=0.0, log_truncated=False):
+        super().__init__(args, returncode, stdout, stderr)
+        self.kind = kind  # ok | error | timeout | cpu_limit | oom | output_limit | cancelled
+        self.log_truncated = log_truncated  # stdout/stderr were cut at max_log_bytes
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.peak_rss_mb = peak_rss_mb
+
+    def usage(self) -> dict:
+        return {
+            "kind": self.kind,
+            "wallSeconds": round(self.wall_seconds, 3),
+            "cpuSeconds": round(self.cpu_seconds, 3),
+            "peakRssMb": round(self.peak_rss_mb, 1),
+            "logTruncated": self.log_truncated,
+        }
+
+
+LIMIT_HINTS = {
+    "timeout": "RenderTimeout: the scene did not finish within {wall:.0f}s of wall-clock time. "
+               "Shorten self.wait() and run_time values, remove always-on updaters and keep Axes ranges small.",
+    "cpu_limit": "RenderCPULimit: the scene used more than {cpu:.0f}s of CPU time. "
+                 "Reduce the number of animations, sampled points and plotted ranges.",
+    "oom": "RenderOutOfMemory: the scene exceeded the {mem}MB memory limit. "
+           "Avoid huge Axes/NumberPlane ranges, dense point clouds and very long VGroups.",
+    "output_limit": "RenderOutputLimit: the render produced more output than allowed. "
+                    "Remove print loops and overly long animations.",
+}
+
+
+def describe_limit(result: RenderResult, limits: RenderLimits) -> str:
+    hint = LIMIT_HINTS.get(result.kind)
+    if not hint:
+        return ""
+    return hint.format(wall=limits.wall_seconds, cpu=limits.cpu_seconds, mem=limits.memory_mb)
+
+
+def classify(returncode: int, stderr: str, timed_out: bool, log_overflow: bool,
+             cpu_seconds: float, limits: RenderLimits, cancelled: bool = False) -> str:
+    if cancelled:
+        return "cancelled"
+    if timed_out:
+        return "timeout"
+    # Checked before success: a render that exited 0 with truncated output still overran its log budget
+    if log_overflow:
+        return "output_limit"
+    if returncode == 0:
+        return "ok"
+    # Python ignores SIGXFSZ, so an oversized file shows up as EFBIG instead of a signal
+    if returncode == -signal.SIGXFSZ or "File too large" in stderr:
+        return "output_limit"
+    if returncode == -signal.SIGXCPU or (
+        returncode == -signal.SIGKILL and limits.cpu_seconds and cpu_seconds >= limits.cpu_seconds
+    ):
+        return "cpu_limit"
+    if returncode == -signal.SIGKILL or "MemoryError" in stderr or "Cannot allocate memory" in stderr \
+            or "std::bad_alloc" in stderr:
+        return "oom"
+    return "error"
+
+
+# ====== LIMITED SUBPROCESS ======
+def peak_rss_mb(pid: int) -> float:
+    # VmHWM belongs to the exec'd image; ru_maxrss after fork+exec also counts the forked parent
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return 0.0
+
+
+def _drain(stream, chunks: list, budget: dict, on_line=None):
+    # Keeps reading so the child never blocks on a full pipe, but stops storing past the budget.
+    # Text mode translates the \r of tqdm progress bars into line breaks, so on_line sees each update.
+    for line in iter(stream.readline, ""):
+        if on_line is not None:
+            on_line(line)
+        if len(line) > budget["left"]:
+            budget["overflow"] = True
+        if budget["left"] > 0:
+            chunks.append(line[:budget["left"]])
+            budget["left"] -= len(line)
+    stream.close()
+
+
+def run_limited(cmd: list, limits: RenderLimits, cwd: str = None, cancel_event=None, on_line=None) -> RenderResult:
+    # A missing command would otherwise only show up as the shim's exit status
+    if shutil.which(cmd[0]) is None:
+        raise FileNotFoundError(f"Command not found: {cmd[0]}")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        limits.exec_shim(cmd), cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        start_new_session=True,
+    )
+    stdout, stderr = [], []
+    budget = {"left": limits.max_log_bytes, "overflow": False}
+    readers = [
+        threading.Thread(target=_drain, args=(proc.stdout, stdout, budget, on_line), daemon=True),
+        threading.Thread(target=_drain, args=(proc.stderr, stderr, budget, on_line), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = cancelled = False
+    sampled_rss = 0.0
+    while True:
+        # wait4 reaps the child and returns its own rusage, unlike RUSAGE_CHILDREN which is shared by all threads
+        pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            break
+        elapsed = time.perf_counter() - start
+        cancelled = cancel_event is not None and cancel_event.is_set()
+        if budget["overflow"] or cancelled or (limits.wall_seconds and elapsed > limits.wall_seconds):
+            timed_out = not budget["overflow"] and not cancelled
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            pid, status, usage = os.wait4(proc.pid, 0)
+            break
+        sampled_rss = max(sampled_rss, peak_rss_mb(proc.pid))
+        time.sleep(0.05)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    for reader in readers:
+        reader.join(timeout=5)
+
+    out, err = "".join(stdout), "".join(stderr)
+    cpu_seconds = usage.ru_utime + usage.ru_stime
+    kind = classify(proc.returncode, err, timed_out, budget["overflow"], cpu_seconds, limits, cancelled)
+    return RenderResult(
+        cmd, proc.returncode, out, err, kind=kind,
+        wall_seconds=time.perf_counter() - start,
+        cpu_seconds=cpu_seconds,
+        peak_rss_mb=sampled_rss or usage.ru_maxrss / 1024,  # ru_maxrss is in KiB on Linux
+        log_truncated=budget["overflow"],
+    )
+
+
+# ====== CAPACITY ACCOUNTING ======
+class ResourceAccounting:
+    def __init__(self):
+        self.renders = 0
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self.by_kind = {}
+        self._lock = threading.Lock()
+
+    def record(self, result: RenderResult):
+        with self._lock:
+            self.renders += 1
+            self.cpu_seconds += result.cpu_seconds
+            self.wall_seconds += result.wall_seconds
+            self.peak_rss_mb = max(self.peak_rss_mb, result.peak_rss_mb)
+            self.by_kind[result.kind] = self.by_kind.get(result.kind, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "renders": self.renders,
+                "cpuSeconds": round(self.cpu_seconds, 2),
+                "wallSeconds": round(self.wall_seconds, 2),
+                "peakRssMb": round(self.peak_rss_mb, 1),
+                "byOutcome": dict(self.by_kind),
+            }
+
+
+def main():
+    cpu_seconds, memory_mb, max_file_mb = sys.argv[1:4]
+    cmd = sys.argv[5:] if sys.argv[4:5] == ["--"] else sys.argv[4:]
+    RenderLimits(cpu_seconds=float(cpu_seconds), memory_mb=int(memory_mb), max_file_mb=int(max_file_mb)).apply()
+    # Same pid after exec, so wait4, killpg and /proc sampling in run_limited see the command itself
+    os.execvp(cmd[0], cmd)
+
+
+if __name__ == "__main__":
+    main()
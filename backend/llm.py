@@ -0,0 +1,271 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from jobs import log
+
+
+# ====== LLM ERRORS ======
+class LLMError(Exception):
+    pass
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+# google.api_core exception names worth retrying; matched by name so the fake backend needs no SDK
+TRANSIENT_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "Aborted", "GatewayTimeout", "LLMTimeout",
+}
+
+
+TIMEOUT_ERRORS = {"DeadlineExceeded", "GatewayTimeout", "LLMTimeout"}
+
+
+def is_transient(error: Exception) -> bool:
+    return type(error).__name__ in TRANSIENT_ERRORS or isinstance(error, (ConnectionError, TimeoutError))
+
+
+def is_timeout(error: Exception) -> bool:
+    return type(error).__name__ in TIMEOUT_ERRORS or isinstance(error, TimeoutError)
+
+
+def estimate_tokens(chars: int) -> int:
+    # Roughly 4 characters per token for English prose and Python source
+    return (chars + 3) // 4
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class LLMResponse:
+    # Same .text attribute as the Gemini SDK response, plus what the call cost
+    def __init__(self, text: str, input_tokens: int = 0, output_tokens: int = 0, latency: float = 0.0,
+                 attempts: int = 1, prompt_chars: int = 0):
+        self.text = text
+        self.prompt_chars = prompt_chars
+        self.response_chars = len(text or "")
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.latency = latency
+        self.attempts = attempts
+
+
+# ====== BACKENDS ======
+# A backend makes one attempt and returns (text, input_tokens, output_tokens).
+class GeminiBackend:
+    def __init__(self, model_name: str, api_key: str = ""):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        # One model object for the whole process, so every call shares its gRPC channel
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, timeout: float) -> tuple:
+        response = self.model.generate_content(prompt, request_options={"timeout": timeout})
+        usage = getattr(response, "usage_metadata", None)
+        return (
+            response.text,  # raises ValueError when the response was blocked
+            getattr(usage, "prompt_token_count", 0) or 0,
+            getattr(usage, "candidates_token_count", 0) or 0,
+        )
+
+
+# Follows the mandatory scene structure from the generation prompt (title, content, clear, conclusion)
+FAKE_SCENE = '''from manim import *
+
+class GeneratedScene(Scene):
+    def construct(self):
+        self.create_title()
+        self.show_main_content()
+        self.wait(1)
+        self.clear_screen()
+        self.create_conclusion()
+        self.wait(1)
+
+    def create_title(self):
+        title = Text({title!r}, font_size=40, color=BLUE)
+        title.to_edge(UP, buff=0.8)
+        self.play(Write(title), run_time=1)
+
+    def show_main_content(self):
+        square = Square(side_length=2, color=GREEN)
+        self.play(Create(square), run_time=1)
+
+    def clear_screen(self):
+        self.play(FadeOut(Group(*self.mobjects)), run_time=1)
+
+    def create_conclusion(self):
+        conclusion = Text("Conclusion", font_size=36, color=GREEN)
+        self.play(Write(conclusion), run_time=1)
+'''
+# Where alignment and fix prompts embed the scene being repaired
+CODE_BLOCK = re.compile(
+    r"(?:--- (?:ORIGINAL )?CODE START ---|Return COMPLETE corrected Manim script)\n(.*?)\n--- (?:ORIGINAL )?CODE END ---",
+    re.DOTALL,
+)
+
+
+class FakeLLMBackend:
+    # Offline stand-in for Gemini. Replays recorded responses by prompt hash; prompts that were
+    # never recorded get a deterministic answer (a small scene for generation, the submitted
+    # code echoed back for alignment and fix prompts) after a simulated latency.
+    def __init__(self, replay_path: str = None, latency: float = 0.5, chars_per_second: float = 2000.0):
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.calls = 0
+        self.replayed = 0
+        self.recorded = {}
+        if replay_path and os.path.exists(replay_path):
+            with open(replay_path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.recorded[record["key"]] = record["text"]
+
+    def respond(self, prompt: str) -> str:
+        if prompt_key(prompt) in self.recorded:
+            self.replayed += 1
+            return self.recorded[prompt_key(prompt)]
+        code = CODE_BLOCK.search(prompt)
+        if code:
+            return code.group(1)
+        topic = re.search(r"^Topic\s*:\s*(.+)$", prompt, re.MULTILINE)
+        topic = topic.group(1).strip() if topic else "concept"
+        return (FAKE_SCENE.format(title=topic.title()[:40]) + "\n---EXPLANATION_STARTS_HERE---\n"
+                f"Let's explore {topic} step by step. First we introduce the idea, then we draw it.")
+
+    def generate(self, prompt: str, timeout: float) -> tuple:
+        self.calls += 1
+        text = self.respond(prompt)
+        delay = self.latency + len(text) / self.chars_per_second
+        if delay > timeout:
+            time.sleep(timeout)
+            raise LLMTimeout(f"Fake LLM call exceeded {timeout:.1f}s")
+        time.sleep(delay)
+        return text, estimate_tokens(len(prompt)), estimate_tokens(len(text))
+
+
+# ====== CLIENT ======
+class LLMClient:
+    def __init__(self, backend, max_concurrency: int = 4, timeout: float = 120, max_retries: int = 3,
+                 backoff: float = 1.0, max_backoff: float = 20.0, record_path: str = None, on_call=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.record_path = record_path
+        # on_call(purpose, seconds, outcome, input_tokens, output_tokens, prompt_chars, response_chars) after
+        # every call, e.g. for metrics
+        self.on_call = on_call
+        # Callers beyond the limit queue here instead of all hitting the API at once
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _account(self, purpose: str, **amounts):
+        with self._lock:
+            entry = self._stats.setdefault(purpose, {
+                "calls": 0, "errors": 0, "retries": 0, "timeouts": 0, "inputTokens": 0, "outputTokens": 0,
+                "promptChars": 0, "responseChars": 0, "latencySeconds": 0.0, "queueSeconds": 0.0,
+            })
+            for name, amount in amounts.items():
+                entry[name] += amount
+
+    def _notify(self, purpose: str, seconds: float, outcome: str, input_tokens: int = 0, output_tokens: int = 0,
+                prompt_chars: int = 0, response_chars: int = 0):
+        if self.on_call is not None:
+            self.on_call(purpose, seconds, outcome, input_tokens, output_tokens, prompt_chars, response_chars)
+
+    def _record(self, prompt: str, text: str):
+        with self._lock, open(self.record_path, "a") as f:
+            f.write(json.dumps({"key": prompt_key(prompt), "text": text}) + "\n")
+
+    def generate(self, prompt: str, purpose: str = "default", deadline: float = None) -> LLMResponse:
+        # deadline is in seconds for the whole call, including queueing and retries
+        start = time.perf_counter()
+        deadline = deadline or self.timeout
+        if not self._slots.acquire(timeout=deadline):
+            self._account(purpose, calls=1, errors=1, timeouts=1, queueSeconds=deadline)
+            self._notify(purpose, 0.0, "timeout")
+            raise LLMTimeout(f"LLM call '{purpose}' waited {deadline:.0f}s for a free slot")
+        queued = time.perf_counter() - start
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                remaining = deadline - (time.perf_counter() - start)
+                try:
+                    if remaining <= 0:
+                        raise LLMTimeout(f"LLM call '{purpose}' exceeded its {deadline:.0f}s deadline")
+                    text, input_tokens, output_tokens = self.backend.generate(prompt, remaining)
+                    break
+                except Exception as e:
+                    remaining = deadline - (time.perf_counter() - start)
+                    if not is_transient(e) or attempt > self.max_retries or remaining <= 0:
+                        # A prompt that was sent is paid for (in latency at least) even when the call fails
+                        timed_out = is_timeout(e)
+                        self._account(purpose, calls=1, errors=1, retries=attempt - 1,
+                                      timeouts=int(timed_out), queueSeconds=queued,
+                                      latencySeconds=time.perf_counter() - start - queued,
+                                      promptChars=len(prompt) * attempt)
+                        self._notify(purpose, time.perf_counter() - start - queued,
+                                     "timeout" if timed_out else "error",
+                                     prompt_chars=len(prompt) * attempt)
+                        if isinstance(e, LLMError) or not is_transient(e):
+                            raise
+                        # Out of retries on a rate limit or outage: callers handle LLMError, not SDK types
+                        error = LLMTimeout if timed_out else LLMError
+                        raise error(f"LLM call '{purpose}' failed after {attempt} attempts: "
+                                    f"{type(e).__name__}: {e}") from e
+                    # Full jitter keeps concurrent retries from hitting the API in lockstep
+                    delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+                    log(f"[LLM] {purpose} attempt {attempt} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                    time.sleep(min(delay, max(remaining, 0)))
+        finally:
+            self._slots.release()
+
+        latency = time.perf_counter() - start - queued
+        # Retried attempts resend the whole prompt
+        prompt_chars, response_chars = len(prompt) * attempt, len(text or "")
+        self._account(purpose, calls=1, retries=attempt - 1, inputTokens=input_tokens, outputTokens=output_tokens,
+                      latencySeconds=latency, queueSeconds=queued, promptChars=prompt_chars,
+                      responseChars=response_chars)
+        self._notify(purpose, latency, "ok", input_tokens, output_tokens, prompt_chars, response_chars)
+        if self.record_path:
+            self._record(prompt, text)
+        return LLMResponse(text, input_tokens, output_tokens, latency, attempt, len(prompt))
+
+    async def agenerate(self, prompt: str, purpose: str = "default", deadline: float = None) -> LLMResponse:
+        # Shares the sync path's slots, retries and accounting; the blocking SDK call runs in a thread
+        return await asyncio.to_thread(self.generate, prompt, purpose, deadline)
+
+    def stats(self) -> dict:
+        with self._lock:
+            purposes = {name: dict(entry) for name, entry in self._stats.items()}
+        for entry in purposes.values():
+            ok = entry["calls"] - entry["errors"]
+            entry["meanLatencySeconds"] = round(entry["latencySeconds"] / ok, 3) if ok else 0.0
+            # Estimated from characters: comparable across backends and for calls that reported no usage
+            entry["estimatedPromptTokens"] = estimate_tokens(entry["promptChars"])
+            entry["estimatedResponseTokens"] = estimate_tokens(entry["responseChars"])
+            entry["meanPromptChars"] = round(entry["promptChars"] / entry["calls"]) if entry["calls"] else 0
+            entry["latencySeconds"] = round(entry["latencySeconds"], 3)
+            entry["queueSeconds"] = round(entry["queueSeconds"], 3)
+        return purposes
+
+
+def create_llm_client(backend: str, model_name: str = "gemini-2.5-pro", api_key: str = "",
+                      replay_path: str = None, latency: float = 0.5, **options) -> LLMClient:
+    if backend == "fake":
+        return LLMClient(FakeLLMBackend(replay_path, latency=latency), **options)
+    if backend == "gemini":
+        return LLMClient(GeminiBackend(model_name, api_key), **options)
+    raise ValueError(f"Unknown LLM backend: {backend}")
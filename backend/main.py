@@ -1,24 +1,233 @@
+import asyncio
+import contextvars
+import json
 import os
 import re
+import shutil
+import sqlite3
 import subprocess
+import sys
+import threading
+import time
 import uuid
-from fastapi import FastAPI, HTTPException
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed, wait
+from contextlib import ExitStack, nullcontext
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import google.generativeai as genai
-from elevenlabs.client import ElevenLabs
-from elevenlabs import save
 from dotenv import load_dotenv
+from jobs import Job, JobCancelled, JobQueue, QueueFull, log
+from cache import ResultCache, cache_key
+from similarity import PromptIndex
+from tts import create_tts_client
+from narration import ChunkCache, Narrator, captions_filename
+from streaming import (
+    ImmutableStaticFiles, concat_lossless, extract_poster, ffmpeg_available, hls_dirname, mux_faststart,
+    probe_duration, segment_hls,
+)
+from validator import SceneValidator, format_diagnostics
+from render_pool import WarmRenderPool
+import texcache
+from limits import RenderLimits, ResourceAccounting, describe_limit, run_limited
+from progress import ManimProgress, format_sse
+from rewrites import RewriteEngine, error_signature, failing_line
+from layout import LayoutStats, format_findings, parse_report
+from llm import LLMError, create_llm_client
+from metrics import DiskUsage, Registry
+from janitor import Janitor
+from catalog import Catalog
+from batches import BatchRunner, BatchStore, dedupe_topics
+from templates import TemplateRegistry, TemplateStats
+from distill import DistillStats, distill_error, record_failure
+from coalesce import LeaseStore
+from speculative import Candidate, LinkedEvent, SpeculationStats
+from sections import SectionStats, plan_sections
+from workspace import (
+    SCENE_CLASS, SCENE_FILENAME, job_workspace, media_dir, partial_cache_counts,
+    partial_cache_report, rendered_video_path, scene_path, section_module,
+)
 load_dotenv()
 
 
-# ====== CONFIGURE GEMINI ======
-genai.configure(api_key="")
+# ====== METRICS (served as Prometheus text on /metrics) ======
+metrics = Registry()
+llm_call_seconds = metrics.histogram("pipeline_llm_call_seconds", "Gemini call latency", ("purpose", "outcome"))
+llm_calls = metrics.counter("pipeline_llm_calls_total", "Gemini calls by outcome", ("purpose", "outcome"))
+llm_tokens = metrics.counter("pipeline_llm_tokens_total", "Gemini tokens", ("purpose", "direction"))
+llm_chars = metrics.counter("pipeline_llm_chars_total", "Characters sent to and received from Gemini",
+                            ("purpose", "direction"))
+llm_prompt_chars = metrics.histogram("pipeline_llm_prompt_chars", "Prompt size per Gemini call", ("purpose",),
+                                     buckets=(1000, 2000, 4000, 8000, 16000, 32000, 64000))
+render_seconds = metrics.histogram("pipeline_render_seconds", "Render attempt duration by outcome", ("outcome",))
+render_attempts = metrics.histogram("pipeline_render_attempts", "Render attempts per request", buckets=(1, 2, 3, 4, 5, 6))
+fix_loop_depth = metrics.histogram("pipeline_fix_loop_depth", "Gemini fix calls per request", buckets=(0, 1, 2, 3, 4, 5))
+narration_seconds = metrics.histogram("pipeline_tts_seconds", "Narration synthesis latency", buckets=(0.5, 1, 2, 5, 10, 20, 60))
+jobs_total = metrics.counter("pipeline_jobs_total", "Video requests by final status", ("status",))
+job_seconds = metrics.histogram("pipeline_job_seconds", "Submission to finish of a video request", ("status",))
+coalesced_requests = metrics.counter(
+    "pipeline_coalesced_requests_total", "Requests served by an identical in-flight job", ("scope",))
+reclaimed_bytes = metrics.counter("pipeline_janitor_reclaimed_bytes_total", "Bytes removed by the disk janitor", ("kind",))
+
+def observe_llm_call(purpose: str, seconds: float, outcome: str, input_tokens: int, output_tokens: int,
+                     prompt_chars: int, response_chars: int):
+    llm_call_seconds.observe(seconds, purpose=purpose, outcome=outcome)
+    llm_calls.inc(purpose=purpose, outcome=outcome)
+    llm_tokens.inc(input_tokens, purpose=purpose, direction="input")
+    llm_tokens.inc(output_tokens, purpose=purpose, direction="output")
+    llm_chars.inc(prompt_chars, purpose=purpose, direction="input")
+    llm_chars.inc(response_chars, purpose=purpose, direction="output")
+    if prompt_chars:
+        llm_prompt_chars.observe(prompt_chars, purpose=purpose)
 
-model = genai.GenerativeModel("gemini-2.5-pro")
+# ====== CONFIGURE GEMINI ======
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")  # "fake" replays recorded responses offline
+LLM_MODEL = "gemini-2.5-pro"
+# Every Gemini call goes through one client: shared model, bounded concurrency, deadline and retries
+llm = create_llm_client(
+    LLM_BACKEND,
+    model_name=LLM_MODEL,
+    api_key=os.getenv("GEMINI_API_KEY", ""),
+    replay_path=os.getenv("LLM_REPLAY_PATH"),
+    max_concurrency=int(os.getenv("LLM_CONCURRENCY", "4")),
+    timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "120")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+    record_path=os.getenv("LLM_RECORD_PATH"),  # append real responses for later offline replay
+    on_call=observe_llm_call,
+)
 
 # ====== CONFIGURE ELEVENLABS ======
+# ElevenLabs voice_id (the API does not take voice names); defaults to the premade "Rachel" voice
+TTS_VOICE = os.getenv("TTS_VOICE_ID", "21m00Tcm4TlvDQ8kWXD6")
+TTS_MODEL = "eleven_multilingual_v2"
+TTS_BACKEND = os.getenv("TTS_BACKEND", "elevenlabs")  # "fake" runs offline with silent audio
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "2"))
+# Longest a finished render waits for its narration; past this the video is published without audio
+TTS_WAIT_SECONDS = float(os.getenv("TTS_WAIT_SECONDS", "120"))
+
+# Sentence chunks synthesized at most this many at a time across all narrations
+TTS_CHUNK_CONCURRENCY = int(os.getenv("TTS_CHUNK_CONCURRENCY", "4"))
+# Chunks are cached by (text, voice, model), so stock intros and conclusions are synthesized once
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join("cache", "tts"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+
+tts_client = create_tts_client(TTS_BACKEND, api_key=os.getenv("ELEVENLABS_API_KEY"))
+tts_executor = ThreadPoolExecutor(max_workers=TTS_CONCURRENCY, thread_name_prefix="tts")
+narrator = Narrator(
+    tts_client, TTS_VOICE, TTS_MODEL,
+    ChunkCache(TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES),
+    concurrency=TTS_CHUNK_CONCURRENCY,
+)
+
+# ====== CONFIGURE RENDER WORKERS ======
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "20"))
+# Finished jobs (and the results they serve) are kept this long
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", "2"))
+# "cli" spawns `manim` per attempt; "warm" reuses long-lived workers that import manim once
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "cli")
+RENDER_WORKER_MAX_JOBS = int(os.getenv("RENDER_WORKER_MAX_JOBS", "50"))
+RENDER_WORKER_MAX_RSS_MB = float(os.getenv("RENDER_WORKER_MAX_RSS_MB", "1500"))
+# Hard caps per render attempt; a killed render is reported to the fix loop as timeout/OOM/etc.
+render_limits = RenderLimits(
+    wall_seconds=float(os.getenv("RENDER_TIMEOUT_SECONDS", "180")),
+    cpu_seconds=float(os.getenv("RENDER_CPU_SECONDS", "300")),
+    memory_mb=int(os.getenv("RENDER_MEMORY_MB", "4096")),
+    max_file_mb=int(os.getenv("RENDER_MAX_FILE_MB", "512")),
+    max_log_bytes=int(os.getenv("RENDER_MAX_LOG_BYTES", str(1024 * 1024))),
+)
+render_accounting = ResourceAccounting()
+# Each job renders inside its own scratch directory, removed when the job finishes
+SCRATCH_ROOT = os.getenv("SCRATCH_ROOT", "scratch")
+# MathTex/Tex SVGs shared by every render and retry; set TEX_CACHE_DIR="" to use manim's per-media-dir cache
+TEX_CACHE_DIR = os.getenv("TEX_CACHE_DIR", "tex_cache")
+if TEX_CACHE_DIR:
+    TEX_CACHE_DIR = os.path.abspath(TEX_CACHE_DIR)  # renders run with their scratch dir as cwd
+TEX_CACHE_MAX_BYTES = int(os.getenv("TEX_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+TEXCACHE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "texcache.py")
+# The alignment LLM pass only runs when the local layout check finds overlaps or safe-zone violations
+LAYOUT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layout.py")
+LAYOUT_TOLERANCE = float(os.getenv("LAYOUT_TOLERANCE", "0.7"))  # scene units past MAX_X/MAX_Y
+
+# ====== CONFIGURE RESULT CACHE ======
+# Bump PROMPT_TEMPLATE_VERSION whenever build_gemini_prompt changes so stale renders are not reused
+PROMPT_TEMPLATE_VERSION = "1"
+RENDER_QUALITY = "480p15"  # matches manim -ql
+CACHE_DB = os.getenv("CACHE_DB", os.path.join("cache", "results.sqlite3"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+CACHE_MAX_AGE_DAYS = float(os.getenv("CACHE_MAX_AGE_DAYS", "30"))
+# Minimum similarity for serving an existing render to a paraphrased prompt (>1 disables): n-gram
+# cosine scaled by topic-word overlap, numbers and single letters must match exactly. Tuned with
+# bench_similarity.py: every labelled paraphrase scores 1.0, the closest near miss 0.67.
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.8"))
+# Signature -> local rewrite success rates; rules below the rate are retired in favour of Gemini
+REWRITE_DB = os.getenv("REWRITE_DB", os.path.join("cache", "rewrites.sqlite3"))
+# Fix prompts carry the final exception, relevant frames and the failing line instead of manim's
+# whole stdout/stderr; DISTILL_ERRORS=0 pastes the raw output as before
+DISTILL_ERRORS = os.getenv("DISTILL_ERRORS", "1") == "1"
+ERROR_CONTEXT_LINES = int(os.getenv("ERROR_CONTEXT_LINES", "3"))
+# Append every failed attempt (topic, scene, raw error) here to build a corpus for bench_prompts.py
+FAILURE_RECORD_PATH = os.getenv("FAILURE_RECORD_PATH")
+
+# ====== CONFIGURE DISK JANITOR ======
+# videos/ + audio/ budget outside the catalog; orphans go first, then least-recently-used cached results
+ASSET_QUOTA_BYTES = int(os.getenv("ASSET_QUOTA_BYTES", str(5 * 1024 ** 3)))
+# Assets no cached result or live job points at (e.g. /generate-audio output) are kept this long
+ORPHAN_RETENTION_HOURS = float(os.getenv("ORPHAN_RETENTION_HOURS", "24"))
+JANITOR_INTERVAL_SECONDS = float(os.getenv("JANITOR_INTERVAL_SECONDS", "900"))
+
+# ====== CONFIGURE SPECULATIVE CANDIDATES ======
+# Opt-in: K>1 asks Gemini for K scenes at once, runs each through validate/render/fix in parallel and
+# keeps the first video; the rest are cancelled. K=1 is the sequential generate -> render -> fix loop.
+SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", "1"))
+# CPU budget: renders of one job's candidates running at once (the global RENDER_CONCURRENCY still applies)
+SPECULATIVE_MAX_PARALLEL_RENDERS = int(os.getenv("SPECULATIVE_MAX_PARALLEL_RENDERS", "2"))
+
+# ====== CONFIGURE SECTION RENDERING ======
+# Opt-in: a scene whose construct() is a run of step methods with full-screen clears between them is
+# split at the clears, the sections render as parallel manim processes and the clips are joined with a
+# stream copy. Scenes the split cannot prove independent (state kept on self across a clear, statements
+# between steps, camera scenes) and any failed section attempt render in one process as before.
+SECTION_RENDER = os.getenv("SECTION_RENDER", "0") == "1"
+SECTION_MAX_PARALLEL = int(os.getenv("SECTION_MAX_PARALLEL", "3"))  # per render attempt, within RENDER_CONCURRENCY
+
+# ====== CONFIGURE REQUEST COALESCING ======
+# Identical prompts in flight share one job; across uvicorn workers through a lease in this database
+LEASE_DB = os.getenv("LEASE_DB", os.path.join("cache", "leases.sqlite3"))
+LEASE_SECONDS = float(os.getenv("LEASE_SECONDS", "60"))  # renewed while the leader runs
+
+# ====== CONFIGURE PROGRESS STREAMING ======
+SSE_POLL_SECONDS = 0.25
+SSE_KEEPALIVE_SECONDS = 15
+
+# ====== CONFIGURE SCENE TEMPLATES ======
+# Prompts the topic classifier maps to a verified scene template (templates.py) are rendered from it
+# with no Gemini calls; a template that fails to render falls back to the Gemini pipeline
+USE_TEMPLATES = os.getenv("USE_TEMPLATES", "1") == "1"
+
+# ====== CONFIGURE BATCH PRE-GENERATION ======
+# Batches (POST /batches, batch_generate.py) go through the same workers, queued behind interactive
+# requests and at most BATCH_MAX_IN_FLIGHT jobs at a time; their progress survives restarts
+BATCH_DB = os.getenv("BATCH_DB", os.path.join("cache", "batches.sqlite3"))
+BATCH_PRIORITY = 10  # interactive requests are 0; lower runs first
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "1"))
+BATCH_MAX_TOPICS = 500
+
+# ====== CONFIGURE VIDEO CATALOG ======
+# Every published video with its poster frame, listed newest first and searchable by /catalog.
+# Catalogued videos and audio are pinned: cache eviction and janitor sweeps leave them in place.
+CATALOG_DB = os.getenv("CATALOG_DB", os.path.join("cache", "catalog.sqlite3"))
+THUMBNAILS_DIR = "thumbnails"
+POSTER_POSITION = 0.4  # fraction of the video: past the title card, before the closing screen
+
+# ====== CONFIGURE OUTPUT PACKAGING ======
+# Narration is muxed into one faststart mp4 when ffmpeg is on PATH; otherwise video and audio stay separate
+MUX_AUDIO = os.getenv("MUX_AUDIO", "1") == "1"
+# HLS segments let playback start after the first segment instead of after the moov atom and first bytes
+ENABLE_HLS = os.getenv("ENABLE_HLS", "0") == "1"
+HLS_SEGMENT_SECONDS = float(os.getenv("HLS_SEGMENT_SECONDS", "4"))
+FFMPEG_TIMEOUT_SECONDS = float(os.getenv("FFMPEG_TIMEOUT_SECONDS", "120"))
 
 
 # ====== FASTAPI APP SETUP ======
@@ -34,9 +243,33 @@ app.add_middleware(
 
 # Ensure media folders exist & serve
 os.makedirs("videos", exist_ok=True)
-app.mount("/videos", StaticFiles(directory="videos"), name="videos")
+app.mount("/videos", ImmutableStaticFiles(directory="videos"), name="videos")
 os.makedirs("audio", exist_ok=True)
-app.mount("/audio", StaticFiles(directory="audio"), name="audio")
+app.mount("/audio", ImmutableStaticFiles(directory="audio"), name="audio")
+os.makedirs(THUMBNAILS_DIR, exist_ok=True)
+app.mount("/thumbnails", ImmutableStaticFiles(directory=THUMBNAILS_DIR), name="thumbnails")
+
+catalog = Catalog(CATALOG_DB, thumbnails_dir=THUMBNAILS_DIR)
+result_cache = ResultCache(
+    CACHE_DB,
+    max_bytes=CACHE_MAX_BYTES,
+    max_age=CACHE_MAX_AGE_DAYS * 86400,
+    pinned=catalog.asset_files,
+)
+prompt_index = PromptIndex()
+scene_validator = SceneValidator()
+rewrite_engine = RewriteEngine(REWRITE_DB)
+layout_stats = LayoutStats()
+lease_store = LeaseStore(LEASE_DB, lease_seconds=LEASE_SECONDS)
+speculation_stats = SpeculationStats()
+section_stats = SectionStats()
+distill_stats = DistillStats()
+template_registry = TemplateRegistry()
+template_stats = TemplateStats()
+for name, reason in template_registry.disabled.items():
+    log(f"[Templates] {name} disabled: {reason}")
+disk_usage = DiskUsage(["videos", "audio", THUMBNAILS_DIR, "media", SCRATCH_ROOT, "cache"])
+metrics.gauge("pipeline_disk_usage_bytes", "Bytes on disk per directory", ("dir",), collect=disk_usage.measure)
 
 # ====== REQUEST SCHEMA ======
 class PromptRequest(BaseModel):
@@ -45,6 +278,9 @@ class PromptRequest(BaseModel):
 class AudioRequest(BaseModel):
     text: str
 
+class BatchRequest(BaseModel):
+    topics: list[str]
+
 # ====== DEFAULT GEMINI PROMPT BUILDER ======
 def build_gemini_prompt(topic: str) -> str:
     return f"""
@@ -474,14 +710,33 @@ Return COMPLETE corrected Manim script
 {manim_code}
 --- CODE END ---
 """
-def enforce_alignment_with_gemini(manim_code: str) -> str:
+def build_layout_fix_prompt(manim_code: str, findings: str) -> str:
+    return f"""
+You are a MANIM COMMUNITY ALIGNMENT SPECIALIST. A layout check of the script below found these problems:
+
+{findings}
+
+Instructions:
+1. Fix ONLY the listed problems; keep the animation logic, text and order of steps unchanged.
+2. Keep every object inside the safe zone (MAX_X=5.5, MAX_Y=2.8); prefer to_edge/next_to/move_to with buff over hardcoded coordinates.
+3. Separate overlapping objects with next_to(..., buff=0.4) or by scaling them down; remove or fade out objects that are no longer needed.
+4. Keep the class name GeneratedScene(Scene).
+5. Return ONLY the complete corrected Python code. No explanations, no markdown.
+
+--- CODE START ---
+{manim_code}
+--- CODE END ---
+"""
+
+def enforce_alignment_with_gemini(manim_code: str, findings: str = None) -> str:
     try:
-        prompt = build_alignment_prompt(manim_code)
-        response = model.generate_content(prompt)  # model is already configured
+        # Specific findings replace the long generic checklist when the layout check ran
+        prompt = build_layout_fix_prompt(manim_code, findings) if findings else build_alignment_prompt(manim_code)
+        response = llm.generate(prompt, purpose="alignment")
         fixed_code = clean_manim_code(response.text or manim_code)
         return fixed_code
     except Exception as e:
-        print(f"[Alignment Gemini] Failed: {e}")
+        log(f"[Alignment Gemini] Failed: {e}")
         return manim_code  # Fallback: return original code
 
 # ====== FIX PROMPT BUILDER ======
@@ -511,133 +766,748 @@ Instructions:
 8. Do not attempt to run manim or reference local file paths.
 """
 
-# ====== AUDIO GENERATION ENDPOINT ======
+# ====== AUDIO GENERATION ======
+def synthesize_audio_file(text: str) -> str:
+    narration = narrator.narrate(text)
+    audio_filename = f"audio_{uuid.uuid4().hex}.mp3"
+    audio_path = os.path.join("audio", audio_filename)
+    with open(audio_path, "wb") as f:
+        f.write(narration.audio)
+    with open(os.path.join("audio", captions_filename(audio_filename)), "w") as f:
+        json.dump(narration.chunks, f)
+    return audio_filename
+
+def load_captions(audio_filename):
+    # Per-sentence start/end times for subtitles; None for tracks made before chunking
+    if not audio_filename:
+        return None
+    try:
+        with open(os.path.join("audio", captions_filename(audio_filename))) as f:
+            return [{"text": c["text"], "start": c["start"], "end": c["end"]} for c in json.load(f)]
+    except (OSError, ValueError):
+        return None
+
+def start_narration(job: Job, transcript: str):
+    # Narration only depends on the transcript, so it runs alongside the render/fix loop
+    def run():
+        start = time.perf_counter()
+        with job.stage("tts"):
+            audio_filename = synthesize_audio_file(transcript)
+        narration_seconds.observe(time.perf_counter() - start)
+        return audio_filename
+    # A copy of the context keeps the job's correlation id on the narration thread's log lines
+    return tts_executor.submit(contextvars.copy_context().run, run)
+
+def discard_narration(audio_future):
+    # Cancel narration that has not started yet; otherwise delete its file once it lands
+    if audio_future.cancel():
+        return
+    def remove(future):
+        try:
+            audio_filename = future.result()
+            os.remove(os.path.join("audio", audio_filename))
+            os.remove(os.path.join("audio", captions_filename(audio_filename)))
+        except Exception:
+            pass
+    audio_future.add_done_callback(remove)
+
 @app.post("/generate-audio")
 def generate_audio(request: AudioRequest):
     try:
-        audio = elevenlabs_client.generate(
-            text=request.text,
-            voice="Rachel",
-            model="eleven_multilingual_v2"
-        )
-        audio_filename = f"audio_{uuid.uuid4().hex}.mp3"
-        audio_path = os.path.join("audio", audio_filename)
-        save(audio, audio_path)
+        audio_filename = synthesize_audio_file(request.text)
         audio_url = f"http://localhost:8000/audio/{audio_filename}"
-        return {"audioUrl": audio_url}
+        return {"audioUrl": audio_url, "captions": load_captions(audio_filename)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating audio: {e}")
 
-# ====== HYBRID VIDEO GENERATION ENDPOINT (with retry/fix loop) ======
-@app.post("/generate-video")
-def generate_video(request: PromptRequest):
-    prompt = request.prompt.strip().lower()
-    print(f"Prompt received: {prompt}")
-    gemini_prompt = build_gemini_prompt(prompt)
+# ====== RESULT CACHE HELPERS ======
+def prompt_cache_key(prompt: str) -> str:
+    return cache_key(prompt, PROMPT_TEMPLATE_VERSION, RENDER_QUALITY, TTS_VOICE)
+
+def hls_url(video_filename: str):
+    playlist = os.path.join(hls_dirname(video_filename), "index.m3u8")
+    if os.path.exists(os.path.join("videos", playlist)):
+        return f"http://localhost:8000/videos/{playlist}"
+    return None
+
+def cached_result(entry: dict) -> dict:
+    audio_file = entry["audio_file"]
+    return {
+        "videoUrl": f"http://localhost:8000/videos/{entry['video_file']}",
+        "hlsUrl": hls_url(entry["video_file"]),
+        "audioUrl": f"http://localhost:8000/audio/{audio_file}" if audio_file else None,
+        "transcript": entry["transcript"],
+        "captions": load_captions(audio_file),
+        "title": entry["title"],
+        "cached": True,
+    }
+
+def load_prompt_index():
+    # Only index entries rendered with the current template/quality/voice settings
+    for key, prompt in result_cache.entries():
+        if key == prompt_cache_key(prompt):
+            prompt_index.add(key, prompt)
+    log(f"[PromptIndex] Loaded {len(prompt_index)} prompts")
+
+def template_cache_key(match) -> str:
+    # Differently worded prompts for the same template and parameters share one render
+    params = json.dumps(match.params, sort_keys=True)
+    return cache_key(f"template:{match.template.name}:{params}", f"template-{match.template.version}",
+                     RENDER_QUALITY, TTS_VOICE)
+
+def find_existing_render(prompt: str):
+    entry = result_cache.get(prompt_cache_key(prompt))
+    if entry:
+        return cached_result(entry)
+    match = template_registry.match(prompt) if USE_TEMPLATES else None
+    if match:
+        start = time.perf_counter()
+        entry = result_cache.get(template_cache_key(match))
+        if entry is None:
+            return None  # rendered from the template by a worker rather than guessed by similarity
+        template_stats.record(match.template.name, "cached", time.perf_counter() - start)
+        return {**cached_result(entry), "template": match.template.name}
+    match = prompt_index.best_match(prompt, SIMILARITY_THRESHOLD)
+    if match:
+        entry = result_cache.get(match["key"])
+        if entry is None:
+            prompt_index.remove(match["key"])  # evicted since it was indexed
+            return None
+        log(f"[PromptIndex] Serving '{match['prompt']}' for '{prompt}' (score {match['score']})")
+        result = cached_result(entry)
+        result["matchedPrompt"] = match["prompt"]
+        result["matchScore"] = match["score"]
+        return result
+    return None
+
+# ====== HYBRID VIDEO GENERATION PIPELINE (with retry/fix loop) ======
+# Runs inside a render worker; see JobQueue in jobs.py
+def run_video_pipeline(job: Job) -> dict:
+    prompt = job.prompt.strip().lower()
+    job.log(f"Prompt received: {prompt}")
+    key = prompt_cache_key(prompt)
+    existing = find_existing_render(prompt)
+    if existing:
+        job.log(f"[ResultCache] Hit for {prompt}", cached=True)
+        return existing
+
+    # Another worker process is already making this video: wait for it instead of rendering it twice
+    followed = False
+    while not lease_store.acquire(key, job.id):
+        if not followed:
+            followed = True
+            coalesced_requests.inc(scope="process")
+            job.log(f"[Coalesce] Waiting for another worker rendering '{prompt}'")
+        with job.stage("coalesced_wait"):
+            outcome = lease_store.wait(key, job.cancel_event)
+        job.check_cancelled()
+        if outcome is None:
+            continue  # the leader died; take the lease over
+        state, error, error_status = outcome
+        if state == "failed":
+            raise HTTPException(status_code=error_status or 500, detail=error)
+        existing = find_existing_render(prompt) if state == "succeeded" else None
+        if existing:
+            return existing
+        # Cancelled, or its result never reached the cache: render it here
+
+    state, error, error_status = "failed", None, None
+    mode = "speculative" if SPECULATIVE_CANDIDATES > 1 else "sequential"
+    start = time.perf_counter()
+    try:
+        result = render_from_template(job, prompt) if USE_TEMPLATES else None
+        if result is not None:
+            mode = "template"
+        elif mode == "speculative":
+            result = generate_speculatively(job, prompt, key)
+        else:
+            result = generate_and_render(job, prompt, key)
+        state = "succeeded"
+        return result
+    except JobCancelled:
+        state = "cancelled"
+        raise
+    except HTTPException as e:
+        error, error_status = e.detail, e.status_code
+        raise
+    except Exception as e:
+        error, error_status = f"Unexpected error: {e}", 500
+        raise
+    finally:
+        lease_store.release(key, job.id, state, error, error_status)
+        if state != "cancelled":
+            seconds = time.perf_counter() - start
+            if job.settled.is_set():
+                speculation_stats.record(mode, seconds, state == "succeeded", job)
+            else:
+                # Losing candidates are still stopping; their renders and LLM calls count once they have
+                threading.Thread(target=record_when_settled, args=(mode, seconds, state == "succeeded", job),
+                                 daemon=True).start()
+
+def record_when_settled(mode: str, seconds: float, succeeded: bool, job: Job):
+    job.settled.wait()
+    speculation_stats.record(mode, seconds, succeeded, job)
+
+def render_from_template(job: Job, prompt: str):
+    # Returns the published result, or None when no template matches or its render failed
+    match = template_registry.match(prompt)
+    template_stats.classify(match is not None)
+    if match is None:
+        return None
+    name = match.template.name
+    job.log(f"[Templates] Matched {name} {match.params}; skipping Gemini", template=name)
+    start = time.perf_counter()
+    with job.stage("template"):
+        manim_code, transcript = match.scene()
+    audio_future = start_narration(job, transcript)
+    with job_workspace(SCRATCH_ROOT, job.id) as workdir:
+        with open(scene_path(workdir), "w") as f:
+            f.write(manim_code)
+        manim_video_path, error_output = render_scene(job, workdir, attempt=1)
+        if manim_video_path is None:
+            discard_narration(audio_future)
+            job.check_cancelled()
+            template_stats.record(name, "failed", time.perf_counter() - start)
+            template_registry.record_failure(name, error_output)
+            job.log(f"[Templates] {name} failed to render; falling back to Gemini")
+            return None
+        result = publish_result(job, prompt, template_cache_key(match), manim_video_path, manim_code, transcript,
+                                audio_future)
+    template_stats.record(name, "rendered", time.perf_counter() - start)
+    return {**result, "template": name}
+
+def generate_and_render(job: Job, prompt: str, key: str) -> dict:
+    with job.stage("prompt_build"):
+        gemini_prompt = build_gemini_prompt(prompt)
 
     # 1. Get initial content from Gemini
     try:
-        response = model.generate_content(gemini_prompt)
-        initial_text = response.text or ""
-    except ValueError as e:
-        print(f"Error getting initial response from Gemini: {e}")
+        with job.stage("generate"):
+            response = llm.generate(gemini_prompt, purpose="generate")
+            initial_text = response.text or ""
+    except (ValueError, LLMError) as e:
+        job.log(f"Error getting initial response from Gemini: {e}")
         # Return a user-friendly error message
         raise HTTPException(status_code=500, detail="The AI model returned an empty or invalid response. This might be due to a safety filter. Please try a different prompt.")
 
-    parts = initial_text.split("---EXPLANATION_STARTS_HERE---")
-    manim_code = clean_manim_code(parts[0].strip())
-    manim_code= enforce_alignment_with_gemini(manim_code)
+    job.check_cancelled()
+    manim_code, transcript = split_generation(job, initial_text, prompt)
+    audio_future = start_narration(job, transcript)
+    try:
+        with job_workspace(SCRATCH_ROOT, job.id) as workdir:
+            manim_code = align_scene(job, workdir, manim_code)
+            job.check_cancelled()
+            return render_with_fixes(job, workdir, prompt, key, manim_code, transcript, audio_future)
+    except BaseException:
+        # No video means no use for the narration
+        discard_narration(audio_future)
+        raise
+
+def split_generation(job: Job, text: str, prompt: str) -> tuple:
+    parts = text.split("---EXPLANATION_STARTS_HERE---")
+    with job.stage("clean"):
+        manim_code = clean_manim_code(parts[0].strip())
     transcript = parts[1].strip() if len(parts) > 1 else f"Step-by-step explanation for {prompt}"
-
-    # Save initial script
-    script_filename = f"video_{uuid.uuid4().hex}.py"
+    return manim_code, transcript
+
+def generate_speculatively(job: Job, prompt: str, key: str) -> dict:
+    with job.stage("prompt_build"):
+        gemini_prompt = build_gemini_prompt(prompt)
+    render_budget = threading.BoundedSemaphore(SPECULATIVE_MAX_PARALLEL_RENDERS)
+    candidates = [Candidate(job, i, render_budget) for i in range(SPECULATIVE_CANDIDATES)]
+    narrations = {}  # candidate 0 is narrated while it renders, the others only if they win
+    won = threading.Lock()
+
+    def run_candidate(candidate: Candidate, workdir: str) -> tuple:
+        candidate.check_cancelled()
+        try:
+            with candidate.stage("generate"):
+                text = llm.generate(gemini_prompt, purpose="generate").text or ""
+        except (ValueError, LLMError) as e:
+            candidate.log(f"Error getting initial response from Gemini: {e}")
+            raise HTTPException(status_code=500, detail="The AI model returned an empty or invalid response. This might be due to a safety filter. Please try a different prompt.")
+        candidate.check_cancelled()
+        manim_code, transcript = split_generation(candidate, text, prompt)
+        if candidate.index == 0:
+            narrations[0] = start_narration(job, transcript)
+        candidate.check_cancelled()
+        os.makedirs(workdir, exist_ok=True)
+        manim_code = align_scene(candidate, workdir, manim_code)
+        candidate.check_cancelled()
+        manim_video_path, manim_code = fix_until_rendered(candidate, workdir, prompt, manim_code)
+        if not won.acquire(blocking=False):
+            raise JobCancelled(f"Candidate {candidate.index} finished after the winner")
+        for other in candidates:
+            if other is not candidate:
+                other.cancel_event.set()
+        return candidate, manim_video_path, manim_code, transcript
+
+    executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix=f"candidate-{job.id[:8]}")
+    workspace = ExitStack()
+    # Not scratch/<job id>: the janitor clears that as soon as the job finishes, losers may still be stopping
+    workdir = workspace.enter_context(job_workspace(SCRATCH_ROOT, f"{job.id}-candidates"))
+    job.settled.clear()  # set again by release_after once every candidate has returned
+    futures = []
+    try:
+        futures = [
+            executor.submit(contextvars.copy_context().run, run_candidate, c,
+                            os.path.join(workdir, f"candidate_{c.index}"))
+            for c in candidates
+        ]
+        last_error = None
+        for future in as_completed(futures):
+            try:
+                candidate, manim_video_path, manim_code, transcript = future.result()
+            except JobCancelled:
+                continue
+            except Exception as e:
+                # One candidate failing (fixes exhausted, Gemini error, crash) leaves the others running
+                last_error = e
+                continue
+            job.log(f"Candidate {candidate.index} rendered first; cancelled the other {len(candidates) - 1}",
+                    candidate=candidate.index)
+            audio_future = narrations.get(0)
+            if candidate.index != 0 or audio_future is None:
+                if audio_future is not None:
+                    discard_narration(audio_future)
+                audio_future = start_narration(job, transcript)
+            return publish_result(job, prompt, key, manim_video_path, manim_code, transcript, audio_future)
+        if 0 in narrations:
+            discard_narration(narrations[0])
+        job.check_cancelled()
+        if isinstance(last_error, HTTPException):
+            raise last_error
+        raise HTTPException(status_code=500, detail=f"All {len(candidates)} candidates failed. Last error: {last_error}")
+    finally:
+        for candidate in candidates:
+            candidate.cancel_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        # Losers stop at their next cancellation check and their renders are killed through the cancel
+        # event; the workspace is removed once all of them have returned, without holding up the response
+        threading.Thread(target=release_after, args=(job, futures, workspace), name=f"candidates-{job.id[:8]}",
+                         daemon=True).start()
+
+def release_after(job: Job, futures: list, workspace: ExitStack):
+    wait(futures)
+    workspace.close()
+    job.settled.set()
+
+def check_layout(job: Job, workdir: str):
+    # Runs layout.py on the saved scene; returns its report, or None if the check could not run.
+    # Raises JobCancelled if the check was killed because the job (or candidate) was cancelled.
+    command = [sys.executable, LAYOUT_SCRIPT, SCENE_FILENAME, SCENE_CLASS, "--tolerance", str(LAYOUT_TOLERANCE)]
+    if TEX_CACHE_DIR:
+        command += ["--tex-dir", TEX_CACHE_DIR, "--tex-max-bytes", str(TEX_CACHE_MAX_BYTES)]
+    try:
+        with job_queue.render_slot():
+            proc = run_limited(command, render_limits, cwd=workdir, cancel_event=job.cancel_event)
+    except (OSError, subprocess.SubprocessError) as e:
+        job.log(f"[Layout] Could not start the layout check: {e}")
+        return None
+    if proc.kind == "cancelled":
+        job.check_cancelled()
+    report = parse_report(proc.stdout)
+    if report is None:
+        job.log(f"[Layout] Layout check ended without a report ({proc.kind}):\n{proc.stderr[-2000:]}")
+    return report
+
+def align_scene(job: Job, workdir: str, manim_code: str) -> str:
+    job.check_cancelled()
+    with open(scene_path(workdir), "w") as f:
+        f.write(manim_code)
+    with job.stage("layout_check"):
+        report = check_layout(job, workdir)
+    if report is None:
+        # Fall back to the generic alignment pass, unless the job was cancelled while the check ran
+        job.check_cancelled()
+        layout_stats.record("unavailable")
+        with job.stage("alignment"):
+            return enforce_alignment_with_gemini(manim_code)
+    if not report["ok"]:
+        layout_stats.record("scene_error")
+        job.log("[Layout] Scene raised before layout could be checked; leaving it to the render/fix loop")
+        return manim_code
+    findings = report["findings"]
+    if not findings:
+        layout_stats.record("clean")
+        job.log(f"[Layout] No layout problems in {report['steps']} steps; skipping the alignment pass")
+        return manim_code
+    layout_stats.record("findings")
+    findings_text = format_findings(findings, manim_code, LAYOUT_TOLERANCE)
+    job.log(f"[Layout] {len(findings)} layout problems:\n{findings_text}", findings=findings)
+    with job.stage("alignment"):
+        return enforce_alignment_with_gemini(manim_code, findings_text)
+
+def run_manim(job: Job, workdir: str, on_line=None, script: str = SCENE_FILENAME, scene_class: str = SCENE_CLASS,
+              cancel_event=None):
+    cancel_event = cancel_event or job.cancel_event
+    if render_pool is not None:
+        return render_pool.render(
+            os.path.join(workdir, script), scene_class, media_dir=media_dir(workdir), cancel_event=cancel_event,
+            on_line=on_line,
+        )
+    command = ["manim"]
+    if TEX_CACHE_DIR:
+        command = [sys.executable, TEXCACHE_SCRIPT, "--tex-dir", TEX_CACHE_DIR,
+                   "--max-bytes", str(TEX_CACHE_MAX_BYTES), "render"]
+    # Stdout/stderr are captured for error reporting; limits are enforced in the child
+    return run_limited(
+        command + ["-pql", script, scene_class],
+        render_limits,
+        cwd=workdir,
+        cancel_event=cancel_event,
+        on_line=on_line,
+    )
+
+def render_progress_reporter(job: Job, attempt: int, **tags):
+    # Streams manim's per-animation progress bars as render_progress events
+    parser = ManimProgress()
+    def report(line: str):
+        progress = parser.parse(line)
+        if progress:
+            job.emit("render_progress", attempt=attempt, **tags, **progress)
+    return report
+
+def render_error_output(proc) -> str:
+    # Stderr/stdout for the fix loop, leading with the limit that killed the render if any
+    error_output = f"Return code: {proc.returncode}\nSTDOUT:\n{proc.stdout}\nSTDERR:\n{proc.stderr}"
+    limit_message = describe_limit(proc, render_limits)
+    return f"{limit_message}\n{error_output}" if limit_message else error_output
+
+def section_scene_error(proc, module: str, manim_code: str):
+    # The failed section's error output, named after the scene file, when the failure is the scene's own:
+    # a resource limit, or an exception raised in the scene's code. None when it may come from the split
+    # (e.g. an AttributeError for state another section sets), which one full render settles.
+    error_output = re.sub(rf"\b{re.escape(module)}\.py\b", SCENE_FILENAME, render_error_output(proc))
+    if proc.kind in ("timeout", "cpu_limit", "oom", "output_limit"):
+        return error_output
+    line = failing_line(error_output)
+    signature = error_signature(error_output) or ""
+    if line is None or line > len(manim_code.splitlines()) or signature.startswith("AttributeError"):
+        return None
+    return error_output
+
+def render_sections(job: Job, workdir: str, attempt: int) -> tuple:
+    # Returns (joined video path, None), (None, error_output) when a section failed in the scene's own
+    # code, or (None, None) when this attempt should render in one process instead
+    if not ffmpeg_available():
+        section_stats.record_fallback("no_ffmpeg")
+        return None, None
+    with open(scene_path(workdir)) as f:
+        manim_code = f.read()
+    plan, reason = plan_sections(manim_code, SCENE_CLASS)
+    if plan is None:
+        section_stats.record_fallback(reason)
+        return None, None
+
+    budget = getattr(job, "render_budget", None) or nullcontext()
+    stop = LinkedEvent(job.cancel_event)  # the first failed section stops its siblings
+    failures = []  # (section index, proc) of the section that failed first
+
+    def render_section(index: int):
+        module = section_module(index)
+        with open(os.path.join(workdir, f"{module}.py"), "w") as f:
+            f.write(plan.script(manim_code, index))
+        # Each section takes its own slot, so sections never hold one slot while waiting for another
+        with budget, job_queue.render_slot():
+            if stop.is_set():
+                return None
+            proc = run_manim(job, workdir, on_line=render_progress_reporter(job, attempt, section=index),
+                             script=f"{module}.py", scene_class=plan.class_name(index), cancel_event=stop)
+        render_accounting.record(proc)
+        render_seconds.observe(proc.wall_seconds, outcome=proc.kind)
+        # A killed loser's render still cost CPU: usage is recorded before bailing out
+        job.render_usage.append({**proc.usage(), "section": index})
+        job.check_cancelled()
+        job.partial_cache.append(partial_cache_counts(proc.stdout + proc.stderr))
+        video_path = rendered_video_path(workdir, RENDER_QUALITY, module, plan.class_name(index))
+        if proc.returncode != 0 or not os.path.exists(video_path):
+            if not stop.is_set():
+                failures.append((index, proc))
+                job.log(f"[Sections] Section {index} failed ({proc.kind}):\n{proc.stderr[-2000:]}", attempt=attempt)
+            stop.set()
+            return None
+        return video_path, proc.wall_seconds
+
+    start = time.perf_counter()
+    try:
+        with job.stage("render_attempt", attempt=attempt, sections=len(plan)), ThreadPoolExecutor(
+            max_workers=min(len(plan), SECTION_MAX_PARALLEL), thread_name_prefix=f"section-{job.id[:8]}"
+        ) as executor:
+            results = list(executor.map(
+                lambda i: contextvars.copy_context().run(render_section, i), range(len(plan))))
+    except (OSError, subprocess.SubprocessError) as e:
+        job.log(f"[Sections] Could not start a section render: {e}", attempt=attempt)
+        results = [None]
+    if not all(results):
+        if failures:
+            index, proc = failures[0]
+            error_output = section_scene_error(proc, section_module(index), manim_code)
+            if error_output:
+                # Rendering the whole scene again would fail the same way: straight to the fix loop
+                section_stats.record_scene_error()
+                job.log(f"Render failed in section {index} with error:\n{error_output}")
+                job.emit("render_failed", attempt=attempt, kind=proc.kind, section=index, error=error_output[-2000:])
+                return None, error_output
+        section_stats.record_fallback("section_failed")
+        return None, None
+
+    manim_video_path = rendered_video_path(workdir, RENDER_QUALITY)
+    os.makedirs(os.path.dirname(manim_video_path), exist_ok=True)
+    try:
+        concat_lossless([path for path, _ in results], manim_video_path, timeout=FFMPEG_TIMEOUT_SECONDS)
+    except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+        job.log(f"[Sections] Joining {len(plan)} sections failed: {e}", attempt=attempt)
+        section_stats.record_fallback("concat_failed")
+        return None, None
+    section_seconds = sum(seconds for _, seconds in results)
+    wall_seconds = time.perf_counter() - start
+    section_stats.record(len(plan), section_seconds, wall_seconds)
+    job.log(f"[Sections] Rendered {len(plan)} sections in {wall_seconds:.2f}s "
+            f"({section_seconds:.2f}s of section renders)", attempt=attempt)
+    return manim_video_path, None
+
+def render_scene(job: Job, workdir: str, attempt: int) -> tuple:
+    # Returns (manim_video_path, None) on success or (None, error_output) on failure
+    if SECTION_RENDER:
+        manim_video_path, error_output = render_sections(job, workdir, attempt)
+        if manim_video_path or error_output:
+            return manim_video_path, error_output
+        # Sequential render: the split could not run or may itself be what failed
+    # Speculative candidates also share a per-job render budget
+    budget = getattr(job, "render_budget", None) or nullcontext()
+    try:
+        with budget, job_queue.render_slot(), job.stage("render_attempt", attempt=attempt):
+            proc = run_manim(job, workdir, on_line=render_progress_reporter(job, attempt))
+    except (OSError, subprocess.SubprocessError) as e:
+        error_output = f"Failed to start manim: {e}"
+        job.log(error_output, attempt=attempt)
+        render_seconds.observe(0.0, outcome="start_failed")
+        return None, error_output
+
+    render_accounting.record(proc)
+    render_seconds.observe(proc.wall_seconds, outcome=proc.kind)
+    # A killed loser's render still cost CPU: usage is recorded before bailing out
+    job.render_usage.append(proc.usage())
+    job.check_cancelled()
+    job.partial_cache.append(partial_cache_counts(proc.stdout + proc.stderr))
+    job.log(f"Render usage for job {job.id}: {proc.usage()}, partial movie cache: {job.partial_cache[-1]}",
+            attempt=attempt, usage=proc.usage())
+
+    if proc.returncode != 0:
+        error_output = render_error_output(proc)
+        job.log(f"Render failed with error:\n{error_output}")
+        # The stream only carries the tail; the full output goes to the fix prompt
+        job.emit("render_failed", attempt=attempt, kind=proc.kind, error=error_output[-2000:])
+        return None, error_output
+
+    # Success: locate video
+    manim_video_path = rendered_video_path(workdir, RENDER_QUALITY)
+    if not os.path.exists(manim_video_path):
+        # treat as failure and proceed to retry/fix
+        error_output = f"Rendering succeeded but expected output not found at {manim_video_path}"
+        job.log(error_output, attempt=attempt)
+        return None, error_output
+    return manim_video_path, None
+
+def package_video(job: Job, video_path: str, audio_filename):
+    # Best effort: without ffmpeg, or if it fails, the silent mp4 and the separate narration are served
+    if not (MUX_AUDIO or ENABLE_HLS):
+        return
+    if not ffmpeg_available():
+        job.log("[Packaging] ffmpeg not found; serving video and narration separately")
+        return
+    if MUX_AUDIO and audio_filename:
+        muxed_path = video_path + ".muxing.mp4"
+        try:
+            with job.stage("mux"):
+                mux_faststart(video_path, os.path.join("audio", audio_filename), muxed_path, FFMPEG_TIMEOUT_SECONDS)
+            os.replace(muxed_path, video_path)
+        except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+            job.log(f"[Packaging] Muxing narration failed: {e}")
+            if os.path.exists(muxed_path):
+                os.remove(muxed_path)
+    if ENABLE_HLS:
+        hls_dir = os.path.join(os.path.dirname(video_path), hls_dirname(os.path.basename(video_path)))
+        try:
+            with job.stage("hls"):
+                segment_hls(video_path, hls_dir, HLS_SEGMENT_SECONDS, FFMPEG_TIMEOUT_SECONDS)
+        except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+            job.log(f"[Packaging] HLS segmentation failed: {e}")
+            shutil.rmtree(hls_dir, ignore_errors=True)
+
+def catalog_video(job: Job, prompt: str, title: str, transcript: str, video_filename: str, audio_filename):
+    # Poster and duration are taken once here, so listing the gallery never opens a video file
+    video_path = os.path.join("videos", video_filename)
+    thumbnail_file, duration = None, None
+    if ffmpeg_available():
+        try:
+            with job.stage("poster"):
+                duration = probe_duration(video_path)
+                thumbnail_file = os.path.splitext(video_filename)[0] + ".jpg"
+                extract_poster(video_path, os.path.join(THUMBNAILS_DIR, thumbnail_file),
+                               (duration or 0) * POSTER_POSITION)
+        except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+            job.log(f"[Catalog] Poster extraction failed: {e}")
+            thumbnail_file = None
+    usage = job.render_usage
+    render_stats = {
+        "attempts": len(job.timings.get("validate", [])),
+        "fixCalls": len(job.timings.get("fix", [])),
+        "renderWallSeconds": round(sum(u["wallSeconds"] for u in usage), 3),
+        "renderCpuSeconds": round(sum(u["cpuSeconds"] for u in usage), 3),
+        "pipelineSeconds": round(time.time() - job.created_at, 3),
+    }
+    try:
+        catalog.add(job.id, prompt, title, transcript, video_filename, audio_filename, thumbnail_file, duration,
+                    render_stats)
+    except sqlite3.Error as e:
+        job.log(f"[Catalog] Failed to record video: {e}")
+
+def publish_result(job: Job, prompt: str, key: str, manim_video_path: str,
+                   manim_code: str, transcript: str, audio_future) -> dict:
+    final_video_name = f"video_{job.id}.mp4"
+    final_path = os.path.join("videos", final_video_name)
+    with job.stage("file_move"):
+        # Ensure destination does not already exist
+        if os.path.exists(final_path):
+            os.remove(final_path)
+        os.rename(manim_video_path, final_path)
+    job.log(f"Partial movie cache for job {job.id}: {partial_cache_report(job.partial_cache)}")
+
+    video_url = f"http://localhost:8000/videos/{final_video_name}"
+
+    # Join the narration started before the render loop
+    try:
+        with job.stage("tts_wait"):
+            audio_filename = audio_future.result(timeout=TTS_WAIT_SECONDS)
+        audio_url = f"http://localhost:8000/audio/{audio_filename}"
+        captions = load_captions(audio_filename)
+    except FutureTimeout:
+        # The narration file is deleted if it lands later
+        discard_narration(audio_future)
+        job.log(f"Audio generation did not finish within {TTS_WAIT_SECONDS:g}s; publishing without narration")
+        audio_url = None
+        audio_filename = None
+        captions = None
+    except Exception as e:
+        # If audio generation fails, we can decide to return the video anyway or fail
+        job.log(f"Audio generation failed: {e}")
+        audio_url = None # Or some default/error indicator
+        audio_filename = None
+        captions = None
+    # Narration time hidden behind alignment and rendering
+    tts_seconds = sum(job.timings.get("tts", []))
+    job.timings["tts_overlap_saved"] = [round(max(tts_seconds - job.timings["tts_wait"][-1], 0), 4)]
+    package_video(job, final_path, audio_filename)
+
+    title = f"Explaining {prompt}"
+    try:
+        result_cache.put(
+            key, prompt, title, final_video_name,
+            os.path.basename(audio_url) if audio_url else None,
+            transcript, manim_code,
+        )
+        prompt_index.add(key, prompt)
+    except Exception as e:
+        job.log(f"[ResultCache] Failed to store result: {e}")
+    catalog_video(job, prompt, title, transcript, final_video_name, audio_filename)
+
+    return {
+        "videoUrl": video_url,
+        "hlsUrl": hls_url(final_video_name),
+        "audioUrl": audio_url,
+        "transcript": transcript,
+        "captions": captions,
+        "title": title
+    }
+
+def render_with_fixes(job: Job, workdir: str, prompt: str, key: str, manim_code: str, transcript: str,
+                      audio_future) -> dict:
+    manim_video_path, manim_code = fix_until_rendered(job, workdir, prompt, manim_code)
+    return publish_result(job, prompt, key, manim_video_path, manim_code, transcript, audio_future)
+
+def fix_until_rendered(job: Job, workdir: str, prompt: str, manim_code: str) -> tuple:
+    # Returns (manim_video_path, manim_code) for the first attempt that renders
+    # Save initial script; the name stays the same across fix attempts
+    script_filename = scene_path(workdir)
+    job.check_cancelled()
     with open(script_filename, "w") as f:
         f.write(manim_code)
-    print(f"Saved initial Manim code to {script_filename}")
+    job.log(f"Saved initial Manim code to {script_filename}")
 
     max_retries = 5
     attempt = 0
     last_error_output = ""
-    final_video_path = None
+    pending_rewrite = None  # local rewrite whose outcome the next attempt decides
+    tried_rewrites = set()
 
     while attempt <= max_retries:
         attempt += 1
-        print(f"Rendering attempt {attempt} for {script_filename}")
-        try:
-            # Use capture_output to obtain stderr/stdout for error reporting
-            proc = subprocess.run(
-                ["manim", "-pql", script_filename, "GeneratedScene"],
-                check=False,
-                capture_output=True,
-                text=True
-            )
-
-            if proc.returncode == 0:
-                # Success: locate video and move it
-                script_name_without_ext = os.path.splitext(script_filename)[0]
-                manim_output_dir = os.path.join("media", "videos", script_name_without_ext, "480p15")
-                manim_video_path = os.path.join(manim_output_dir, "GeneratedScene.mp4")
-
-                if os.path.exists(manim_video_path):
-                    final_video_name = f"{script_name_without_ext}.mp4"
-                    final_path = os.path.join("videos", final_video_name)
-                    # Ensure destination does not already exist
-                    if os.path.exists(final_path):
-                        os.remove(final_path)
-                    os.rename(manim_video_path, final_path)
-                    final_video_path = final_path
-
-                    # Clean up temp script
-                    try:
-                        os.remove(script_filename)
-                    except Exception:
-                        pass
-
-                    video_url = f"http://localhost:8000/videos/{final_video_name}"
-
-                    # Generate audio
-                    try:
-                        audio_response = generate_audio(AudioRequest(text=transcript))
-                        audio_url = audio_response["audioUrl"]
-                    except HTTPException as e:
-                        # If audio generation fails, we can decide to return the video anyway or fail
-                        print(f"Audio generation failed: {e.detail}")
-                        audio_url = None # Or some default/error indicator
-
-                    return {
-                        "videoUrl": video_url,
-                        "audioUrl": audio_url,
-                        "transcript": transcript,
-                        "title": f"Explaining {prompt}"
-                    }
-                else:
-                    last_error_output = f"Rendering succeeded but expected output not found at {manim_video_path}"
-                    print(last_error_output)
-                    # treat as failure and proceed to retry/fix
+        if job.cancel_event.is_set():
+            break
+
+        # Reject scenes with known-bad patterns without spending a manim subprocess on them
+        with job.stage("validate", attempt=attempt):
+            diagnostics = scene_validator.validate(manim_code)
+        if diagnostics:
+            last_error_output = format_diagnostics(diagnostics, manim_code)
+            job.log(f"Skipping render attempt {attempt}:\n{last_error_output}", attempt=attempt)
+        else:
+            job.log(f"Rendering attempt {attempt} for {script_filename}", attempt=attempt)
+            manim_video_path, last_error_output = render_scene(job, workdir, attempt)
+            if manim_video_path:
+                if pending_rewrite:
+                    rewrite_engine.record(pending_rewrite, success=True)
+                return manim_video_path, manim_code
+
+        if FAILURE_RECORD_PATH and last_error_output:
+            record_failure(FAILURE_RECORD_PATH, prompt, manim_code, last_error_output)
+
+        if pending_rewrite:
+            still_failing = error_signature(last_error_output) == pending_rewrite.signature
+            rewrite_engine.record(pending_rewrite, success=not still_failing)
+            pending_rewrite = None
+
+        # If we've reached here, the attempt failed. If we have retries left, fix it locally or ask Gemini.
+        if attempt <= max_retries and not job.cancel_event.is_set():
+            with job.stage("rewrite", attempt=attempt):
+                pending_rewrite = rewrite_engine.rewrite(manim_code, last_error_output, tried_rewrites)
+            if pending_rewrite:
+                tried_rewrites.update((pending_rewrite.signature, rule) for rule in pending_rewrite.rules)
+                job.log(f"Applied local rewrite {pending_rewrite.rule} for '{pending_rewrite.signature}' "
+                        f"(attempt {attempt})", attempt=attempt, rule=pending_rewrite.rule)
+                fixed_code = pending_rewrite.code
             else:
-                # Capture stderr/stdout
-                last_error_output = f"Return code: {proc.returncode}\nSTDOUT:\n{proc.stdout}\nSTDERR:\n{proc.stderr}"
-                print(f"Render failed with error:\n{last_error_output}")
-
-        except subprocess.CalledProcessError as e:
-            last_error_output = f"CalledProcessError: {e}"
-            print(last_error_output)
-
-        # If we've reached here, the attempt failed. If we have retries left, ask Gemini to fix.
-        if attempt <= max_retries:
-            print(f"Requesting Gemini to fix code (attempt {attempt})")
-            fix_prompt = build_fix_prompt(manim_code, last_error_output, prompt)
-            fix_response = model.generate_content(fix_prompt)
-            fixed_text = fix_response.text or ""
-            # Clean and ensure class name etc.
-            fixed_code = clean_manim_code(fixed_text.strip())
+                job.log(f"Requesting Gemini to fix code (attempt {attempt})", attempt=attempt)
+                error_context = last_error_output
+                if DISTILL_ERRORS and last_error_output:
+                    error_context = distill_error(last_error_output, manim_code, ERROR_CONTEXT_LINES)
+                    distill_stats.record(len(last_error_output), len(error_context))
+                fix_prompt = build_fix_prompt(manim_code, error_context, prompt)
+                job.log(f"Fix prompt: {len(fix_prompt)} chars, error context {len(last_error_output)} -> "
+                        f"{len(error_context)} chars", attempt=attempt)
+                try:
+                    with job.stage("fix", attempt=attempt):
+                        fix_response = llm.generate(fix_prompt, purpose="fix")
+                        fixed_text = fix_response.text or ""
+                except LLMError as e:
+                    # Gemini is rate limited or down: no fix is coming, report the last render error
+                    job.log(f"Gemini fix request failed: {e}", attempt=attempt)
+                    break
+                job.check_cancelled()
+                rewrite_engine.record_llm_fix(job.timings["fix"][-1])
+                # Clean and ensure class name etc.
+                with job.stage("clean", attempt=attempt):
+                    fixed_code = clean_manim_code(fixed_text.strip())
             # Overwrite script file with fixed code
+            job.check_cancelled()
             try:
                 with open(script_filename, "w") as f:
                     f.write(fixed_code)
                 # Update manim_code variable for potential next fix iteration
                 manim_code = fixed_code
-                print(f"Saved fixed Manim code to {script_filename} (attempt {attempt})")
+                job.log(f"Saved fixed Manim code to {script_filename} (attempt {attempt})", attempt=attempt)
             except Exception as e:
                 # If writing fails, abort
                 raise HTTPException(status_code=500, detail=f"Failed to write fixed script: {e}")
@@ -646,12 +1516,277 @@ def generate_video(request: PromptRequest):
             # No retries left
             break
 
-    # All attempts exhausted — cleanup temp script and return error
-    try:
-        if os.path.exists(script_filename):
-            os.remove(script_filename)
-    except Exception:
-        pass
+    # All attempts exhausted — the scratch directory is removed by job_workspace
+    job.check_cancelled()
 
     # Return detailed error so frontend can show it or pass back to user
     raise HTTPException(status_code=500, detail=f"Failed to generate video after {max_retries + 1} attempts. Last error: {last_error_output}")
+
+
+# ====== RENDER WORKER POOL ======
+load_prompt_index()
+render_pool = None
+if RENDER_BACKEND == "warm":
+    render_pool = WarmRenderPool(
+        size=RENDER_CONCURRENCY,
+        max_jobs=RENDER_WORKER_MAX_JOBS,
+        max_rss_mb=RENDER_WORKER_MAX_RSS_MB,
+        limits=render_limits,
+        tex_dir=TEX_CACHE_DIR or None,
+        tex_max_bytes=TEX_CACHE_MAX_BYTES,
+    )
+# ====== DISK JANITOR ======
+def active_job_ids() -> set:
+    return {job.id for job in list(job_queue.jobs.values()) if not job.done}
+
+def referenced_assets() -> set:
+    # Results the queue still serves, including any the result cache failed to store
+    names = set()
+    for job in list(job_queue.jobs.values()):
+        for url in ((job.result or {}).get("videoUrl"), (job.result or {}).get("audioUrl")):
+            if url:
+                names.add(url.rsplit("/", 1)[-1])
+    return names
+
+janitor = Janitor(
+    result_cache,
+    scratch_root=SCRATCH_ROOT,
+    asset_quota_bytes=ASSET_QUOTA_BYTES,
+    orphan_retention=ORPHAN_RETENTION_HOURS * 3600,
+    interval=JANITOR_INTERVAL_SECONDS,
+    active_jobs=active_job_ids,
+    referenced=referenced_assets,
+    on_reclaim=lambda kind, amount: reclaimed_bytes.inc(amount, kind=kind),
+    after_pass=catalog.prune,
+    live_result_seconds=JOB_TTL_SECONDS,
+    pinned=catalog.asset_files,
+)
+# Other uvicorn workers may be mid-render: only leftovers of dead processes are removed
+janitor.sweep_startup()
+
+def observe_job(job: Job):
+    jobs_total.inc(status=job.status)
+    job_seconds.observe(job.finished_at - job.created_at, status=job.status)
+    attempts = len(job.timings.get("validate", []))
+    if attempts:  # zero for jobs that failed or were cancelled before rendering
+        render_attempts.observe(attempts)
+        fix_loop_depth.observe(len(job.timings.get("fix", [])))
+
+def finish_job(job: Job):
+    observe_job(job)
+    janitor.job_finished(job)
+
+job_queue = JobQueue(
+    run_video_pipeline,
+    workers=JOB_WORKERS,
+    max_queue=JOB_QUEUE_DEPTH,
+    render_concurrency=RENDER_CONCURRENCY,
+    job_ttl=JOB_TTL_SECONDS,
+    on_finish=finish_job,
+)
+janitor.start()
+batch_store = BatchStore(BATCH_DB)
+batch_runner = BatchRunner(
+    batch_store, job_queue, lookup=find_existing_render, key_for=prompt_cache_key,
+    priority=BATCH_PRIORITY, max_in_flight=BATCH_MAX_IN_FLIGHT,
+)
+batch_runner.start()
+metrics.gauge("pipeline_queue_depth", "Jobs waiting for a worker", collect=lambda: job_queue.depth)
+metrics.gauge("pipeline_renders_in_flight", "Renders holding a render slot", collect=lambda: job_queue.in_flight_renders)
+
+# ====== VIDEO JOB ENDPOINTS (submit / poll / result / cancel) ======
+@app.post("/generate-video", status_code=202)
+def generate_video(request: PromptRequest, x_request_id: str = Header(None)):
+    # X-Request-ID, when sent, becomes the job's correlation id in logs, events and traces
+    # Cache hits are answered without touching the queue, Gemini, manim or ElevenLabs
+    existing = find_existing_render(request.prompt)
+    if existing:
+        job = job_queue.add_completed(request.prompt, existing, correlation_id=x_request_id)
+        jobs_total.inc(status="cache_hit")
+        return {"jobId": job.id, "status": job.status, "correlationId": job.correlation_id}
+    try:
+        # Same normalized prompt and render settings as the result cache key
+        job, attached, token = job_queue.submit_coalesced(
+            request.prompt, prompt_cache_key(request.prompt.strip().lower()), correlation_id=x_request_id,
+        )
+    except QueueFull as e:
+        jobs_total.inc(status="rejected")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    if attached:
+        coalesced_requests.inc(scope="local")
+    return {"jobId": job.id, "status": job.status, "correlationId": job.correlation_id, "coalesced": attached,
+            "subscriberToken": token}
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = get_job_or_404(job_id)
+    status = job.to_dict()
+    status["partialMovieCache"] = partial_cache_report(job.partial_cache)
+    if job.status == "queued":
+        status["queuePosition"] = job_queue.position(job)
+    return status
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = get_job_or_404(job_id)
+    if job.status == "succeeded":
+        return job.result
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error)
+    if job.status == "cancelled":
+        raise HTTPException(status_code=410, detail=f"Job {job_id} was cancelled")
+    raise HTTPException(status_code=409, detail=f"Job {job_id} is still {job.status}")
+
+@app.get("/jobs/{job_id}/trace")
+def get_job_trace(job_id: str):
+    # Stage spans as offsets from submission, for breaking down one slow request
+    return get_job_or_404(job_id).trace()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    # Server-Sent Events: stage transitions, render progress and log lines, ending after the final status
+    job = get_job_or_404(job_id)
+    try:
+        last_id = int(request.headers.get("last-event-id", "-1"))
+    except ValueError:
+        last_id = -1
+
+    async def stream():
+        nonlocal last_id
+        idle = 0.0
+        while True:
+            finished = job.done  # read before draining so the terminal event is never missed
+            events = job.events_since(last_id)
+            for event in events:
+                last_id = event["id"]
+                yield format_sse(event)
+            if finished or await request.is_disconnected():
+                return
+            idle = 0.0 if events else idle + SSE_POLL_SECONDS
+            if idle >= SSE_KEEPALIVE_SECONDS:
+                idle = 0.0
+                yield ": keepalive\n\n"
+            await asyncio.sleep(SSE_POLL_SECONDS)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str, token: str = None):
+    # token is the subscriberToken from POST /generate-video; a job shared with other requests is only
+    # cancelled once every one of them has withdrawn
+    job = get_job_or_404(job_id)
+    job_queue.cancel(job_id, token)
+    return job.to_dict()
+
+# ====== SIMILAR PROMPT LOOKUP (for tuning SIMILARITY_THRESHOLD) ======
+@app.get("/similar")
+def similar_prompts(prompt: str, limit: int = 5):
+    return {
+        "threshold": SIMILARITY_THRESHOLD,
+        "matches": prompt_index.search(prompt, limit=min(limit, 50)),
+    }
+
+# ====== BATCH PRE-GENERATION ======
+@app.post("/batches")
+def create_batch(request: BatchRequest):
+    # Duplicates within the list are dropped here; topics that already have a result finish as "cached"
+    topics = dedupe_topics(request.topics)
+    if not topics:
+        raise HTTPException(status_code=400, detail="No topics given")
+    if len(topics) > BATCH_MAX_TOPICS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TOPICS} topics per batch")
+    batch_id = batch_store.create(topics)
+    batch_runner.wake()
+    log(f"[Batch] Created {batch_id} with {len(topics)} topics")
+    return {**batch_store.report(batch_id), "duplicatesDropped": len(request.topics) - len(topics)}
+
+@app.get("/batches")
+def list_batches(limit: int = 20):
+    reports = [batch_store.report(batch_id) for batch_id in batch_store.recent(min(limit, 100))]
+    return {"batches": [{k: v for k, v in report.items() if k != "items"} for report in reports]}
+
+@app.get("/batches/{batch_id}")
+def get_batch(batch_id: str):
+    report = batch_store.report(batch_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return report
+
+@app.delete("/batches/{batch_id}")
+def cancel_batch(batch_id: str):
+    if batch_store.report(batch_id) is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    batch_runner.cancel(batch_id)
+    return batch_store.report(batch_id)
+
+# ====== VIDEO CATALOG ======
+def catalog_item(entry: dict) -> dict:
+    audio_file, thumbnail_file = entry["audio_file"], entry["thumbnail_file"]
+    return {
+        "id": entry["id"],
+        "jobId": entry["job_id"],
+        "title": entry["title"],
+        "prompt": entry["prompt"],
+        "transcript": entry["transcript"],
+        "snippet": entry["snippet"],  # matched transcript excerpt when searching
+        "videoUrl": f"http://localhost:8000/videos/{entry['video_file']}",
+        "hlsUrl": hls_url(entry["video_file"]),
+        "audioUrl": f"http://localhost:8000/audio/{audio_file}" if audio_file else None,
+        "thumbnailUrl": f"http://localhost:8000/thumbnails/{thumbnail_file}" if thumbnail_file else None,
+        "durationSeconds": entry["duration_seconds"],
+        "renderStats": entry["render_stats"],
+        "createdAt": entry["created_at"],
+    }
+
+@app.get("/catalog")
+def list_catalog(limit: int = 24, cursor: str = None, q: str = None):
+    # Newest first; pass nextCursor back as cursor for the following page
+    try:
+        before = int(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        entries, next_cursor = catalog.page(limit, before, q)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search: {e}")
+    return {
+        "items": [catalog_item(entry) for entry in entries],
+        "nextCursor": str(next_cursor) if next_cursor is not None else None,
+    }
+
+# ====== PROMETHEUS METRICS ======
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# ====== PIPELINE STATS ======
+@app.get("/stats")
+def pipeline_stats():
+    return {
+        "cache": result_cache.stats(),
+        "validator": scene_validator.stats(),
+        "layout": layout_stats.stats(),
+        "rewrites": rewrite_engine.stats(),
+        "errorDistiller": distill_stats.stats(),
+        "renderUsage": render_accounting.stats(),
+        "llm": llm.stats(),
+        "tts": narrator.stats(),
+        "janitor": janitor.stats(),
+        "speculation": speculation_stats.stats(),
+        "sections": section_stats.stats(),
+        "catalog": catalog.stats(),
+        "batches": batch_runner.stats(),
+        "templates": template_stats.stats(template_registry),
+        "coalescing": {"attached": job_queue.coalesced, "leases": lease_store.stats()},
+        "texCache": texcache.read_stats(TEX_CACHE_DIR) if TEX_CACHE_DIR else None,
+        "queueDepth": job_queue.depth,
+    }
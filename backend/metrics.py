@@ -0,0 +1,173 @@
+import math
+import os
+import threading
+import time
+
+
+# ====== PROMETHEUS TEXT FORMAT ======
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ====== METRIC TYPES ======
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{label_text(self.labels, k)} {number(v)}" for k, v in items]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), collect=None):
+        super().__init__(name, help, labels)
+        # collect() is called at scrape time and returns a number, or {label values tuple: number}
+        self.collect = collect
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> list:
+        if self.collect is not None:
+            collected = self.collect()
+            items = sorted(collected.items()) if isinstance(collected, dict) else [((), collected)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{label_text(self.labels, k)} {number(v)}" for k, v in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = None):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets or (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                bucket = label_text(self.labels, key, 'le="' + number(bound) + '"')
+                lines.append(f"{self.name}_bucket{bucket} {count}")
+            lines.append(f"{self.name}_sum{label_text(self.labels, key)} {number(total)}")
+            lines.append(f"{self.name}_count{label_text(self.labels, key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple = (), collect=None) -> Gauge:
+        return self._add(Gauge(name, help, labels, collect))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = None) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# ====== SUMMARIES ======
+def percentile(ordered: list, q: float) -> float:
+    # Nearest-rank percentile over an already sorted list
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+# ====== DISK USAGE ======
+class DiskUsage:
+    # Walking large media trees on every scrape is wasteful, so sizes are cached briefly
+    def __init__(self, directories: list, max_age: float = 30):
+        self.directories = directories
+        self.max_age = max_age
+        self._cached = {}
+        self._measured_at = 0.0
+        self._lock = threading.Lock()
+
+    def measure(self) -> dict:
+        with self._lock:
+            if time.time() - self._measured_at > self.max_age:
+                self._cached = {(name,): directory_bytes(name) for name in self.directories}
+                self._measured_at = time.time()
+            return dict(self._cached)
+
+
+def directory_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # removed while walking
+    return total
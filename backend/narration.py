@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ElevenLabs handles a sentence at a time well; longer runs are split at clause boundaries
+MAX_CHUNK_CHARS = 300
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+
+# ====== SENTENCE CHUNKS ======
+def split_sentences(text: str, max_chars: int = MAX_CHUNK_CHARS) -> list:
+    # Chunks are whole sentences so a standard intro or conclusion hashes the same in every transcript
+    chunks = []
+    for sentence in SENTENCE_END.split(re.sub(r"\s+", " ", text).strip()):
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            cut = max((m.end() for m in CLAUSE_END.finditer(sentence, 0, max_chars)), default=0)
+            if not cut:
+                cut = sentence.rfind(" ", 0, max_chars) + 1 or max_chars
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            chunks.append(sentence)
+    return chunks
+
+
+def chunk_key(text: str, voice: str, model: str) -> str:
+    return hashlib.sha256("\x1f".join([text, voice, model]).encode("utf-8")).hexdigest()
+
+
+def captions_filename(audio_filename: str) -> str:
+    # Chunk timings are written next to the track so cached results can still be subtitled
+    return os.path.splitext(audio_filename)[0] + ".captions.json"
+
+
+# ====== MP3 FRAMES ======
+# Layer III bitrates (kbps) by bitrate index, for MPEG-1 and for MPEG-2/2.5
+MPEG1_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+MPEG2_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def strip_id3(data: bytes) -> bytes:
+    # Only the first chunk may keep its tag, otherwise players see the later tags as garbage
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return data[10 + size:]
+    return data
+
+
+def mp3_duration(data: bytes) -> float:
+    # Sum of the Layer III frame durations; bytes that are not a frame header are skipped
+    data = strip_id3(data)
+    seconds = 0.0
+    i = 0
+    while i + 4 <= len(data):
+        b1, b2 = data[i + 1], data[i + 2]
+        version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+        if data[i] != 0xFF or (b1 & 0xE0) != 0xE0 or version == 1 or layer != 1:
+            i += 1
+            continue
+        bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+        if bitrate_index in (0, 15) or rate_index == 3:
+            i += 1
+            continue
+        bitrate = (MPEG1_BITRATES if version == 3 else MPEG2_BITRATES)[bitrate_index] * 1000
+        sample_rate = SAMPLE_RATES[version][rate_index]
+        samples = 1152 if version == 3 else 576
+        seconds += samples / sample_rate
+        i += samples // 8 * bitrate // sample_rate + ((b2 >> 1) & 1)
+    return seconds
+
+
+# ====== CHUNK CACHE ======
+class ChunkCache:
+    # Synthesized chunks keyed by (text, voice, model); the index lives in SQLite like the result cache
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 ** 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                key TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                uses INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute("SELECT seconds FROM chunks WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    audio = f.read()
+            except FileNotFoundError:
+                self._db.execute("DELETE FROM chunks WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE chunks SET uses = uses + 1, last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return audio, row[0]
+
+    def put(self, key: str, text: str, audio: bytes, seconds: float):
+        path = self._path(key)
+        with open(path + ".tmp", "wb") as f:
+            f.write(audio)
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, 1, ?)", (key, text, len(audio), seconds, time.time())
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM chunks").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, bytes FROM chunks ORDER BY last_used ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM chunks WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM chunks").fetchone()
+            top = self._db.execute("SELECT text, uses FROM chunks ORDER BY uses DESC LIMIT 5").fetchall()
+        return {"entries": count, "bytes": size, "mostReused": [{"text": t[:80], "uses": u} for t, u in top]}
+
+
+# ====== NARRATOR ======
+class Narration:
+    def __init__(self, audio: bytes, chunks: list):
+        self.audio = audio
+        # [{"text", "start", "end", "cached"}] in seconds from the start of the track
+        self.chunks = chunks
+
+    @property
+    def duration(self) -> float:
+        return self.chunks[-1]["end"] if self.chunks else 0.0
+
+
+class Narrator:
+    # Splits a transcript into sentences, synthesizes the missing ones concurrently and joins the mp3s
+    def __init__(self, client, voice: str, model: str, cache: ChunkCache, concurrency: int = 4):
+        self.client = client
+        self.voice = voice
+        self.model = model
+        self.cache = cache
+        # Bounded separately from the callers so narrations share one limit on concurrent API calls
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="tts-chunk")
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Future, so two jobs needing the same sentence make one call
+        self.hits = 0
+        self.misses = 0
+        self.synthesis_seconds = 0.0
+
+    def _synthesize(self, key: str, text: str) -> tuple:
+        start = time.perf_counter()
+        audio = self.client.synthesize(text, self.voice, self.model)
+        seconds = mp3_duration(audio)
+        self.cache.put(key, text, audio, seconds)
+        with self._lock:
+            self.synthesis_seconds += time.perf_counter() - start
+        return audio, seconds
+
+    def _release(self, key: str):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def _chunk(self, text: str):
+        # Returns (cached, Future or (audio, seconds))
+        key = chunk_key(text, self.voice, self.model)
+        cached = self.cache.get(key)
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+                return True, cached
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.hits += 1
+                return True, future
+            self.misses += 1
+            future = self._executor.submit(self._synthesize, key, text)
+            self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._release(key))
+        return False, future
+
+    def narrate(self, transcript: str) -> Narration:
+        texts = split_sentences(transcript)
+        pending = [self._chunk(text) for text in texts]
+        parts, chunks, offset = [], [], 0.0
+        for text, (cached, result) in zip(texts, pending):
+            audio, seconds = result.result() if hasattr(result, "result") else result
+            parts.append(audio if not parts else strip_id3(audio))
+            chunks.append({"text": text, "start": round(offset, 3), "end": round(offset + seconds, 3),
+                           "cached": cached})
+            offset += seconds
+        return Narration(b"".join(parts), chunks)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses, seconds = self.hits, self.misses, self.synthesis_seconds
+        return {
+            "chunks": hits + misses,
+            "cacheHits": hits,
+            "synthesized": misses,
+            "hitRatio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "synthesisSeconds": round(seconds, 3),
+            "cache": self.cache.stats(),
+        }
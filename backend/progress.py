@@ -0,0 +1,31 @@
+import json
+import re
+
+
+# tqdm bar manim prints per animation, e.g.
+# "Animation 3: Write(Text('Area')):  45%|████▌     | 9/20 [00:00<00:00, 30.1it/s]"
+PROGRESS_LINE = re.compile(r"Animation\s+(\d+)\s*:\s*(.*?):\s*(\d{1,3})%\|")
+
+
+# ====== MANIM PROGRESS PARSING ======
+class ManimProgress:
+    # Turns raw manim output lines into (animation, name, percent) updates, skipping repeats
+    def __init__(self, step: int = 10):
+        self.step = step
+        self._last = {}
+
+    def parse(self, line: str):
+        match = PROGRESS_LINE.search(line)
+        if not match:
+            return None
+        animation, name, percent = int(match.group(1)), match.group(2).strip(), int(match.group(3))
+        last = self._last.get(animation)
+        if last is not None and percent < 100 and percent - last < self.step:
+            return None
+        self._last[animation] = percent
+        return {"animation": animation, "name": name[:80], "percent": percent}
+
+
+# ====== SERVER-SENT EVENTS ======
+def format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
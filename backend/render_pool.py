@@ -0,0 +1,244 @@
+import io
+import multiprocessing
+import os
+import queue
+import resource
+import subprocess
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from limits import RenderLimits, RenderResult, classify
+from progress import ManimProgress
+
+
+# ====== WORKER PROCESS ======
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class CappedWriter(io.StringIO):
+    # Bounded capture of a scene's stdout/stderr; the overflow flag is reported back to the parent
+    def __init__(self, limit: int, on_text=None):
+        super().__init__()
+        self.limit = limit
+        self.overflow = False
+        self.on_text = on_text
+
+    def write(self, text: str) -> int:
+        if self.on_text is not None:
+            self.on_text(text)
+        room = self.limit - self.tell()
+        if room <= 0:
+            self.overflow = True
+            return len(text)
+        if len(text) > room:
+            self.overflow = True
+        return super().write(text[:room]) and len(text)
+
+
+def cpu_seconds_used() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def progress_forwarder(conn):
+    # Sends manim's progress-bar lines to the parent while the render runs, throttled per animation
+    parser = ManimProgress()
+
+    def forward(text: str):
+        for line in text.replace("\r", "\n").split("\n"):
+            if parser.parse(line):
+                conn.send({"line": line})
+    return forward
+
+
+def render_in_worker(request: dict, limits: RenderLimits, on_text=None) -> dict:
+    from manim import tempconfig
+
+    script_path = request["script_path"]
+    stdout = CappedWriter(limits.max_log_bytes, on_text)
+    stderr = CappedWriter(limits.max_log_bytes, on_text)
+    returncode = 0
+    cpu_before = cpu_seconds_used()
+    if limits.cpu_seconds:
+        # SIGXCPU terminates the worker once this job alone has used its CPU budget
+        soft = int(cpu_before + limits.cpu_seconds)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.RLIM_INFINITY))
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            with open(script_path) as f:
+                source = f.read()
+            overrides = {
+                "input_file": script_path,  # drives media/videos/<module>/ like the CLI does
+                "media_dir": request.get("media_dir", "media"),
+                "quality": request.get("quality", "low_quality"),
+                "preview": False,
+                "verbosity": "INFO",
+            }
+            overrides.update(request.get("config") or {})
+            with tempconfig(overrides):
+                # Fresh namespace per job so nothing leaks between scenes
+                namespace = {"__name__": os.path.splitext(os.path.basename(script_path))[0]}
+                exec(compile(source, script_path, "exec"), namespace)
+                scene_class = namespace[request.get("scene", "GeneratedScene")]
+                scene_class().render()
+        except BaseException:
+            traceback.print_exc()
+            returncode = 1
+    return {
+        "returncode": returncode,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "log_overflow": stdout.overflow or stderr.overflow,
+        "cpu_seconds": cpu_seconds_used() - cpu_before,
+        # Peak over the worker's lifetime; recycling on RSS growth keeps this meaningful
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def worker_main(conn, max_jobs: int, max_rss_mb: float, limits: RenderLimits, tex_cache: tuple = None):
+    # Address-space and file-size caps apply to the whole worker; CPU is budgeted per job
+    RenderLimits(cpu_seconds=0, memory_mb=limits.memory_mb, max_file_mb=limits.max_file_mb).apply()
+    # Pay the manim/numpy/cairo/pango import and config cost once per worker
+    import manim  # noqa: F401
+    if tex_cache:
+        import texcache
+        texcache.install(*tex_cache)
+
+    conn.send({"ready": True, "pid": os.getpid()})
+    jobs_done = 0
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        result = render_in_worker(request, limits, progress_forwarder(conn))
+        jobs_done += 1
+        # Ask to be replaced once the job count or memory growth limit is reached
+        result["recycle"] = jobs_done >= max_jobs or current_rss_mb() > max_rss_mb
+        conn.send(result)
+        if result["recycle"]:
+            return
+
+
+# ====== WARM RENDER POOL ======
+class RenderWorker:
+    def __init__(self, context, max_jobs: int, max_rss_mb: float, limits: RenderLimits, tex_cache: tuple = None):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=worker_main, args=(child_conn, max_jobs, max_rss_mb, limits, tex_cache), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout: float = 120):
+        if not self.ready:
+            if not self.conn.poll(timeout):
+                raise RuntimeError("Render worker did not start in time")
+            self.conn.recv()
+            self.ready = True
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+
+
+class WarmRenderPool:
+    def __init__(self, size: int = 2, max_jobs: int = 50, max_rss_mb: float = 1500, limits: RenderLimits = None,
+                 tex_dir: str = None, tex_max_bytes: int = 512 * 1024 ** 2):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.limits = limits or RenderLimits()
+        self.tex_cache = (tex_dir, tex_max_bytes) if tex_dir else None
+        self.recycled = 0
+        # spawn: the API process has threads, which fork() would copy in a broken state
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> RenderWorker:
+        return RenderWorker(self._context, self.max_jobs, self.max_rss_mb, self.limits, self.tex_cache)
+
+    def render(self, script_path: str, scene: str = "GeneratedScene", media_dir: str = "media",
+               extra_config: dict = None, cancel_event=None, on_line=None) -> RenderResult:
+        limits = self.limits
+        args = [script_path, scene]
+        worker = self._idle.get()
+        replace = False
+        start = time.perf_counter()
+        try:
+            worker.wait_ready()
+            worker.conn.send({
+                "script_path": script_path, "scene": scene, "media_dir": media_dir, "config": extra_config,
+            })
+            # Poll in short slices so wall-clock limits and cancellation are honoured mid-render
+            while True:
+                if worker.conn.poll(0.1):
+                    message = worker.conn.recv()
+                    if "line" not in message:
+                        result = message
+                        break
+                    if on_line is not None:
+                        on_line(message["line"])
+                elapsed = time.perf_counter() - start
+                cancelled = cancel_event is not None and cancel_event.is_set()
+                if cancelled or (limits.wall_seconds and elapsed > limits.wall_seconds):
+                    replace = True
+                    worker.process.kill()
+                    kind = "cancelled" if cancelled else "timeout"
+                    return RenderResult(args, -9, "", "", kind=kind, wall_seconds=elapsed)
+                if not worker.process.is_alive():
+                    raise EOFError("worker exited")
+            replace = result.get("recycle", False)
+            kind = classify(result["returncode"], result["stderr"], False, result["log_overflow"],
+                            result["cpu_seconds"], limits)
+            return RenderResult(
+                args, result["returncode"], result["stdout"], result["stderr"], kind=kind,
+                wall_seconds=time.perf_counter() - start,
+                cpu_seconds=result["cpu_seconds"], peak_rss_mb=result["peak_rss_mb"],
+                log_truncated=result["log_overflow"],
+            )
+        except (EOFError, OSError, RuntimeError) as e:
+            # The worker itself died, e.g. SIGXCPU from its per-job CPU budget or the OOM killer
+            replace = True
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+            returncode = worker.process.exitcode if worker.process.exitcode is not None else -1
+            kind = classify(returncode, "", False, False, 0.0, limits)
+            if kind == "ok":
+                kind = "error"
+            return RenderResult(args, returncode, "", f"Render worker died: {e}", kind=kind,
+                                wall_seconds=time.perf_counter() - start)
+        finally:
+            if replace:
+                worker.process.join(timeout=5)
+                with self._lock:
+                    self.recycled += 1
+                worker = self._spawn()
+            self._idle.put(worker)
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                return
+
@@ -0,0 +1,329 @@
+import ast
+import os
+import re
+import sqlite3
+import threading
+import time
+from validator import MANIMGL_MODULES, manim_names
+from workspace import SCENE_FILENAME
+
+
+EXCEPTION_LINE = re.compile(r"^\s*([A-Za-z_][\w.]*(?:Error|Exception)):\s*(.*)$", re.MULTILINE)
+VALIDATOR_RULE = re.compile(r"^\s*line \d+: \[([\w-]+)\]", re.MULTILINE)
+# Plain Python tracebacks and manim's rich tracebacks point at the scene differently
+SCENE_LINE = (
+    re.compile(r'File "[^"]*' + re.escape(SCENE_FILENAME) + r'", line (\d+)'),
+    re.compile(re.escape(SCENE_FILENAME) + r":(\d+) in "),
+)
+
+
+# ====== ERROR SIGNATURES ======
+def normalize_message(message: str) -> str:
+    # Strip the parts that differ between occurrences of the same mistake
+    message = re.sub(r"<[^<>]* object at 0x[0-9a-fA-F]+>", "<obj>", message)
+    # Quoted identifiers (type, argument and variable names) are kept; other literals are not
+    message = re.sub(r"'[^']*'|\"[^\"]*\"",
+                     lambda m: m.group(0) if re.fullmatch(r"\W\w{1,40}\W", m.group(0)) else "<str>", message)
+    message = re.sub(r"0x[0-9a-fA-F]+", "<addr>", message)
+    message = re.sub(r"\b\d+(\.\d+)?\b", "<n>", message)
+    return re.sub(r"\s+", " ", message).strip()[:200]
+
+
+def error_signature(error_output: str):
+    # Static validator output and render tracebacks both reduce to one comparable string
+    rules = sorted(set(VALIDATOR_RULE.findall(error_output or "")))
+    if rules:
+        return "StaticValidation: " + ",".join(rules)
+    matches = EXCEPTION_LINE.findall(error_output or "")
+    if not matches:
+        return None
+    exc_type, message = matches[-1]
+    return f"{exc_type.split('.')[-1]}: {normalize_message(message)}"
+
+
+def failing_line(error_output: str):
+    # Innermost frame inside the scene file
+    for pattern in SCENE_LINE:
+        lines = pattern.findall(error_output or "")
+        if lines:
+            return int(lines[-1])
+    return None
+
+
+# ====== AST REWRITES ======
+# Each rule matches the raw error text and edits the parsed scene in place, returning True on change.
+COLOR_BASES = ("RED", "BLUE", "GREEN", "YELLOW", "ORANGE", "PURPLE", "PINK", "TEAL", "GOLD", "MAROON",
+               "GRAY", "GREY", "WHITE", "BLACK")
+RENAMED = {
+    # ManimGL / pre-0.1 names that Manim Community dropped
+    "ShowCreation": "Create",
+    "TextMobject": "Text",
+    "TexMobject": "MathTex",
+    "TexText": "Tex",
+    "FadeInFrom": "FadeIn",
+    "FadeOutAndShift": "FadeOut",
+    "ShowCreationThenDestruction": "ShowPassingFlash",
+    # Common color names that are not manim constants
+    "CYAN": "TEAL",
+    "MAGENTA": "PINK",
+    "VIOLET": "PURPLE",
+    "INDIGO": "PURPLE",
+    "BROWN": "DARK_BROWN",
+    "LIME": "GREEN",
+    "NAVY": "DARK_BLUE",
+}
+
+
+# Old animations whose direction argument became FadeIn/FadeOut's shift= keyword (FadeIn's second
+# positional parameter is something else); both defaulted to DOWN
+SHIFTED_ANIMATIONS = {"FadeInFrom", "FadeOutAndShift"}
+
+
+def replacement_name(name: str):
+    if name in RENAMED:
+        return RENAMED[name]
+    # LIGHT_TEAL, BRIGHT_RED, DEEP_BLUE... fall back to the base color
+    for base in COLOR_BASES:
+        if name.endswith("_" + base) or name.startswith(base + "_"):
+            return base
+    return None
+
+
+def fix_get_corner(tree, error_output: str) -> bool:
+    changed = False
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "get_corner"
+                and not node.args and not node.keywords):
+            node.args = [ast.BinOp(ast.Name("UP", ast.Load()), ast.Add(), ast.Name("RIGHT", ast.Load()))]
+            changed = True
+    return changed
+
+
+def fix_vgroup(tree, error_output: str) -> bool:
+    # Group accepts any Mobject; only the VGroup that failed (or one built from *args) is swapped
+    line = failing_line(error_output)
+    changed = False
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "VGroup"):
+            continue
+        if node.lineno == line or any(isinstance(arg, ast.Starred) for arg in node.args):
+            node.func.id = "Group"
+            changed = True
+    return changed
+
+
+def fix_unknown_name(tree, error_output: str) -> bool:
+    known = manim_names()
+    changed = False
+    for name in set(re.findall(r"NameError: name '(\w+)' is not defined", error_output)):
+        new_name = replacement_name(name)
+        if not new_name or (known and new_name not in known):
+            continue
+        if name in SHIFTED_ANIMATIONS:
+            changed |= fix_shifted_animation(tree, name, new_name)
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and node.id == name:
+                node.id = new_name
+                changed = True
+    return changed
+
+
+def fix_shifted_animation(tree, name: str, new_name: str) -> bool:
+    # FadeInFrom(mob, LEFT) -> FadeIn(mob, shift=LEFT); a bare reference is left for the LLM fix
+    changed = False
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == name):
+            continue
+        if not node.args or any(isinstance(a, ast.Starred) for a in node.args):
+            continue
+        direction = node.args[1] if len(node.args) > 1 else None
+        keywords = []
+        for keyword in node.keywords:
+            if keyword.arg in ("direction", "shift"):
+                direction = keyword.value
+            else:
+                keywords.append(keyword)
+        node.func.id = new_name
+        node.args = node.args[:1]
+        node.keywords = [ast.keyword(arg="shift", value=direction or ast.Name(id="DOWN", ctx=ast.Load()))] + keywords
+        changed = True
+    return changed
+
+
+def is_numeric_list(node) -> bool:
+    def numeric(element):
+        if isinstance(element, ast.UnaryOp) and isinstance(element.op, (ast.USub, ast.UAdd)):
+            element = element.operand
+        return isinstance(element, ast.Constant) and isinstance(element.value, (int, float))
+    return isinstance(node, ast.List) and 2 <= len(node.elts) <= 3 and all(numeric(e) for e in node.elts)
+
+
+def fix_list_arithmetic(tree, error_output: str) -> bool:
+    # Coordinates written as [x, y, z] become np.array([x, y, z]) so vector math works
+    changed = False
+    for node in ast.walk(tree):
+        for field in ("value", "left", "right"):
+            child = getattr(node, field, None)
+            if (isinstance(node, (ast.Assign, ast.BinOp)) and is_numeric_list(child)):
+                array = ast.Call(ast.Attribute(ast.Name("np", ast.Load()), "array", ast.Load()), [child], [])
+                setattr(node, field, array)
+                changed = True
+    if changed and not any(
+        isinstance(node, ast.Import) and any(a.name == "numpy" and a.asname == "np" for a in node.names)
+        for node in tree.body
+    ):
+        tree.body.insert(0, ast.Import([ast.alias("numpy", "np")]))
+    return changed
+
+
+def fix_manimgl_import(tree, error_output: str) -> bool:
+    changed = False
+    body = []
+    for node in tree.body:
+        module = None
+        if isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+        elif isinstance(node, ast.Import) and len(node.names) == 1:
+            module = node.names[0].name
+        if module is not None and module.split(".")[0] in MANIMGL_MODULES:
+            node = ast.ImportFrom("manim", [ast.alias("*")], 0)
+            changed = True
+        body.append(node)
+    tree.body = body
+    return changed
+
+
+REWRITE_RULES = [
+    ("get-corner-direction", re.compile(r"get_corner\(\) missing 1 required positional argument|\[get-corner-direction\]"),
+     fix_get_corner),
+    ("vgroup-to-group", re.compile(r"Only values of type VMobject can be added|\[vgroup-self-mobjects\]"), fix_vgroup),
+    ("rename-unknown-name", re.compile(r"NameError: name '\w+' is not defined"), fix_unknown_name),
+    ("list-to-array", re.compile(
+        r"unsupported operand type\(s\) for .{1,2}: '(list|float|int)' and '(list|float|int)'"
+        r"|can't multiply sequence by non-int|\[list-arithmetic\]"), fix_list_arithmetic),
+    ("manimgl-import", re.compile(r"No module named '(manimlib|manimgl)|\[manimgl-import\]"), fix_manimgl_import),
+]
+
+
+class Rewrite:
+    def __init__(self, signature: str, rules: list, code: str, seconds: float):
+        self.signature = signature
+        self.rules = rules
+        self.code = code
+        self.seconds = seconds
+
+    @property
+    def rule(self) -> str:
+        return "+".join(self.rules)
+
+
+# ====== REWRITE ENGINE ======
+# Signature -> rewrite success rates live in SQLite so poor rules are retired across restarts.
+class RewriteEngine:
+    def __init__(self, db_path: str, min_attempts: int = 10, min_success_rate: float = 0.2):
+        self.min_attempts = min_attempts
+        self.min_success_rate = min_success_rate
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outcomes (
+                signature TEXT NOT NULL,
+                rule TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                successes INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (signature, rule)
+            )
+            """
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value REAL)")
+        self._db.commit()
+
+    def _bump(self, name: str, amount: float = 1):
+        self._db.execute(
+            "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def _retired(self, signature: str, rule: str) -> bool:
+        row = self._db.execute(
+            "SELECT attempts, successes FROM outcomes WHERE signature = ? AND rule = ?", (signature, rule)
+        ).fetchone()
+        if row is None or row[0] < self.min_attempts:
+            return False
+        return row[1] / row[0] < self.min_success_rate
+
+    def rewrite(self, code: str, error_output: str, tried: set = None):
+        # Returns a Rewrite when a known signature could be fixed locally, else None (ask the LLM)
+        start = time.perf_counter()
+        signature = error_signature(error_output)
+        if signature is None:
+            return None
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return None
+        applied = []
+        with self._lock:
+            for name, pattern, fix in REWRITE_RULES:
+                if not pattern.search(error_output) or (signature, name) in (tried or ()):
+                    continue
+                if self._retired(signature, name):
+                    continue
+                if fix(tree, error_output):
+                    applied.append(name)
+        if not applied:
+            return None
+        new_code = ast.unparse(ast.fix_missing_locations(tree))
+        return Rewrite(signature, applied, new_code, time.perf_counter() - start)
+
+    def record(self, rewrite: Rewrite, success: bool):
+        # Success means the next render no longer failed with the same signature
+        with self._lock:
+            for rule in rewrite.rules:
+                self._db.execute(
+                    "INSERT INTO outcomes VALUES (?, ?, 1, ?, ?) ON CONFLICT(signature, rule) DO UPDATE SET "
+                    "attempts = attempts + 1, successes = successes + excluded.successes, last_used = excluded.last_used",
+                    (rewrite.signature, rule, int(success), time.time()),
+                )
+            self._bump("rewrites")
+            self._bump("rewrite_seconds", rewrite.seconds)
+            if success:
+                self._bump("llm_calls_avoided")
+            self._db.commit()
+
+    def record_llm_fix(self, seconds: float):
+        # Feeds the average Gemini fix latency used to estimate the time saved
+        with self._lock:
+            self._bump("llm_fix_calls")
+            self._bump("llm_fix_seconds", seconds)
+            self._db.commit()
+
+    def table(self) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT signature, rule, attempts, successes FROM outcomes ORDER BY attempts DESC"
+            ).fetchall()
+        return [
+            {"signature": s, "rule": r, "attempts": a, "successes": ok, "successRate": round(ok / a, 3)}
+            for s, r, a, ok in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+        llm_calls = counters.get("llm_fix_calls", 0)
+        mean_llm = counters.get("llm_fix_seconds", 0) / llm_calls if llm_calls else 0.0
+        avoided = int(counters.get("llm_calls_avoided", 0))
+        return {
+            "rewrites": int(counters.get("rewrites", 0)),
+            "llmFixCalls": int(llm_calls),
+            "llmCallsAvoided": avoided,
+            "meanLlmFixSeconds": round(mean_llm, 3),
+            "latencySavedSeconds": round(max(avoided * mean_llm - counters.get("rewrite_seconds", 0), 0.0), 2),
+            "signatures": self.table()[:20],
+        }
@@ -0,0 +1,213 @@
+import ast
+import threading
+
+
+# Scene API calls that belong to whichever section is running; every other self.<name>() in
+# construct must be one of the scene's own step methods (create_title, show_main_content, ...)
+SCENE_CALLS = {"play", "wait", "add", "remove", "clear", "bring_to_front", "bring_to_back", "next_section"}
+CLEARING_ANIMATIONS = {"FadeOut", "Uncreate", "Unwrite", "ShrinkToCenter"}
+# Only plain scenes: camera-moving scene types carry camera state from one section into the next
+SPLITTABLE_BASES = {"Scene"}
+
+
+class SectionPlan:
+    def __init__(self, scene_class: str, prelude: list, sections: list):
+        self.scene_class = scene_class
+        self.prelude = prelude  # statements replayed at the start of every section
+        self.sections = sections  # [[statement, ...], ...], each starting on an empty screen
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def class_name(self, index: int) -> str:
+        return f"{self.scene_class}Section{index}"
+
+    def script(self, code: str, index: int) -> str:
+        # The original module stays first, so tracebacks keep the scene's own line numbers
+        body = [ast.unparse(statement) for statement in self.prelude + self.sections[index]]
+        lines = [f"class {self.class_name(index)}({self.scene_class}):", "    def construct(self):"]
+        for statement in body:
+            lines.extend("        " + line for line in statement.splitlines())
+        return code.rstrip() + "\n\n\n" + "\n".join(lines) + "\n"
+
+
+# ====== STATIC ANALYSIS ======
+def self_call(statement):
+    # "self.name(...)" as a statement -> name, else None
+    if (isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call)
+            and isinstance(statement.value.func, ast.Attribute)
+            and isinstance(statement.value.func.value, ast.Name) and statement.value.func.value.id == "self"):
+        return statement.value.func.attr
+    return None
+
+
+def reachable_methods(name: str, methods: dict) -> set:
+    # The step method plus every helper it calls through self
+    seen, stack = set(), [name]
+    while stack:
+        current = stack.pop()
+        if current in seen or current not in methods:
+            continue
+        seen.add(current)
+        for node in ast.walk(methods[current]):
+            if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "self"
+                    and node.attr in methods):
+                stack.append(node.attr)
+    return seen
+
+
+def self_attribute(node):
+    # self.items[0].label -> "items": the self attribute an expression hangs off, else None
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "self":
+            return node.attr
+        node = node.value
+    return None
+
+
+def attribute_use(nodes: list, methods: dict) -> tuple:
+    # (self attributes written, self attributes read) by the statements and the methods they reach.
+    # Besides self.x = ..., a write is any call on a self attribute (self.items.append(...) may mutate
+    # it in place) and any assignment into one (self.items[0] = ..., self.title.color = ...).
+    bodies = list(nodes)
+    for statement in nodes:
+        for node in ast.walk(statement):
+            if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "self"
+                    and node.attr in methods):
+                bodies.extend(methods[m] for m in reachable_methods(node.attr, methods))
+    written, read = set(), set()
+    for body in bodies:
+        for node in ast.walk(body):
+            mutated = None
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+                mutated = self_attribute(node.func.value)
+            elif isinstance(node, (ast.Attribute, ast.Subscript)) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                mutated = self_attribute(node.value)
+            if mutated is not None and mutated not in methods:
+                written.add(mutated)
+            if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "self":
+                if node.attr in methods:
+                    continue
+                (written if isinstance(node.ctx, (ast.Store, ast.Del)) else read).add(node.attr)
+    return written, read
+
+
+def clears_screen(statement, methods: dict) -> bool:
+    # After this step nothing is left on screen: self.clear(), or a FadeOut/remove of self.mobjects
+    name = self_call(statement)
+    if name is None:
+        return False
+    if name == "clear":
+        return True
+    for body in [statement] + [methods[m] for m in reachable_methods(name, methods)]:
+        for node in ast.walk(body):
+            if not isinstance(node, ast.Call):
+                continue
+            if isinstance(node.func, ast.Attribute) and node.func.attr == "clear" and not node.args:
+                return True
+            callee = node.func.id if isinstance(node.func, ast.Name) else getattr(node.func, "attr", None)
+            if callee in CLEARING_ANIMATIONS | {"remove"} and any(
+                isinstance(n, ast.Attribute) and n.attr == "mobjects" for n in ast.walk(node)
+            ):
+                return True
+    return False
+
+
+def plan_sections(code: str, scene_class: str) -> tuple:
+    # Returns (SectionPlan, None) when the scene splits into 2+ independent sections, else (None, reason)
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None, "syntax_error"
+    cls = next((n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == scene_class), None)
+    if cls is None:
+        return None, "no_scene_class"
+    if {getattr(b, "id", None) for b in cls.bases} - SPLITTABLE_BASES:
+        return None, "scene_type"
+    methods = {n.name: n for n in cls.body if isinstance(n, ast.FunctionDef)}
+    construct = methods.get("construct")
+    if construct is None:
+        return None, "no_construct"
+    if any(isinstance(n, (ast.Global, ast.Nonlocal)) for n in ast.walk(cls)):
+        return None, "global_state"
+
+    prelude, sections, current = [], [], []
+    for statement in construct.body:
+        name = self_call(statement)
+        if name is None:
+            if current or sections:
+                return None, "statements_between_steps"
+            prelude.append(statement)
+            continue
+        if name not in methods and name not in SCENE_CALLS:
+            return None, "unknown_call"
+        # A new section starts at the first step after the screen was cleared
+        if sections and not current and name == "wait":
+            sections[-1].append(statement)
+            continue
+        current.append(statement)
+        if clears_screen(statement, methods):
+            sections.append(current)
+            current = []
+    if current:
+        sections.append(current)
+    if any(self_call(s) in SCENE_CALLS and self_call(s) != "wait" for s in prelude):
+        return None, "prelude_draws"
+
+    # A section reading state an earlier one left on self, or changed in place, is merged with every
+    # section from the first one that wrote it: the sections in between run before it in one render
+    merged, writes = [], []
+    for section in sections:
+        written, read = attribute_use(section, methods)
+        first = next((i for i, w in enumerate(writes) if w & read), None)
+        if first is not None:
+            section = [s for group in merged[first:] for s in group] + section
+            written = written.union(*writes[first:])
+            del merged[first:], writes[first:]
+        merged.append(section)
+        writes.append(written)
+    if len(merged) < 2:
+        return None, "dependent_sections" if len(sections) > 1 else "single_section"
+    return SectionPlan(scene_class, prelude, merged), None
+
+
+# ====== ACCOUNTING ======
+class SectionStats:
+    def __init__(self):
+        self.renders = 0
+        self.sectioned = 0
+        self.sections = 0
+        self.fallbacks = {}
+        self.scene_errors = 0  # section failures in the scene's own code, sent to the fix loop without a full render
+        self.section_seconds = 0.0  # sum of the section renders: roughly a single-process render
+        self.wall_seconds = 0.0  # parallel sections plus the concat
+        self._lock = threading.Lock()
+
+    def record_fallback(self, reason: str):
+        with self._lock:
+            self.renders += 1
+            self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+
+    def record_scene_error(self):
+        with self._lock:
+            self.renders += 1
+            self.scene_errors += 1
+
+    def record(self, sections: int, section_seconds: float, wall_seconds: float):
+        with self._lock:
+            self.renders += 1
+            self.sectioned += 1
+            self.sections += sections
+            self.section_seconds += section_seconds
+            self.wall_seconds += wall_seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "renders": self.renders,
+                "sectioned": self.sectioned,
+                "meanSections": round(self.sections / self.sectioned, 2) if self.sectioned else 0.0,
+                "fallbacks": dict(self.fallbacks),
+                "sceneErrors": self.scene_errors,
+                "estimatedSpeedup": round(self.section_seconds / self.wall_seconds, 2) if self.wall_seconds else None,
+            }
@@ -0,0 +1,212 @@
+import math
+import heapq
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import islice
+
+
+# Words that carry no topic information in tutoring prompts ("explain the ...", "how to ...", "... proof")
+FILLER_WORDS = {
+    "a", "an", "and", "the", "of", "to", "in", "on", "for", "with", "using", "use",
+    "explain", "explained", "explaining", "show", "me", "how", "what", "is", "are",
+    "step", "by", "please", "can", "you", "do", "does", "visualize", "understand",
+    "proof", "prove", "proving", "intro", "introduction", "basics", "overview", "about", "why", "works",
+    "teach", "lesson", "tutorial", "simple", "quick", "concept", "idea", "behind",
+    "find", "finding", "calculate", "calculating", "compute", "computing", "get", "out", "work",
+}
+# Inflections that do not change the topic: "pythagoras"/"pythagorean", "triangles"/"triangle"
+SUFFIXES = ("ations", "ation", "ean", "ian", "ing", "ies", "es", "as", "ed", "s")
+
+
+def stem(word: str) -> str:
+    word = re.sub(r"is(ation|e|ed|ing)$", r"iz\1", word)  # British spelling
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[:-len(suffix)]
+            break
+    # "circle" and "circles" -> "circl"
+    return word[:-1] if word.endswith("e") and len(word) > 4 else word
+
+
+def prompt_words(prompt: str) -> list:
+    return [w for w in re.findall(r"[a-z0-9']+", prompt.lower()) if w not in FILLER_WORDS]
+
+
+def is_constraint(word: str) -> bool:
+    return len(word) == 1 or any(c.isdigit() for c in word)
+
+
+def prompt_constraints(prompt: str) -> frozenset:
+    # Numbers and single letters (x^3, n = 5, angle A) pick a different problem on the same topic,
+    # so they must match exactly however similar the rest of the wording is
+    return frozenset(w for w in prompt_words(prompt) if is_constraint(w))
+
+
+def prompt_stems(prompt: str) -> tuple:
+    return tuple(stem(w) for w in prompt_words(prompt) if not is_constraint(w))
+
+
+@lru_cache(maxsize=65536)
+def word_grams(word: str) -> frozenset:
+    padded = f" {word} "
+    return frozenset(padded[i:i + 3] for i in range(max(len(padded) - 2, 1)))
+
+
+def same_word(a: str, b: str, min_overlap: float = 0.5) -> bool:
+    # Exact stem, or close enough to be a misspelling ("pythagorus"); "sine" and "cosine" are not
+    if a == b:
+        return True
+    ga, gb = word_grams(a), word_grams(b)
+    return len(ga & gb) / len(ga | gb) >= min_overlap
+
+
+# ====== FEATURE EXTRACTION ======
+def prompt_ngrams(prompt: str, n: int = 3, word_weight: int = 2) -> Counter:
+    # Character n-grams absorb spelling variants; the whole stem, counted word_weight times, keeps
+    # words that share most of their letters ("sines"/"cosines") apart
+    grams = Counter()
+    for word in prompt_words(prompt):
+        if is_constraint(word):
+            continue  # matched exactly through prompt_constraints
+        word = stem(word)
+        grams[f"<{word}>"] += word_weight
+        padded = f" {word} "
+        if len(padded) <= n:
+            grams[padded] += 1
+            continue
+        for i in range(len(padded) - n + 1):
+            grams[padded[i:i + n]] += 1
+    return grams
+
+
+# ====== CHARACTER N-GRAM TF-IDF INDEX ======
+# Candidates come from the posting lists of the rarest query n-grams, so lookups
+# stay fast as the corpus grows; only those candidates are scored exactly. Document
+# weights and norms are computed when a prompt is added and refreshed in bulk whenever
+# the corpus has doubled, so a query never re-weights a document.
+class PromptIndex:
+    def __init__(self, n: int = 3, probe_grams: int = 8, max_candidates: int = 50, max_postings: int = 3000):
+        self.n = n
+        self.probe_grams = probe_grams
+        self.max_candidates = max_candidates
+        self.max_postings = max_postings  # posting entries read per query, rarest grams first
+        self._docs = {}  # key -> Counter of grams
+        self._weights = {}  # key -> ({gram: weight}, norm)
+        self._constraints = {}
+        self._stems = {}
+        self._prompts = {}
+        # (constraints, gram) -> keys: a query only ever reads documents with its own constraints
+        self._postings = defaultdict(set)
+        self._df = Counter()  # gram -> documents containing it, for idf
+        self._reweight_at = 64
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, key: str, prompt: str):
+        grams = prompt_ngrams(prompt, self.n)
+        if not grams:
+            return
+        with self._lock:
+            self._remove(key)
+            constraints = prompt_constraints(prompt)
+            self._docs[key] = grams
+            self._constraints[key] = constraints
+            self._stems[key] = prompt_stems(prompt)
+            self._prompts[key] = prompt
+            for gram in grams:
+                self._postings[(constraints, gram)].add(key)
+            self._df.update(grams.keys())
+            if len(self._docs) >= self._reweight_at:
+                self._reweight_at = 2 * len(self._docs)
+                for doc_key in self._docs:
+                    self._weigh(doc_key)
+            else:
+                self._weigh(key)
+
+    def remove(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def search(self, prompt: str, limit: int = 5) -> list:
+        query = prompt_ngrams(prompt, self.n)
+        if not query:
+            return []
+        constraints = prompt_constraints(prompt)
+        with self._lock:
+            total = len(self._docs)
+            if not total:
+                return []
+            idf = {gram: self._idf(gram, total) for gram in query}
+            # Probe the most selective grams first to build a small candidate set
+            probes = sorted((g for g in query if (constraints, g) in self._postings), key=lambda g: -idf[g])
+            votes = Counter()
+            budget = self.max_postings
+            for gram in probes[:self.probe_grams]:
+                if budget <= 0:
+                    break
+                posting = self._postings[(constraints, gram)]
+                votes.update(dict.fromkeys(islice(posting, budget), idf[gram]))
+                budget -= len(posting)
+            # Shorter documents sharing the same grams are closer: rank by votes over the stored norm
+            candidates = heapq.nlargest(self.max_candidates, votes, key=lambda key: votes[key] / self._weights[key][1])
+            stems = prompt_stems(prompt)
+
+            q_weights = {g: tf * idf[g] for g, tf in query.items()}
+            q_norm = math.sqrt(sum(w * w for w in q_weights.values()))
+            scored = []
+            for key in candidates:
+                weights, d_norm = self._weights[key]
+                dot = sum(weight * weights[gram] for gram, weight in q_weights.items() if gram in weights)
+                if dot and d_norm:
+                    score = min(dot / (q_norm * d_norm), 1.0) * self._coverage(stems, self._stems[key], total)
+                    scored.append((score, key))
+            scored.sort(reverse=True)
+            return [
+                {"key": key, "prompt": self._prompts[key], "score": round(score, 4)}
+                for score, key in scored[:limit]
+            ]
+
+    def best_match(self, prompt: str, threshold: float):
+        matches = self.search(prompt, limit=1)
+        if matches and matches[0]["score"] >= threshold:
+            return matches[0]
+        return None
+
+    def _coverage(self, a: tuple, b: tuple, total: int) -> float:
+        # Share of each side's topic words (idf-weighted) found on the other side. Character n-grams
+        # alone score "law of cosines" against "law of sines" as a near duplicate.
+        def covered(words, others):
+            weights = [self._idf(f"<{w}>", total) for w in words]
+            hit = sum(weight for w, weight in zip(words, weights) if any(same_word(w, o) for o in others))
+            return hit / sum(weights) if weights else 1.0
+        return min(covered(a, b), covered(b, a))
+
+    def _idf(self, gram: str, total: int) -> float:
+        return math.log((1 + total) / (1 + self._df.get(gram, 0))) + 1.0
+
+    def _weigh(self, key: str):
+        total = len(self._docs)
+        weights = {gram: tf * self._idf(gram, total) for gram, tf in self._docs[key].items()}
+        self._weights[key] = (weights, math.sqrt(sum(w * w for w in weights.values())))
+
+    def _remove(self, key: str):
+        grams = self._docs.pop(key, None)
+        self._weights.pop(key, None)
+        constraints = self._constraints.pop(key, None)
+        self._stems.pop(key, None)
+        self._prompts.pop(key, None)
+        if not grams:
+            return
+        self._df.subtract(grams.keys())
+        for gram in grams:
+            posting = self._postings.get((constraints, gram))
+            if posting is not None:
+                posting.discard(key)
+                if not posting:
+                    del self._postings[(constraints, gram)]
+            if self._df[gram] <= 0:
+                del self._df[gram]
@@ -0,0 +1,105 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+from jobs import JobCancelled, log
+from metrics import percentile
+
+
+# ====== CANDIDATE VIEW OF A JOB ======
+class LinkedEvent:
+    # Set on its own (another candidate won) or through the parent (the whole job was cancelled)
+    def __init__(self, parent: threading.Event):
+        self.parent = parent
+        self._event = threading.Event()
+
+    def set(self):
+        self._event.set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set() or self.parent.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._event.wait(timeout) or self.parent.is_set()
+
+
+class Candidate:
+    # Stands in for the Job in the render/fix pipeline for one speculative candidate. Timings,
+    # events and render usage go to the job, tagged with the candidate; cancellation is separate.
+    # Once cancelled, a candidate no longer writes to the job, which may already be published.
+    def __init__(self, job, index: int, render_budget: threading.BoundedSemaphore):
+        self.job = job
+        self.index = index
+        self.cancel_event = LinkedEvent(job.cancel_event)
+        # Caps how many of this job's candidates render at once, on top of the global render slots
+        self.render_budget = render_budget
+
+    def __getattr__(self, name):
+        return getattr(self.job, name)
+
+    def emit(self, event: str, **data) -> dict:
+        if self.cancel_event.is_set():
+            return {}
+        return self.job.emit(event, candidate=self.index, **data)
+
+    def log(self, message: str, **data):
+        if self.cancel_event.is_set():
+            log(f"[Candidate {self.index}] {message}", self.job.correlation_id)
+            return
+        self.job.log(f"[Candidate {self.index}] {message}", candidate=self.index, **data)
+
+    @contextmanager
+    def stage(self, name: str, **data):
+        # Every stage of a candidate touches disk or the LLM, so none starts after the candidate lost
+        self.check_cancelled()
+        with self.job.stage(name, keep=lambda: not self.cancel_event.is_set(), candidate=self.index, **data):
+            yield
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Candidate {self.index} of job {self.job.id} was cancelled")
+
+
+# ====== SEQUENTIAL VS SPECULATIVE ======
+LLM_STAGES = ("generate", "alignment", "fix")
+
+
+class SpeculationStats:
+    # Recent jobs per mode, so the two modes can be compared on tail latency and compute spent.
+    # Compute includes losing candidates: their renders and their discarded LLM stages.
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, mode: str, seconds: float, succeeded: bool, job):
+        usage = job.render_usage
+        sample = {
+            "seconds": seconds,
+            "succeeded": succeeded,
+            "renders": len(usage),
+            "renderCpuSeconds": sum(u["cpuSeconds"] for u in usage),
+            "renderWallSeconds": sum(u["wallSeconds"] for u in usage),
+            "llmCalls": sum(len(job.timings.get(name, [])) + len(job.discarded_timings.get(name, []))
+                            for name in LLM_STAGES),
+            "discardedLlmCalls": sum(len(job.discarded_timings.get(name, [])) for name in LLM_STAGES),
+        }
+        with self._lock:
+            self._samples.setdefault(mode, deque(maxlen=self.window)).append(sample)
+
+    def stats(self) -> dict:
+        with self._lock:
+            modes = {mode: list(samples) for mode, samples in self._samples.items()}
+        report = {}
+        for mode, samples in modes.items():
+            ordered = sorted(s["seconds"] for s in samples)
+            count = len(samples)
+            report[mode] = {
+                "jobs": count,
+                "successRate": round(sum(s["succeeded"] for s in samples) / count, 3),
+                "p50Seconds": round(percentile(ordered, 50), 3),
+                "p95Seconds": round(percentile(ordered, 95), 3),
+                "p99Seconds": round(percentile(ordered, 99), 3),
+                **{f"mean{name[0].upper()}{name[1:]}": round(sum(s[name] for s in samples) / count, 3)
+                   for name in ("renders", "renderCpuSeconds", "renderWallSeconds", "llmCalls", "discardedLlmCalls")},
+            }
+        return report
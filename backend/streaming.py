@@ -0,0 +1,99 @@
+import mimetypes
+import os
+import re
+import shutil
+import subprocess
+from fastapi.staticfiles import StaticFiles
+
+
+# Not in every platform's mime table; players refuse segments served as text/plain
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+# Served file names are unique per job and never rewritten, so clients may cache them for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+# ====== MUX / SEGMENT ======
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def run_ffmpeg(args: list, timeout: float):
+    proc = subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", *args],
+                          capture_output=True, text=True, timeout=timeout)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {proc.returncode}: {proc.stderr.strip()[-1000:]}")
+
+
+def mux_faststart(video_path: str, audio_path: str, out_path: str, timeout: float = 120):
+    # The video stream is copied as rendered; only the narration is encoded (mp3 -> AAC for browsers).
+    # +faststart moves the moov atom to the front so playback starts before the download finishes.
+    run_ffmpeg([
+        "-i", video_path, "-i", audio_path,
+        "-map", "0:v:0", "-map", "1:a:0",
+        "-c:v", "copy", "-c:a", "aac", "-b:a", "128k",
+        "-movflags", "+faststart",
+        out_path,
+    ], timeout)
+
+
+def segment_hls(mp4_path: str, out_dir: str, segment_seconds: float = 4, timeout: float = 120):
+    # Stream copy, so segments are cut at the render's keyframes and may run longer than requested
+    os.makedirs(out_dir, exist_ok=True)
+    run_ffmpeg([
+        "-i", mp4_path,
+        "-c", "copy",
+        "-f", "hls",
+        "-hls_time", str(segment_seconds),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(out_dir, "segment_%03d.ts"),
+        os.path.join(out_dir, "index.m3u8"),
+    ], timeout)
+
+
+def concat_lossless(paths: list, out_path: str, timeout: float = 120):
+    # Concat demuxer with stream copy: the clips come from the same manim settings, so their
+    # encoder parameters match and the joined mp4 carries their frames without re-encoding
+    list_path = out_path + ".concat.txt"
+    with open(list_path, "w") as f:
+        for path in paths:
+            f.write("file '%s'\n" % os.path.abspath(path).replace("'", "'\\''"))
+    try:
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", out_path], timeout)
+    finally:
+        os.remove(list_path)
+
+
+def probe_duration(path: str, timeout: float = 30):
+    # Seconds from the container header; `ffmpeg -i` without an output exits non-zero by design
+    proc = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True, timeout=timeout)
+    match = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", proc.stderr)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def extract_poster(video_path: str, out_path: str, at_seconds: float, width: int = 480, timeout: float = 30):
+    # One scaled JPEG frame; seeking before -i jumps to the nearest keyframe instead of decoding up to it
+    run_ffmpeg([
+        "-ss", f"{at_seconds:.2f}", "-i", video_path,
+        "-frames:v", "1", "-vf", f"scale={width}:-2", "-q:v", "4",
+        out_path,
+    ], timeout)
+
+
+def hls_dirname(video_filename: str) -> str:
+    # The playlist directory sits next to its mp4 so the result cache can remove both together
+    return os.path.splitext(video_filename)[0] + "_hls"
+
+
+# ====== STATIC SERVING ======
+class ImmutableStaticFiles(StaticFiles):
+    # FileResponse already answers Range requests with 206 partial content (seeking, resumed
+    # downloads, progressive playback); this adds the long-lived cache header on top.
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -0,0 +1,550 @@
+import argparse
+import math
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from string import Template as SourceTemplate
+from metrics import percentile
+from validator import check_scene, format_diagnostics
+
+
+# ====== SCENE SOURCES ======
+# Every template follows the generation prompt's mandatory structure (title, content, clear,
+# conclusion), so section rendering can split it like a generated scene. Parameters are substituted
+# with string.Template ($name) because the LaTeX in the scenes is full of braces.
+PYTHAGOREAN_SCENE = r'''from manim import *
+import numpy as np
+
+
+class GeneratedScene(Scene):
+    def construct(self):
+        self.create_title()
+        self.show_main_content()
+        self.wait(1)
+        self.clear_screen()
+        self.create_conclusion()
+        self.wait(2)
+
+    def create_title(self):
+        title = Text("The Pythagorean Theorem", font_size=44, color=BLUE)
+        title.to_edge(UP, buff=0.8)
+        self.play(Write(title), run_time=1.5)
+
+    def show_main_content(self):
+        # Legs scaled so the longer one is 3 units long; the right angle sits at A
+        scale = 3.0 / max($a, $b)
+        A = np.array([-5.0, -2.2, 0])
+        B = A + np.array([$a * scale, 0, 0])
+        C = A + np.array([0, $b * scale, 0])
+        triangle = Polygon(A, B, C, color=WHITE)
+        right_angle = Square(side_length=0.3, color=WHITE).move_to(A + np.array([0.15, 0.15, 0]))
+        label_a = Text("a = $a", font_size=28, color=GREEN).next_to(Line(A, B), DOWN, buff=0.2)
+        label_b = Text("b = $b", font_size=28, color=GREEN).next_to(Line(A, C), LEFT, buff=0.2)
+        outward = np.array([$b, $a, 0]) / np.linalg.norm(np.array([$b, $a, 0]))
+        label_c = Text("c = ?", font_size=28, color=YELLOW).move_to((B + C) / 2 + outward * 0.6)
+        self.play(Create(triangle), Create(right_angle), run_time=1.5)
+        self.play(Write(label_a), Write(label_b), Write(label_c))
+        self.wait(0.5)
+
+        steps = VGroup(
+            MathTex(r"a^2 + b^2 = c^2", font_size=40),
+            MathTex(r"$squares", font_size=40),
+            MathTex(r"c = \sqrt{$c_squared} $c_text", font_size=40),
+        ).arrange(DOWN, buff=0.5).move_to(RIGHT * 2.5)
+        for step in steps:
+            self.play(Write(step), run_time=1.2)
+            self.wait(0.5)
+
+    def clear_screen(self):
+        self.play(FadeOut(Group(*self.mobjects)), run_time=1)
+
+    def create_conclusion(self):
+        conclusion = VGroup(
+            Text("In a right triangle with legs $a and $b,", font_size=32),
+            Text("the hypotenuse is c $c_words", font_size=32, color=YELLOW),
+        ).arrange(DOWN, buff=0.4).move_to(ORIGIN)
+        self.play(Write(conclusion), run_time=2)
+'''
+
+QUADRATIC_SCENE = r'''from manim import *
+
+
+class GeneratedScene(Scene):
+    def construct(self):
+        self.create_title()
+        self.show_main_content()
+        self.wait(1)
+        self.clear_screen()
+        self.create_conclusion()
+        self.wait(2)
+
+    def create_title(self):
+        title = Text("The Quadratic Formula", font_size=44, color=BLUE)
+        title.to_edge(UP, buff=0.8)
+        self.play(Write(title), run_time=1.5)
+
+    def show_main_content(self):
+        equation = MathTex(r"$equation", font_size=44, color=YELLOW).move_to(UP * 1.6)
+        self.play(Write(equation))
+        coefficients = MathTex(r"a = $a,\quad b = $b,\quad c = $c", font_size=36).next_to(equation, DOWN, buff=0.4)
+        self.play(FadeIn(coefficients))
+        formula = MathTex(r"x = \frac{-b \pm \sqrt{b^2 - 4ac}}{2a}", font_size=40).next_to(coefficients, DOWN, buff=0.5)
+        self.play(Write(formula), run_time=1.5)
+        self.wait(0.5)
+        discriminant = MathTex(r"b^2 - 4ac = $discriminant", font_size=36).next_to(formula, DOWN, buff=0.5)
+        self.play(Write(discriminant))
+        self.wait(0.5)
+
+    def clear_screen(self):
+        self.play(FadeOut(Group(*self.mobjects)), run_time=1)
+
+    def create_conclusion(self):
+        roots = MathTex(r"$roots", font_size=44, color=GREEN).move_to(UP * 0.5)
+        note = Text("$root_words", font_size=30).next_to(roots, DOWN, buff=0.6)
+        self.play(Write(roots), run_time=1.5)
+        self.play(FadeIn(note))
+'''
+
+UNIT_CIRCLE_SCENE = r'''from manim import *
+import numpy as np
+
+
+class GeneratedScene(Scene):
+    def construct(self):
+        self.create_title()
+        self.show_main_content()
+        self.wait(1)
+        self.clear_screen()
+        self.create_conclusion()
+        self.wait(2)
+
+    def create_title(self):
+        title = Text("The Unit Circle", font_size=44, color=BLUE)
+        title.to_edge(UP, buff=0.8)
+        self.play(Write(title), run_time=1.5)
+
+    def show_main_content(self):
+        center = np.array([-2.5, -0.4, 0])
+        radius = 1.8
+        x_axis = Line(center + LEFT * 2.2, center + RIGHT * 2.2, color=GRAY)
+        y_axis = Line(center + DOWN * 2.2, center + UP * 2.2, color=GRAY)
+        circle = Circle(radius=radius, color=BLUE).move_to(center)
+        self.play(Create(x_axis), Create(y_axis), Create(circle), run_time=1.5)
+
+        angle = $angle * DEGREES
+        point = center + radius * np.array([np.cos(angle), np.sin(angle), 0])
+        foot = np.array([point[0], center[1], 0])
+        radius_line = Line(center, point, color=YELLOW)
+        dot = Dot(point, color=YELLOW)
+        arc = Arc(radius=0.5, start_angle=0, angle=angle, arc_center=center, color=WHITE)
+        angle_label = MathTex(r"\theta = $angle^\circ", font_size=30).next_to(arc, RIGHT, buff=0.15)
+        self.play(Create(radius_line), FadeIn(dot), Create(arc), Write(angle_label))
+        cos_segment = Line(center, foot, color=GREEN, stroke_width=6)
+        sin_segment = DashedLine(foot, point, color=RED)
+        self.play(Create(cos_segment), Create(sin_segment))
+
+        values = VGroup(
+            MathTex(r"\cos\theta = $cos_value", font_size=40, color=GREEN),
+            MathTex(r"\sin\theta = $sin_value", font_size=40, color=RED),
+            MathTex(r"\cos^2\theta + \sin^2\theta = 1", font_size=36),
+        ).arrange(DOWN, buff=0.5).move_to(RIGHT * 3)
+        for value in values:
+            self.play(Write(value))
+            self.wait(0.5)
+
+    def clear_screen(self):
+        self.play(FadeOut(Group(*self.mobjects)), run_time=1)
+
+    def create_conclusion(self):
+        conclusion = VGroup(
+            Text("The point at $angle degrees on the unit circle", font_size=32),
+            Text("is ($cos_value, $sin_value)", font_size=32, color=YELLOW),
+        ).arrange(DOWN, buff=0.4).move_to(ORIGIN)
+        self.play(Write(conclusion), run_time=2)
+'''
+
+VENN_SCENE = r'''from manim import *
+
+
+class GeneratedScene(Scene):
+    def construct(self):
+        self.create_title()
+        self.show_main_content()
+        self.wait(1)
+        self.clear_screen()
+        self.create_conclusion()
+        self.wait(2)
+
+    def create_title(self):
+        title = Text("Venn Diagrams", font_size=44, color=BLUE)
+        title.to_edge(UP, buff=0.8)
+        self.play(Write(title), run_time=1.5)
+
+    def show_main_content(self):
+        left = Circle(radius=1.6, color=BLUE, fill_opacity=0.3).move_to(LEFT * 1.0 + DOWN * 0.3)
+        right = Circle(radius=1.6, color=GREEN, fill_opacity=0.3).move_to(RIGHT * 1.0 + DOWN * 0.3)
+        left_label = Text($left_name, font_size=30, color=BLUE).next_to(left, UP, buff=0.2).shift(LEFT * 0.8)
+        right_label = Text($right_name, font_size=30, color=GREEN).next_to(right, UP, buff=0.2).shift(RIGHT * 0.8)
+        self.play(DrawBorderThenFill(left), DrawBorderThenFill(right), run_time=1.5)
+        self.play(Write(left_label), Write(right_label))
+
+        only_left = Text("only", font_size=24).move_to(LEFT * 1.8 + DOWN * 0.3)
+        both = Text("both", font_size=24).move_to(DOWN * 0.3)
+        only_right = Text("only", font_size=24).move_to(RIGHT * 1.8 + DOWN * 0.3)
+        self.play(FadeIn(only_left), FadeIn(both), FadeIn(only_right))
+        self.wait(0.5)
+
+        overlap = Intersection(left, right, color=YELLOW, fill_opacity=0.7)
+        intersection = MathTex(r"A \cap B", font_size=36, color=YELLOW).to_edge(DOWN, buff=0.9)
+        self.play(FadeIn(overlap), Write(intersection))
+        self.wait(0.5)
+        union = Union(left, right, color=ORANGE, fill_opacity=0.2)
+        union_label = MathTex(r"A \cup B", font_size=36, color=ORANGE).to_edge(DOWN, buff=0.9)
+        self.play(FadeOut(overlap), FadeIn(union), ReplacementTransform(intersection, union_label))
+        self.wait(0.5)
+
+    def clear_screen(self):
+        self.play(FadeOut(Group(*self.mobjects)), run_time=1)
+
+    def create_conclusion(self):
+        formula = MathTex(r"|A \cup B| = |A| + |B| - |A \cap B|", font_size=40, color=YELLOW).move_to(UP * 0.5)
+        note = Text("The overlap is counted once, not twice", font_size=30).next_to(formula, DOWN, buff=0.6)
+        self.play(Write(formula), run_time=1.5)
+        self.play(FadeIn(note))
+'''
+
+
+# ====== PARAMETERS ======
+def number_text(value: float) -> str:
+    return str(int(round(value))) if abs(value - round(value)) < 1e-9 else f"{value:.3f}".rstrip("0").rstrip(".")
+
+
+def pythagorean_params(prompt: str) -> tuple:
+    # "sides 5 and 12", "a = 6, b = 8": the first two whole numbers are the legs
+    numbers = re.findall(r"\b\d+\b", prompt)
+    a, b = (int(numbers[0]), int(numbers[1])) if len(numbers) >= 2 else (3, 4)
+    if not (1 <= a <= 30 and 1 <= b <= 30):
+        return None, prompt
+    rest = re.sub(r"\b\d+\b", " ", prompt, count=2) if len(numbers) >= 2 else prompt
+    return {"a": a, "b": b}, rest
+
+
+def pythagorean_values(params: dict) -> dict:
+    a, b = params["a"], params["b"]
+    c_squared = a * a + b * b
+    c = math.sqrt(c_squared)
+    exact = c == int(c)
+    return {
+        **params,
+        "squares": f"{a}^2 + {b}^2 = {a * a} + {b * b} = {c_squared}",
+        "c_squared": c_squared,
+        "c_text": f"= {int(c)}" if exact else rf"\approx {c:.2f}",
+        "c_words": f"= {int(c)}" if exact else f"= sqrt({c_squared}), about {c:.2f}",
+        "c_spoken": f"{int(c)}" if exact else f"about {c:.2f}",
+    }
+
+
+QUADRATIC_EQUATION = re.compile(
+    r"([+-]?\s*\d*)\s*x\s*(?:\^\s*2|²)\s*(?:([+-]\s*\d*)\s*x(?![\w^²]))?\s*(?:([+-]\s*\d+))?\s*=\s*0"
+)
+
+
+def coefficient(text, default: int) -> int:
+    text = (text or "").replace(" ", "")
+    if text in ("", "+"):
+        return default
+    if text == "-":
+        return -default
+    return int(text)
+
+
+def quadratic_params(prompt: str) -> tuple:
+    match = QUADRATIC_EQUATION.search(prompt)
+    if match is None:
+        return {"a": 1, "b": -5, "c": 6}, prompt
+    a = coefficient(match.group(1), 1)
+    b = coefficient(match.group(2), 1) if match.group(2) is not None else 0
+    c = coefficient(match.group(3), 0) if match.group(3) is not None else 0
+    if a == 0 or max(abs(a), abs(b), abs(c)) > 50:
+        return None, prompt
+    return {"a": a, "b": b, "c": c}, prompt[:match.start()] + " " + prompt[match.end():]
+
+
+def quadratic_values(params: dict) -> dict:
+    a, b, c = params["a"], params["b"], params["c"]
+    terms = [f"{'-' if a < 0 else ''}{abs(a) if abs(a) != 1 else ''}x^2"]
+    if b:
+        terms.append(f"{'-' if b < 0 else '+'} {abs(b) if abs(b) != 1 else ''}x")
+    if c:
+        terms.append(f"{'-' if c < 0 else '+'} {abs(c)}")
+    discriminant = b * b - 4 * a * c
+    if discriminant > 0:
+        x1 = (-b + math.sqrt(discriminant)) / (2 * a)
+        x2 = (-b - math.sqrt(discriminant)) / (2 * a)
+        roots = rf"x_1 = {number_text(x1)},\quad x_2 = {number_text(x2)}"
+        words = "Two real roots, because b^2 - 4ac is positive"
+    elif discriminant == 0:
+        roots = f"x = {number_text(-b / (2 * a))}"
+        words = "One repeated root, because b^2 - 4ac is zero"
+    else:
+        real = number_text(-b / (2 * a))
+        imaginary = number_text(math.sqrt(-discriminant) / (2 * abs(a)))
+        roots = rf"x = {real} \pm {imaginary}i"
+        words = "No real roots, because b^2 - 4ac is negative"
+    return {**params, "equation": " ".join(terms) + " = 0", "discriminant": discriminant, "roots": roots,
+            "root_words": words}
+
+
+def unit_circle_params(prompt: str) -> tuple:
+    match = re.search(r"\b(\d{1,3})\s*(?:°|degrees?\b|deg\b)", prompt)
+    if match is None:
+        return {"angle": 30}, prompt
+    angle = int(match.group(1))
+    if not 0 <= angle <= 360:
+        return None, prompt
+    return {"angle": angle}, prompt[:match.start()] + " " + prompt[match.end():]
+
+
+def unit_circle_values(params: dict) -> dict:
+    radians = math.radians(params["angle"])
+    return {**params, "cos_value": number_text(round(math.cos(radians), 3) + 0.0),
+            "sin_value": number_text(round(math.sin(radians), 3) + 0.0)}
+
+
+def venn_params(prompt: str) -> tuple:
+    # "venn diagram of cats and dogs": two short one-word set names
+    match = re.search(r"\b(?:of|for|with|between)\s+([a-z]{2,14})\s+(?:and|&|vs)\s+([a-z]{2,14})\b", prompt)
+    if match is None or match.group(1) in VOCABULARY["venn_diagram"]:
+        return {"left_name": "A", "right_name": "B"}, prompt
+    return ({"left_name": match.group(1).title(), "right_name": match.group(2).title()},
+            prompt[:match.start()] + " " + prompt[match.end():])
+
+
+def venn_values(params: dict) -> dict:
+    # Names go into Text(...) as Python literals
+    return {"left_name": repr(params["left_name"]), "right_name": repr(params["right_name"])}
+
+
+# ====== TOPIC CLASSIFIER ======
+# A prompt matches a template when it names the topic (a trigger) and every other word is either
+# generic request phrasing or the topic's own vocabulary. Anything more specific ("prove ...",
+# "derive ...", "using similar triangles") falls through to Gemini.
+GENERIC_WORDS = frozenset("""
+    a an the of to in on for with and about by is are it its this that what whats how do does can
+    you me i we please want show showing explain explained explaining explanation visualize visualise
+    visualization illustrate demonstrate teach understand understanding learn intro introduction
+    basics basic simple simply video animation animate concept lesson overview tell make create draw
+    step example examples work works using use
+""".split())
+
+VOCABULARY = {
+    "pythagorean_theorem": frozenset("""
+        pythagorean pythagoras s theorem right triangle triangles hypotenuse leg legs side sides
+        length lengths application applications formula find calculate missing
+    """.split()),
+    "quadratic_formula": frozenset("""
+        quadratic formula equation equations solve solving solution solutions root roots find
+        discriminant x
+    """.split()),
+    "unit_circle": frozenset("""
+        unit circle trigonometric trigonometry trig ratio ratios sine cosine sin cos angle angles
+        degree degrees deg value values point coordinates at
+    """.split()),
+    "venn_diagram": frozenset("""
+        venn diagram diagrams set sets two union intersection overlap operation operations theory
+    """.split()),
+}
+
+
+class SceneTemplate:
+    def __init__(self, name: str, version: str, triggers: str, source: str, extract, values, narration: str):
+        self.name = name
+        self.version = version  # part of the cache key: bump when the scene changes
+        self.triggers = re.compile(triggers)
+        self.source = SourceTemplate(source)
+        self.extract = extract  # extract(prompt) -> (params or None, prompt without the parameter text)
+        self.values = values  # values(params) -> substitutions for the scene and narration
+        self.narration = SourceTemplate(narration)
+        self.vocabulary = VOCABULARY[name]
+
+    def scene(self, params: dict) -> tuple:
+        # (manim_code, transcript)
+        values = self.values(params)
+        return self.source.substitute(values), self.narration.substitute({**values, **params})
+
+
+class TemplateMatch:
+    def __init__(self, template: SceneTemplate, params: dict):
+        self.template = template
+        self.params = params
+
+    def scene(self) -> tuple:
+        return self.template.scene(self.params)
+
+
+TEMPLATES = [
+    SceneTemplate(
+        "pythagorean_theorem", "1", r"\bpythagor", PYTHAGOREAN_SCENE, pythagorean_params, pythagorean_values,
+        "In a right triangle, the squares of the two legs add up to the square of the hypotenuse. "
+        "With legs $a and $b, we get $a squared plus $b squared, which is $c_squared. "
+        "The hypotenuse is the square root of $c_squared, so c is $c_spoken.",
+    ),
+    SceneTemplate(
+        "quadratic_formula", "1", r"\bquadratic\b|x\s*(?:\^\s*2|²)", QUADRATIC_SCENE, quadratic_params,
+        quadratic_values,
+        "Every quadratic equation a x squared plus b x plus c equals zero can be solved with the quadratic formula. "
+        "Here a is $a, b is $b and c is $c. The discriminant, b squared minus four a c, is $discriminant. "
+        "$root_words.",
+    ),
+    SceneTemplate(
+        "unit_circle", "1", r"\bunit circle\b", UNIT_CIRCLE_SCENE, unit_circle_params, unit_circle_values,
+        "The unit circle has radius one, so a point at angle theta sits at cosine theta, sine theta. "
+        "At $angle degrees, the cosine is $cos_value and the sine is $sin_value. "
+        "Because the radius is one, cosine squared plus sine squared always equals one.",
+    ),
+    SceneTemplate(
+        "venn_diagram", "1", r"\bvenn\b", VENN_SCENE, venn_params, venn_values,
+        "A Venn diagram draws each set as a circle. Here the sets are $left_name and $right_name. "
+        "The overlap holds what belongs to both, the intersection. Everything inside either circle is the union. "
+        "To count the union, add both sets and subtract the overlap once.",
+    ),
+]
+
+
+class TemplateRegistry:
+    def __init__(self, templates: list = None):
+        self.templates = []
+        self.disabled = {}  # name -> reason
+        self.failures = {}
+        # A template is only served if its scene passes the static validator with default parameters
+        for template in templates if templates is not None else TEMPLATES:
+            params, _ = template.extract("")
+            diagnostics = check_scene(template.scene(params)[0])
+            if diagnostics:
+                self.disabled[template.name] = format_diagnostics(diagnostics, template.scene(params)[0])
+            else:
+                self.templates.append(template)
+
+    def match(self, prompt: str):
+        text = prompt.lower()
+        for template in self.templates:
+            if template.name in self.disabled or not template.triggers.search(text):
+                continue
+            params, rest = template.extract(text)
+            if params is None:
+                continue
+            words = re.findall(r"[a-z]+|\d+", rest)
+            if all(w in GENERIC_WORDS or w in template.vocabulary for w in words):
+                return TemplateMatch(template, params)
+        return None
+
+    def record_failure(self, name: str, error: str, max_failures: int = 2):
+        # A template that keeps failing to render stops being served until the next restart
+        self.failures[name] = self.failures.get(name, 0) + 1
+        if self.failures[name] >= max_failures:
+            self.disabled[name] = error[-500:]
+
+
+# ====== PER-TEMPLATE STATS ======
+class TemplateStats:
+    def __init__(self, window: int = 500):
+        self.window = window
+        self.classified = 0
+        self.matched = 0
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def classify(self, matched: bool):
+        with self._lock:
+            self.classified += 1
+            self.matched += matched
+
+    def record(self, name: str, outcome: str, seconds: float):
+        # outcome: cached | rendered | failed
+        with self._lock:
+            entry = self._templates.setdefault(name, {"outcomes": {}, "seconds": deque(maxlen=self.window)})
+            entry["outcomes"][outcome] = entry["outcomes"].get(outcome, 0) + 1
+            if outcome != "failed":
+                entry["seconds"].append(seconds)
+
+    def stats(self, registry: TemplateRegistry = None) -> dict:
+        with self._lock:
+            report = {
+                "classified": self.classified,
+                "matched": self.matched,
+                "hitRate": round(self.matched / self.classified, 3) if self.classified else 0.0,
+                "templates": {},
+            }
+            for name, entry in self._templates.items():
+                ordered = sorted(entry["seconds"])
+                report["templates"][name] = {
+                    **entry["outcomes"],
+                    "p50Seconds": round(percentile(ordered, 50), 3) if ordered else None,
+                    "p95Seconds": round(percentile(ordered, 95), 3) if ordered else None,
+                }
+        if registry is not None:
+            report["disabled"] = dict(registry.disabled)
+        return report
+
+
+# ====== VERIFICATION ======
+SAMPLE_PROMPTS = {
+    "pythagorean_theorem": ["pythagorean theorem", "pythagoras with sides 5 and 12", "right triangle legs 7 and 9 pythagorean"],
+    "quadratic_formula": ["quadratic formula", "solve x^2 - 5x + 6 = 0", "solve 2x² + 3x + 5 = 0 using the quadratic formula"],
+    "unit_circle": ["unit circle", "unit circle at 135 degrees", "show sine and cosine on the unit circle for 300°"],
+    "venn_diagram": ["venn diagram", "venn diagram of cats and dogs", "union and intersection with venn diagrams"],
+}
+
+
+def main():
+    # Run before shipping template changes: every sample prompt must classify to its template and,
+    # with --render, every resulting scene must render with the manim CLI
+    parser = argparse.ArgumentParser(description="Verify the scene templates")
+    parser.add_argument("--render", action="store_true", help="Also render every sample scene with manim -ql")
+    args = parser.parse_args()
+    registry = TemplateRegistry()
+    failed = False
+    for name, reason in registry.disabled.items():
+        print(f"DISABLED {name}:\n{reason}")
+        failed = True
+    for name, prompts in SAMPLE_PROMPTS.items():
+        for prompt in prompts:
+            match = registry.match(prompt)
+            if match is None or match.template.name != name:
+                print(f"FAIL  {name}: '{prompt}' classified as {match.template.name if match else None}")
+                failed = True
+                continue
+            code, _ = match.scene()
+            diagnostics = check_scene(code)
+            if diagnostics:
+                print(f"FAIL  {name} {match.params}:\n{format_diagnostics(diagnostics, code)}")
+                failed = True
+                continue
+            status = "ok"
+            if args.render:
+                with tempfile.TemporaryDirectory(prefix="template_") as workdir:
+                    with open(f"{workdir}/scene.py", "w") as f:
+                        f.write(code)
+                    start = time.perf_counter()
+                    proc = subprocess.run(["manim", "-ql", "scene.py", "GeneratedScene"], cwd=workdir,
+                                          capture_output=True, text=True)
+                    status = f"rendered in {time.perf_counter() - start:.1f}s"
+                    if proc.returncode != 0:
+                        print(f"FAIL  {name} {match.params}: render failed\n{proc.stderr[-2000:]}")
+                        failed = True
+                        continue
+            print(f"ok    {name} {match.params}: {status}")
+    for prompt in ("prove the pythagorean theorem using similar triangles", "derive the quadratic formula",
+                   "explain derivatives"):
+        match = registry.match(prompt)
+        print(f"{'FAIL ' if match else 'ok   '} '{prompt}' -> {match.template.name if match else 'Gemini'}")
+        failed = failed or match is not None
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from sections import plan_sections
+
+
+def scene(*steps: str) -> str:
+    # One step method per entry, each drawing something, running `body` and clearing the screen
+    calls = "\n".join(f"        self.step{i}()" for i in range(len(steps)))
+    methods = "\n".join(
+        f"    def step{i}(self):\n"
+        f"        label = Text('{i}')\n"
+        f"        self.play(Write(label))\n"
+        f"        {body}\n"
+        f"        self.play(FadeOut(*self.mobjects))\n"
+        for i, body in enumerate(steps)
+    )
+    return f"from manim import *\n\nclass GeneratedScene(Scene):\n    def construct(self):\n{calls}\n\n{methods}"
+
+
+def sections_of(plan) -> list:
+    return [[statement.value.func.attr for statement in section] for section in plan.sections]
+
+
+def test_independent_steps_split():
+    plan, reason = plan_sections(scene("pass", "pass", "pass"), "GeneratedScene")
+    assert reason is None
+    assert sections_of(plan) == [["step0"], ["step1"], ["step2"]]
+
+
+def test_read_merges_from_the_writing_section():
+    # step2 reads what step0 wrote: step1 runs between them, so all three share one render
+    plan, reason = plan_sections(scene("self.t = label", "pass", "self.add(self.t)", "pass"), "GeneratedScene")
+    assert reason is None
+    assert sections_of(plan) == [["step0", "step1", "step2"], ["step3"]]
+
+
+def test_dependent_steps_do_not_split():
+    plan, reason = plan_sections(scene("self.t = label", "pass", "self.add(self.t)"), "GeneratedScene")
+    assert plan is None
+    assert reason == "dependent_sections"
+
+
+def test_in_place_mutation_is_a_write():
+    code = scene("self.items.append(label)", "self.add(*self.items)")
+    plan, reason = plan_sections(code.replace("    def construct(self):\n",
+                                              "    def construct(self):\n        self.items = []\n"),
+                                 "GeneratedScene")
+    assert plan is None
+    assert reason == "dependent_sections"
@@ -0,0 +1,234 @@
+import argparse
+import ast
+import fcntl
+import glob
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+# Intermediates latex/dvisvgm leave next to each svg; manim's own cleanup would delete other
+# renders' in-flight files from the shared directory, so it is disabled and done per expression.
+INTERMEDIATE_SUFFIXES = (".tex", ".dvi", ".xdv", ".pdf", ".log", ".aux")
+# Entries used this recently are never evicted, so a render cannot lose an svg it is about to read
+EVICTION_GRACE_SECONDS = 600
+
+
+# ====== SHARED INDEX ======
+def open_index(tex_dir: str) -> sqlite3.Connection:
+    os.makedirs(tex_dir, exist_ok=True)
+    db = sqlite3.connect(os.path.join(tex_dir, "index.sqlite3"), timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        "svg TEXT PRIMARY KEY, expression TEXT, bytes INTEGER, last_used REAL, uses INTEGER)"
+    )
+    db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+    return db
+
+
+def bump(db: sqlite3.Connection, name: str):
+    db.execute(
+        "INSERT INTO counters VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,)
+    )
+
+
+def read_stats(tex_dir: str) -> dict:
+    if not os.path.exists(os.path.join(tex_dir, "index.sqlite3")):
+        return {"entries": 0, "bytes": 0, "lookups": 0, "latexRuns": 0, "latexRunsAvoided": 0}
+    db = open_index(tex_dir)
+    try:
+        entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+        counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+    finally:
+        db.close()
+    lookups = counters.get("lookups", 0)
+    compiles = counters.get("compiles", 0)
+    return {
+        "entries": entries,
+        "bytes": size,
+        "lookups": lookups,
+        "latexRuns": compiles,
+        "latexRunsAvoided": lookups - compiles,
+    }
+
+
+def evict(tex_dir: str, max_bytes: int) -> int:
+    db = open_index(tex_dir)
+    removed = 0
+    try:
+        total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        cutoff = time.time() - EVICTION_GRACE_SECONDS
+        rows = db.execute(
+            "SELECT svg, bytes FROM entries WHERE last_used < ? ORDER BY last_used ASC", (cutoff,)
+        ).fetchall()
+        for svg, size in rows:
+            if total <= max_bytes:
+                break
+            stem = os.path.splitext(svg)[0]
+            for path in glob.glob(f"{stem}.*"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            db.execute("DELETE FROM entries WHERE svg = ?", (svg,))
+            total -= size
+            removed += 1
+        db.commit()
+    finally:
+        db.close()
+    return removed
+
+
+@contextmanager
+def expression_lock(tex_dir: str, key: str):
+    lock_dir = os.path.join(tex_dir, "locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{key}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# ====== MANIM INTEGRATION ======
+def install(tex_dir: str, max_bytes: int = 512 * 1024 ** 2):
+    # Points manim's Tex output at the shared directory and serializes compilation per expression
+    from manim import config
+    from manim.mobject.text import tex_mobject
+    from manim.utils import tex_file_writing
+
+    tex_dir = os.path.abspath(tex_dir)
+    os.makedirs(tex_dir, exist_ok=True)
+    config.tex_dir = tex_dir
+    config.no_latex_cleanup = True
+
+    original_tex_to_svg = tex_file_writing.tex_to_svg_file
+    original_compile = tex_file_writing.compile_tex
+    compiled = []
+
+    def compile_tex(*args, **kwargs):
+        compiled.append(True)
+        return original_compile(*args, **kwargs)
+
+    def tex_to_svg_file(expression, environment=None, tex_template=None):
+        template = tex_template if tex_template is not None else config.tex_template
+        material = "\x1f".join([expression, environment or "", getattr(template, "body", "")])
+        key = hashlib.sha256(material.encode("utf-8")).hexdigest()[:32]
+        with expression_lock(tex_dir, key):
+            compiled.clear()
+            svg_file = original_tex_to_svg(expression, environment=environment, tex_template=tex_template)
+            ran_latex = bool(compiled)
+            if ran_latex:
+                stem = os.path.splitext(str(svg_file))[0]
+                for suffix in INTERMEDIATE_SUFFIXES:
+                    try:
+                        os.remove(stem + suffix)
+                    except FileNotFoundError:
+                        pass
+        db = open_index(tex_dir)
+        try:
+            size = os.path.getsize(svg_file) if os.path.exists(svg_file) else 0
+            db.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, 1) ON CONFLICT(svg) DO UPDATE SET "
+                "last_used = excluded.last_used, uses = uses + 1",
+                (str(svg_file), expression, size, time.time()),
+            )
+            bump(db, "lookups")
+            if ran_latex:
+                bump(db, "compiles")
+            db.commit()
+        finally:
+            db.close()
+        if ran_latex:
+            evict(tex_dir, max_bytes)
+        return svg_file
+
+    tex_file_writing.compile_tex = compile_tex
+    tex_file_writing.tex_to_svg_file = tex_to_svg_file
+    tex_mobject.tex_to_svg_file = tex_to_svg_file
+
+
+# ====== WARM-UP ======
+def tex_calls(source: str) -> list:
+    # (class name, string args) for every MathTex/Tex call built from string literals
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    calls = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ("MathTex", "Tex"):
+            args = node.args
+            if args and all(isinstance(a, ast.Constant) and isinstance(a.value, str) for a in args):
+                calls.append((node.func.id, tuple(a.value for a in args)))
+    return calls
+
+
+def popular_expressions(results_db: str, top: int) -> list:
+    db = sqlite3.connect(results_db)
+    try:
+        sources = [row[0] for row in db.execute("SELECT scene_source FROM entries WHERE scene_source IS NOT NULL")]
+    finally:
+        db.close()
+    counts = Counter()
+    for source in sources:
+        counts.update(set(tex_calls(source)))
+    return counts.most_common(top)
+
+
+def warmup(tex_dir: str, results_db: str, top: int, max_bytes: int):
+    install(tex_dir, max_bytes)
+    import manim
+
+    before = read_stats(tex_dir)
+    expressions = popular_expressions(results_db, top)
+    for (name, args), count in expressions:
+        try:
+            getattr(manim, name)(*args)
+        except Exception as e:
+            print(f"[TexCache] Skipping {name}{args}: {e}")
+    after = read_stats(tex_dir)
+    print(f"[TexCache] Warmed {len(expressions)} expressions, "
+          f"{after['latexRuns'] - before['latexRuns']} compiled, {after['entries']} cached")
+
+
+def run_manim_cli(tex_dir: str, max_bytes: int, argv: list):
+    # Same as the `manim` console script, but with the shared Tex cache installed first
+    install(tex_dir, max_bytes)
+    from manim.__main__ import main
+
+    sys.argv = ["manim"] + argv
+    return main()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared MathTex/Tex SVG cache for manim renders")
+    parser.add_argument("--tex-dir", default=os.getenv("TEX_CACHE_DIR", "tex_cache"))
+    parser.add_argument("--max-bytes", type=int, default=int(os.getenv("TEX_CACHE_MAX_BYTES", str(512 * 1024 ** 2))))
+    commands = parser.add_subparsers(dest="command", required=True)
+    warm = commands.add_parser("warmup", help="Precompile the most common formulas from past successful scenes")
+    warm.add_argument("--results-db", default=os.path.join("cache", "results.sqlite3"))
+    warm.add_argument("--top", type=int, default=100)
+    commands.add_parser("stats", help="Print cache size and latex invocations avoided")
+    render = commands.add_parser("render", help="Run the manim CLI with the shared cache installed")
+    render.add_argument("manim_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    if args.command == "warmup":
+        warmup(args.tex_dir, args.results_db, args.top, args.max_bytes)
+    elif args.command == "stats":
+        print(read_stats(args.tex_dir))
+    elif args.command == "render":
+        return run_manim_cli(args.tex_dir, args.max_bytes, args.manim_args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
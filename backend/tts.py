@@ -0,0 +1,46 @@
+import time
+
+
+# ====== TTS CLIENTS ======
+# Both clients return the synthesized mp3 as bytes so callers decide where it is stored.
+class ElevenLabsTTS:
+    def __init__(self, api_key: str):
+        from elevenlabs.client import ElevenLabs
+        self.client = ElevenLabs(api_key=api_key)
+
+    def synthesize(self, text: str, voice: str, model: str) -> bytes:
+        # voice is a voice_id; the SDK streams the mp3 back in chunks
+        audio = self.client.text_to_speech.convert(
+            voice_id=voice, model_id=model, text=text, output_format="mp3_44100_128",
+        )
+        if isinstance(audio, bytes):
+            return audio
+        return b"".join(audio)
+
+
+# Silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, 417 bytes, 1152 samples (~26 ms)
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+MP3_FRAME_SECONDS = 1152 / 44100
+
+
+class FakeTTSClient:
+    # Offline stand-in for ElevenLabs: returns valid silent audio whose length tracks
+    # the text (~15 characters per second of speech) after a simulated API latency.
+    def __init__(self, latency: float = 0.5, chars_per_second: float = 15.0):
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.calls = 0
+
+    def synthesize(self, text: str, voice: str, model: str) -> bytes:
+        self.calls += 1
+        time.sleep(self.latency)
+        seconds = max(len(text) / self.chars_per_second, MP3_FRAME_SECONDS)
+        return SILENT_MP3_FRAME * int(seconds / MP3_FRAME_SECONDS)
+
+
+def create_tts_client(backend: str, api_key: str = None, latency: float = 0.5):
+    if backend == "fake":
+        return FakeTTSClient(latency=latency)
+    if backend == "elevenlabs":
+        return ElevenLabsTTS(api_key)
+    raise ValueError(f"Unknown TTS backend: {backend}")
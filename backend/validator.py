@@ -0,0 +1,177 @@
+import ast
+import builtins
+import threading
+from functools import lru_cache
+
+
+MANIMGL_MODULES = ("manimlib", "manimgl", "manim_imports_ext")
+LIST_ARITHMETIC_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+
+
+@lru_cache(maxsize=1)
+def manim_names() -> frozenset:
+    # Names exported by `from manim import *`; the undefined-name rule is skipped without manim
+    try:
+        import manim
+    except Exception:
+        return frozenset()
+    return frozenset(getattr(manim, "__all__", None) or dir(manim))
+
+
+def diagnostic(node, rule: str, message: str) -> dict:
+    return {"line": getattr(node, "lineno", None), "rule": rule, "message": message}
+
+
+# ====== STATIC SCENE VALIDATOR ======
+# Catches the mistakes build_gemini_prompt forbids before a manim subprocess is spent on them.
+class SceneValidator:
+    def __init__(self):
+        self.checked = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def validate(self, code: str) -> list:
+        diagnostics = check_scene(code)
+        with self._lock:
+            self.checked += 1
+            if diagnostics:
+                self.rejected += 1
+        return diagnostics
+
+    def stats(self) -> dict:
+        # Every rejected scene is one render subprocess that never had to run
+        return {"checked": self.checked, "rejected": self.rejected, "rendersSaved": self.rejected}
+
+
+def check_scene(code: str) -> list:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return [{"line": e.lineno, "rule": "syntax-error", "message": f"SyntaxError: {e.msg}"}]
+
+    diagnostics = []
+    diagnostics += check_imports(tree)
+    diagnostics += check_scene_class(tree)
+    diagnostics += check_calls(tree)
+    diagnostics += check_list_arithmetic(tree)
+    diagnostics += check_undefined_classes(tree)
+    return sorted(diagnostics, key=lambda d: d["line"] or 0)
+
+
+def check_imports(tree) -> list:
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and (node.module or "").split(".")[0] in MANIMGL_MODULES:
+            found.append(diagnostic(node, "manimgl-import", f"ManimGL import '{node.module}'; use 'from manim import *'"))
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split(".")[0] in MANIMGL_MODULES:
+                    found.append(diagnostic(node, "manimgl-import", f"ManimGL import '{alias.name}'; use 'from manim import *'"))
+    return found
+
+
+def check_scene_class(tree) -> list:
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == "GeneratedScene":
+            if not any(isinstance(item, ast.FunctionDef) and item.name == "construct" for item in node.body):
+                return [diagnostic(node, "missing-construct", "GeneratedScene has no construct(self) method")]
+            return []
+    return [{"line": 1, "rule": "missing-scene", "message": "No top-level class GeneratedScene(Scene) found"}]
+
+
+def check_calls(tree) -> list:
+    found = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr == "get_corner" and not node.args and not node.keywords:
+            found.append(diagnostic(node, "get-corner-direction", "get_corner() requires a direction, e.g. get_corner(UP + RIGHT)"))
+        if isinstance(func, ast.Name) and func.id == "VGroup" and any(is_self_mobjects(arg) for arg in node.args):
+            found.append(diagnostic(node, "vgroup-self-mobjects", "VGroup(*self.mobjects) fails on non-VMobjects; use Group(*self.mobjects)"))
+    return found
+
+
+def is_self_mobjects(node) -> bool:
+    if isinstance(node, ast.Starred):
+        node = node.value
+    return (
+        isinstance(node, ast.Attribute) and node.attr == "mobjects"
+        and isinstance(node.value, ast.Name) and node.value.id == "self"
+    )
+
+
+def check_list_arithmetic(tree) -> list:
+    # Names only ever bound to list literals (e.g. A = [0, 0, 0]) are plain lists, not vectors
+    list_names = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    is_list = isinstance(node.value, ast.List)
+                    list_names[target.id] = list_names.get(target.id, True) and is_list
+
+    def is_list(expr) -> bool:
+        if isinstance(expr, ast.List):
+            return True
+        return isinstance(expr, ast.Name) and list_names.get(expr.id, False)
+
+    def is_number(expr) -> bool:
+        return isinstance(expr, ast.Constant) and isinstance(expr.value, (int, float)) and not isinstance(expr.value, bool)
+
+    found = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.BinOp) and isinstance(node.op, LIST_ARITHMETIC_OPS)):
+            continue
+        left, right = node.left, node.right
+        # A list against an ndarray broadcasts fine, so only list/list and list/number are flagged;
+        # [..] + [..] is concatenation and [..] * int is repetition, both legitimate Python
+        if is_list(left) and is_list(right):
+            bad = not isinstance(node.op, ast.Add)
+        elif is_list(left) or is_list(right):
+            other = right if is_list(left) else left
+            bad = is_number(other) and not (isinstance(node.op, ast.Mult) and isinstance(other.value, int))
+        else:
+            bad = False
+        if bad:
+            found.append(diagnostic(node, "list-arithmetic", "Arithmetic on a Python list coordinate; wrap it in np.array([...])"))
+    return found
+
+
+def check_undefined_classes(tree) -> list:
+    known = manim_names()
+    if not known:
+        return []
+    defined = set(dir(builtins))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom):
+            if any(alias.name == "*" for alias in node.names) and node.module != "manim":
+                return []  # another star import could provide anything
+            defined.update(alias.asname or alias.name for alias in node.names)
+        elif isinstance(node, ast.Import):
+            defined.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        elif isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            defined.add(node.name)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            defined.add(node.id)
+        elif isinstance(node, ast.arg):
+            defined.add(node.arg)
+
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            name = node.func.id
+            if name[:1].isupper() and name not in defined and name not in known:
+                found.append(diagnostic(node, "undefined-class", f"'{name}' is not defined and is not part of Manim Community"))
+    return found
+
+
+def format_diagnostics(diagnostics: list, code: str) -> str:
+    # Shaped like render error output so build_fix_prompt can use it unchanged
+    lines = code.splitlines()
+    out = ["Static validation failed before rendering:"]
+    for d in diagnostics:
+        out.append(f"  line {d['line']}: [{d['rule']}] {d['message']}")
+        if d["line"] and 0 < d["line"] <= len(lines):
+            out.append(f"    {lines[d['line'] - 1].strip()}")
+    return "\n".join(out)
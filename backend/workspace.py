@@ -0,0 +1,101 @@
+import os
+import re
+import shutil
+import socket
+from contextlib import contextmanager
+
+
+# Stable names across fix attempts let manim's per-animation hash cache reuse
+# partial movie files for animations that did not change between attempts.
+SCENE_FILENAME = "scene.py"
+SCENE_MODULE = "scene"
+SCENE_CLASS = "GeneratedScene"
+
+CACHED_ANIMATION = re.compile(r"Using\s+cached\s+data")
+RENDERED_ANIMATION = re.compile(r"Partial\s+movie\s+file\s+written")
+
+
+# Names the process that owns a scratch directory, so other workers on the host leave it alone
+OWNER_FILENAME = ".owner"
+
+
+def process_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def owner_alive(owner: str):
+    # True/False for owners on this host; None when the owner is unknown or on another host
+    # sharing the directory, where only the directory's age can tell
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return None
+    return pid_alive(int(pid))
+
+
+def workspace_owner(path: str):
+    try:
+        with open(os.path.join(path, OWNER_FILENAME)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+# ====== PER-JOB SCRATCH DIRECTORY ======
+@contextmanager
+def job_workspace(root: str, job_id: str):
+    workdir = os.path.join(root, job_id)
+    os.makedirs(workdir, exist_ok=True)
+    with open(os.path.join(workdir, OWNER_FILENAME), "w") as f:
+        f.write(process_owner())
+    try:
+        yield workdir
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def scene_path(workdir: str) -> str:
+    return os.path.join(workdir, SCENE_FILENAME)
+
+
+def media_dir(workdir: str) -> str:
+    return os.path.join(workdir, "media")
+
+
+def rendered_video_path(workdir: str, quality: str, module: str = SCENE_MODULE, scene_class: str = SCENE_CLASS) -> str:
+    return os.path.join(media_dir(workdir), "videos", module, quality, f"{scene_class}.mp4")
+
+
+def section_module(index: int) -> str:
+    # One script per section, also stable across fix attempts for the partial movie cache
+    return f"section_{index}"
+
+
+# ====== PARTIAL MOVIE CACHE ACCOUNTING ======
+def partial_cache_counts(output: str) -> dict:
+    # Parsed from manim's INFO log lines for each animation
+    cached = len(CACHED_ANIMATION.findall(output))
+    rendered = len(RENDERED_ANIMATION.findall(output))
+    return {"cached": cached, "rendered": rendered}
+
+
+def partial_cache_report(attempts: list) -> dict:
+    cached = sum(a["cached"] for a in attempts)
+    total = cached + sum(a["rendered"] for a in attempts)
+    return {
+        "attempts": attempts,
+        "cachedAnimations": cached,
+        "totalAnimations": total,
+        "hitRatio": round(cached / total, 3) if total else 0.0,
+    }